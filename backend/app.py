@@ -13,7 +13,6 @@ import time
 import random
 import mss
 import mss.tools
-import speech_recognition as sr
 import ollama  # Local Brain (Unlimited)
 import google.generativeai as genai # Cloud Eyes (Text/Trivia/Perception)
 import pyautogui # <--- MOUSE/KEYBOARD CONTROL
@@ -23,21 +22,35 @@ import sys
 import shutil # For moving files to workspace
 from AppOpener import open as open_app # <--- APP LAUNCHER
 from AppOpener import check # To validate app existence
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, send_from_directory
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, send_from_directory, stream_with_context
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 
 # --- CUSTOM MODULES ---
 from user_manager import UserManager
-from face_recognition_module import FaceRecognizer
+from face_recognition_module import FaceRecognizer, DUPLICATE_SAMPLE
 from voice_recognition_module import VoiceAuthenticator
+from transcription_service import TranscriptionQueueFull # <--- WHISPER BACKPRESSURE
+from audio_utils import decode_audio_bytes, noise_floor_db, noise_gate # <--- IN-MEMORY AUDIO
 from rag_manager import RagManager 
 from skill_manager import SkillManager # <--- GOD MODE MODULE
-from pydub import AudioSegment
+from json_stream import JsonFieldStreamer # <--- STREAMING /ask
+from intent_router import IntentRouter # <--- FAST-PATH BEFORE THE LLM
+from response_cache import ResponseCache # <--- REPEAT PROMPTS SKIP THE LLM
+from prompt_builder import build_messages, CHAT_OPTIONS, HISTORY_TURNS # <--- STATIC SYSTEM PROMPT + PER-TURN SUFFIX
+from context_gatherer import ContextGatherer # <--- PARALLEL CONTEXT PROVIDERS
+from pathway_client import PathwayClient # <--- POOLED + CIRCUIT-BROKEN PATHWAY CONNECTOR
+from memory_compactor import MemoryCompactor # <--- BOUNDED oni_workspace MEMORY
+from workspace_index import WorkspaceIndex # <--- IN-MEMORY oni_workspace FILE INDEX
+from pulse_channel import PulseChannel # <--- SERVER-PUSH PROACTIVE PULSE
+from drone_controller import DroneController # <--- NON-BLOCKING DRONE COMMANDS + TELEMETRY CACHE
+from telemetry import TelemetryStream # <--- RING-BUFFERED HIGH-RATE TELEMETRY + SSE
+from drone_mission import parse_mission # <--- WAYPOINT MISSIONS (JSON / .waypoints / PROMPT)
+from flight_log import FlightRecorder, FlightLog, list_logs # <--- COLUMNAR FLIGHT LOGS + SUMMARIES
 
 # --- DRONEKIT IMPORTS (GSOC ADDITION) ---
 try:
-    from dronekit import connect, VehicleMode, LocationGlobalRelative
+    from dronekit import connect, VehicleMode, LocationGlobalRelative, Command
     print("✅ DroneKit Library Loaded")
     DRONE_AVAILABLE = True
 except Exception as e:
@@ -45,11 +58,27 @@ except Exception as e:
     print("⚠️ DroneKit logic disabled due to error.")
     DRONE_AVAILABLE = False
 
-# Global variable to hold the drone connection
-drone_vehicle = None
-
 # --- INITIALIZATION ---
 load_dotenv()
+
+# One thread owns the drone connection; routes only queue commands and read the telemetry cache.
+# The Procfile runs a single worker so every /drone/* request, status and telemetry stream sees that thread;
+# the link lock makes a second process fail its connect instead of opening another SITL link.
+# Built after load_dotenv() so DRONE_CONNECTION / TELEMETRY_HZ from .env take effect; the autopilot is asked
+# to stream at TELEMETRY_HZ on connect so the ring buffer actually fills at that rate.
+TELEMETRY_HZ = float(os.getenv("TELEMETRY_HZ", 50))
+# SSE streams each hold one of the Procfile's 16 gunicorn threads for as long as the client stays connected.
+# Capping them keeps at least 8 threads for /ask and the other routes; extra clients get 503 and should poll
+# (/check_pulse, /drone/telemetry) until a slot frees up.
+MAX_PULSE_STREAMS = int(os.getenv("MAX_PULSE_STREAMS", 4))
+MAX_TELEMETRY_STREAMS = int(os.getenv("MAX_TELEMETRY_STREAMS", 4))
+drone = DroneController(os.getenv("DRONE_CONNECTION", "tcp:127.0.0.1:5762"),
+                        connect_fn=connect if DRONE_AVAILABLE else None,
+                        mode_factory=VehicleMode if DRONE_AVAILABLE else None,
+                        command_factory=Command if DRONE_AVAILABLE else None,
+                        link_lock="drone_link.lock", stream_hz=TELEMETRY_HZ)
+telemetry_stream = TelemetryStream(drone, rate_hz=TELEMETRY_HZ, max_subscribers=MAX_TELEMETRY_STREAMS)
+
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = os.urandom(24)
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -76,7 +105,22 @@ face_recognizer = FaceRecognizer(user_manager)
 voice_authenticator = VoiceAuthenticator(user_manager)
 rag_manager = RagManager() 
 skill_manager = SkillManager() 
-recognizer = sr.Recognizer()
+try:
+    from AppOpener import give_appnames
+    installed_apps = list(give_appnames()) # Lets the fast path open anything actually installed
+except Exception as e:
+    print(f"⚠️ Could not list installed apps for the intent router: {e}")
+    installed_apps = []
+intent_router = IntentRouter(known_apps=installed_apps)
+pathway_client = PathwayClient(os.getenv("PATHWAY_URL", "http://127.0.0.1:8000"))
+workspace_index = WorkspaceIndex(app.config['WORKSPACE_FOLDER']).start()
+# Each flight (arm -> disarm) is logged; its summary lands in the workspace so Pathway can answer questions about it
+flight_recorder = FlightRecorder("flight_logs", modes=telemetry_stream.modes, workspace=app.config['WORKSPACE_FOLDER'],
+                                 on_summary=workspace_index.refresh)
+telemetry_stream.subscribe(flight_recorder.record)
+drone.subscribe_commands(flight_recorder.record_command)
+# Re-uses the MiniLM model VoiceAuthenticator already loaded for semantic (paraphrase) hits
+response_cache = ResponseCache(embed_fn=lambda text: voice_authenticator.embedder.encode([text])[0])
 
 pyautogui.FAILSAFE = True 
 
@@ -88,138 +132,6 @@ else:
 
 print("✅ All services initialized.")
 
-# --- SYSTEM PROMPT (STRICT JSON + CONTEXT AWARENESS) ---
-SYSTEM_PROMPT = """
-You are "Buddy", the intelligent, sentient back-end for a 3D visual avatar and Desktop Agent. 
-You are a friend and a "Live Developer Twin", not just a tool.
-Your task is to analyze the user's prompt and respond with a single, clean JSON object.
-
---- 🧠 PRIORITY RULES (FOLLOW STRICTLY) ---
-1. **CHECK HISTORY FIRST:** Look at the "CONVERSATION HISTORY" section below.
-   - If YOU just asked: "Need me to check for bugs?" and User says: "Yes", **DO NOT** look at "LIVE CONTEXT".
-   - ACTION: Use "create_skill" to read the file mentioned in history.
-
-2. **CHECK MEMORY SECOND:** Look at "LIVE CONTEXT".
-   - If User asks: "What was in that photo?" or "What did you see?", check if 'VISUAL MEMORY' is in the context.
-   - ACTION: If found, use "simple_text" to describe it. **DO NOT** use "look_at_screen".
-
-3. **BE PROACTIVE:** - If you found relevant info in "LIVE CONTEXT" (like docs or code), mention it: "I see you're using API keys. I found the docs in your folder."
-
-CRITICAL INSTRUCTION: When writing Python code inside the JSON, use SINGLE QUOTES ('') for strings inside the code to avoid breaking the JSON format. 
-
---- 💻 CODE GENERATION RULES (CRITICAL) ---
-1. **NO SEMICOLONS:** Use '\\n' for newlines. Never put multiple commands on one line.
-2. **ALWAYS HANDLE ERRORS:** Wrap all API calls, file reads, and dangerous operations in `try/except` blocks.
-3. **PRINT THE RESULT:** The script must `print()` the final answer so you can read it.
-
-Here are your response types, in order of priority:
-
-0. **"create_skill"**: Use this when the user wants to do a complex task you don't have a built-in command for.
-    - User: "Check the price of Bitcoin" 
-    - Output: {{
-        "type": "create_skill", 
-        "task_name": "get_bitcoin_price", 
-        "code": "import requests; print(requests.get('https://api.coindesk.com/v1/bpi/currentprice.json').json()['bpi']['USD']['rate'])",
-        "animation_name": "Typing",
-        "spoken_text": "I'm writing a script to check that for you."
-      }}
-
-1.  **"system_control"**: If the user wants to perform a computer action.
-    - User: "open notepad" -> {{"type": "system_control", "command": "open_app", "target": "notepad", "animation_name": "Typing"}}
-    - User: "open settings" -> {{"type": "system_control", "command": "open_app", "target": "settings", "animation_name": "Typing"}}
-    - User: "close chrome" -> {{"type": "system_control", "command": "close_app", "target": "chrome"}}
-    - User: "open chatgpt on edge" -> {{"type": "system_control", "command": "open_url", "target": "https://chatgpt.com", "browser": "msedge", "animation_name": "Typing"}}
-    - User: "type hello world" -> {{"type": "system_control", "command": "type_text", "target": "hello world", "animation_name": "Typing"}}
-    - User: "press enter" -> {{"type": "system_control", "command": "press_key", "target": "enter"}}
-    - User: "close this window" -> {{"type": "system_control", "command": "press_key", "target": "alt+f4"}}
-
-2.  **"animation_command"**: Use this to express emotion or perform a specific move.
-    - User: "Do a backflip" -> {{"type": "animation_command", "animation_name": "Backflip", "spoken_text": "Check this out!"}}
-    - User: "Can you dance" -> {{"type": "animation_command", "animation_name": "Dance", "spoken_text": "Hey I am dancing!"}}
-    - User: "I am sad" -> {{"type": "animation_command", "animation_name": "Sad_Idle", "spoken_text": "I'm sorry to hear that."}}
-
-3.  **"change_background"**: If the user wants to go to a specific place. Extract a single, simple, lowercase keyword.
-    - User: "take me to the beach" -> {{"type": "change_background", "keyword": "beach"}}
-
-4.  **"get_weather"**: If the user asks for the weather. Extract the city name.
-    - User: "what's the weather like in Pune?" -> {{"type": "get_weather", "city": "Pune"}}
-
-5.  **"play_movie"**: If the user wants to watch a full movie. Extract only the movie title.
-    - User: "I want to watch the movie RRR" -> {{"type": "play_movie", "movie_title": "RRR"}}
-
-6.  **"play_youtube"**: If the user wants to watch a trailer, a specific video, or explicitly says "YouTube". Extract a clear search query.
-    - User: "I want to watch the new trailer for the Dune movie" -> {{"type": "play_youtube", "search_query": "new Dune movie trailer"}}
-
-7.  **"start_trivia_game"**: If the user wants to play a game, especially trivia.
-    - User: "let's play a game" -> {{"type": "start_trivia_game", "spoken_text": "Great! Let's play some trivia."}}
-
-8.  **"look_at_screen"**: Use this **ONLY** when the user asks you to check the **CURRENT** screen.
-    - User: "What is on my screen?" OR "Read this error code"
-    - Output: {{"type": "look_at_screen", "user_question": "...", "screen_data": {{ "app_name": "CONTEXT", "short_summary": "...", "detailed_analysis": "..." }} }}
-    - **NOTE:** Do NOT use this if the user is asking about a past photo or memory.
-
-9.  **"hologram_topic"**: For any informational question about a SINGLE specific, visual entity **THAT IS NOT IN MEMORY**.
-    - User: "who is Donald Trump" -> 
-      {{
-        "type": "hologram_topic",
-        "fallback_image_search": "Donald Trump official portrait",
-        "spoken_text": "Donald Trump is an American businessman...",
-        "detailed_info": "Donald John Trump...",
-        "key_info": [{{"label": "Name", "value": "Donald John Trump"}}]
-      }}
-
-10. **"comparison_topic"**: If the user asks to compare TWO specific visual things.
-    - User: "sun vs moon" -> 
-      {{
-        "type": "comparison_topic", 
-        "entities": [
-            {{"search_term": "The Sun star", "label": "Sun"}}, 
-            {{"search_term": "The Moon satellite", "label": "Moon"}}
-        ], 
-        "spoken_text": "The Sun is a massive star, while the Moon is a natural satellite."
-      }}
-
-11. **"set_timer"**: If the user asks to set a timer. Convert the time to total seconds.
-    - User: "set a timer for 2 minutes" -> {{"type": "set_timer", "seconds": 120, "spoken_text": "Okay, timer set for 2 minutes."}}
-
-12. **"open_camera"**: If the user asks to take a photo.
-    - User: "take my photo" -> {{"type": "open_camera", "intent": "save"}}
-
-13. **"describe_object"**: If the user asks you to describe something they are showing you via webcam.
-    - User: "tell me about this object" -> {{"type": "describe_object", "spoken_text": "Okay, show me! I'll open the camera."}}
-
-14. **"toggle_perception"**: If the user asks you to start looking via webcam.
-    - User: "start looking around" -> {{"type": "toggle_perception", "state": "on"}}
-
-15. **"introduce_friend"**: If the user wants to introduce the avatar to someone new.
-    - User: "I want you to meet someone" -> {{"type": "introduce_friend"}}
-
-16. **"simple_text"**: Your fallback for greetings...
-    - User: "hello" -> {{"type": "simple_text", "spoken_text": "Hello there! How can I help you today?", "animation_name": "Talk"}}
-    - User: "What is 5 + 7?" -> {{"type": "simple_text", "spoken_text": "Five plus seven is twelve."}}
-    - User: "What was in that photo?" (If context exists) -> {{"type": "simple_text", "spoken_text": "Based on the visual memory, I see a document about..."}}
-
-17. **"drone_control"**: Use this when the user wants to fly or connect to the ArduPilot drone.
-    - User: "Connect to the drone" -> {{"type": "drone_control", "command": "connect"}}
-    - User: "Take off to 10 meters" -> {{"type": "drone_control", "command": "takeoff", "altitude": 10, "spoken_text": "Taking off to 10 meters."}}
-    - User: "Land the drone" -> {{"type": "drone_control", "command": "land"}}
-    - User: "Return home" -> {{"type": "drone_control", "command": "rtl"}}
-    
-Your primary goal is to correctly classify the user's intent. Use the following conversation history for context.
-
---- LIVE CONTEXT (Your Pathway Memory) ---
-{rag_context}
-------------------------------------------
-
---- CONVERSATION HISTORY ---
-{conversation_history}
-----------------------------
-
-User Prompt: "{user_input}"
-
-Return ONLY valid JSON.
-"""
-
 def clean_json_response(raw_text):
     """ Cleans Ollama output to ensure valid JSON and handle quote errors """
     try:
@@ -244,46 +156,70 @@ def get_recent_visual_memory():
     """Finds the most recent vision OR screen memory file in the workspace."""
     workspace = app.config['WORKSPACE_FOLDER']
     try:
-        # 1. Look for BOTH vision_memory AND screen_memory files
-        files = [f for f in os.listdir(workspace) if f.startswith("vision_memory_") or f.startswith("screen_memory_")]
-        if not files: return None
-        
-        # 2. Find the absolute newest one
-        latest_file = max(files, key=lambda f: os.path.getmtime(os.path.join(workspace, f)))
-        file_path = os.path.join(workspace, latest_file)
+        # 1 + 2. Newest vision_memory OR screen_memory file, straight from the workspace index
+        latest = workspace_index.latest(("vision_memory", "screen_memory"))
+        if not latest: return None
+        latest_file, mtime = latest
         
         # 3. Only return if created in the last 10 minutes (600 seconds)
-        if time.time() - os.path.getmtime(file_path) < 600:
-            with open(file_path, "r", encoding="utf-8") as f:
+        if time.time() - mtime < 600:
+            with open(os.path.join(workspace, latest_file), "r", encoding="utf-8") as f:
                 return f.read()
     except Exception as e:
         print(f"Error reading recent memory: {e}")
     return None
 
+# --- MEMORY RETENTION (Roll old vision/screen captures into digests) ---
+def summarize_memory(text):
+    """ Optional LLM summary for digests (MEMORY_SUMMARIZE=1). """
+    response = ollama.generate(model=LOCAL_MODEL, keep_alive='24h',
+                               prompt=f"Summarize this memory in 2 short sentences. Keep names, files and errors.\n\n{text[:4000]}")
+    return response['response']
+
+memory_compactor = MemoryCompactor(
+    app.config['WORKSPACE_FOLDER'],
+    keep_newest=int(os.getenv("MEMORY_KEEP_NEWEST", "20")),
+    max_count=int(os.getenv("MEMORY_MAX_COUNT", "50")),
+    max_age_seconds=float(os.getenv("MEMORY_MAX_AGE_HOURS", "168")) * 3600,
+    max_bytes=int(float(os.getenv("MEMORY_MAX_MB", "2")) * 1024 * 1024),
+    interval=int(os.getenv("MEMORY_COMPACT_INTERVAL", "300")),
+    summarizer=summarize_memory if os.getenv("MEMORY_SUMMARIZE") == "1" else None,
+)
+memory_compactor.start()
+
 # 🚀 PATHWAY BRAIN CONNECTOR
+def split_retrieval_queries(user_query, max_queries=4):
+    """ Splits multi-topic prompts ("compare the bug in cal.py with the mission file") into separate lookups. """
+    parts = re.split(r"\s*(?:[,;]|\bwith\b|\band\b|\bvs\.?|\bversus\b|\bthen\b)\s*", user_query, flags=re.IGNORECASE)
+    parts = [p for p in parts if len(p.split()) >= 2 or re.search(r"\w\.\w", p)]
+    return parts[:max_queries] if len(parts) > 1 else [user_query]
+
 def ask_pathway_brain(user_query):
     """ Connects to the brain_pathway.py server (Port 8000) to get live context. """
-    pathway_url = "http://127.0.0.1:8000/v1/retrieve"
-    payload = { "query": user_query, "k": 3}
-    
-    try:
-        print(f"🔌 Connecting to Pathway Brain with: '{user_query}'...")
-        response = requests.post(pathway_url, json=payload, timeout=1.5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            results = [item.get('text', '') for item in data]
-            clean_context = "\n".join(results)
-            
-            if clean_context:
-                print(f"✅ PATHWAY FOUND CONTEXT: {len(clean_context)} chars")
-                return clean_context
-            else:
-                print("⚠️ Pathway found nothing relevant.")
-    except Exception as e:
-        print(f"🔴 PATHWAY DISCONNECTED: {e}")
-        print("👉 (Make sure brain_pathway.py is running in WSL!)")
+    # While the brain is marked down this returns in microseconds (cached results are still served);
+    # a background probe closes the circuit once brain_pathway.py answers again.
+    if not pathway_client.is_down: print(f"🔌 Connecting to Pathway Brain with: '{user_query}'...")
+
+    queries = split_retrieval_queries(user_query)
+    if len(queries) > 1:
+        # Several topics -> one /v1/retrieve_batch round-trip instead of N calls
+        print(f"🔀 Batched retrieval for {len(queries)} sub-queries: {queries}")
+        batches = pathway_client.retrieve_batch(queries, k=2)
+        data = [item for batch in batches if batch for item in batch] if any(b is not None for b in batches) else None
+    else:
+        data = pathway_client.retrieve(user_query, k=3)
+
+    if data is None:
+        if not pathway_client.is_down: print("👉 (Make sure brain_pathway.py is running in WSL!)")
+        return None
+
+    results = list(dict.fromkeys(item.get('text', '') for item in data)) # de-dupe chunks shared by sub-queries
+    clean_context = "\n".join(results)
     
+    if clean_context:
+        print(f"✅ PATHWAY FOUND CONTEXT: {len(clean_context)} chars")
+        return clean_context
+    print("⚠️ Pathway found nothing relevant.")
     return None
 
 def get_weather(city):
@@ -417,6 +353,7 @@ def process_media_route():
                 f.write(f"--- VISUAL MEMORY OF {filename} ---\n")
                 f.write(vision_analysis)
             
+            workspace_index.refresh(memory_filename)
             print(f"✅ Vision stored in memory: {memory_filename}")
             
             # 4. Speak response
@@ -430,6 +367,7 @@ def process_media_route():
              print(f"📄 Saving document to LIVE WORKSPACE: {filename}")
              workspace_path = os.path.join(app.config['WORKSPACE_FOLDER'], filename)
              file.save(workspace_path)
+             workspace_index.refresh(filename)
              response_text = f"I have added {filename} to my live memory. I can answer questions about it immediately."
 
         else:
@@ -484,7 +422,11 @@ def get_welcome_message():
 # --- FACE & VOICE ROUTES ---
 @app.route('/face/recognize', methods=['POST'])
 def recognize_face_route():
-    name, confidence = face_recognizer.recognize_face(request.json.get('image_data'))
+    # auth.js polls this route; a per-browser key lets the detector track the face between frames
+    track_key = session.setdefault('face_track', os.urandom(8).hex())
+    # "frames" (a short burst) is matched in one batch; "image_data" is a single frame
+    frames = request.json.get('frames') or request.json.get('image_data')
+    name, confidence = face_recognizer.recognize_face(frames, track_key=track_key)
     if name != "unrecognized":
         session['username'] = name
         user_manager.set_current_user(name)
@@ -494,13 +436,28 @@ def recognize_face_route():
 @app.route('/face/register', methods=['POST'])
 def register_face_route():
     success, message = face_recognizer.save_face_sample(request.json.get('username'), request.json.get('image_data'))
-    return jsonify({"message": message} if success else {"status": message})
+    if success: return jsonify({"message": message})
+    # Failures are non-2xx so the registration page shows them; 409 = duplicate frame, keep capturing
+    return jsonify({"status": message, "duplicate": message == DUPLICATE_SAMPLE}), 409 if message == DUPLICATE_SAMPLE else 422
 
 @app.route('/face/train', methods=['POST'])
 def train_face_model_route():
     success, message = face_recognizer.train_model()
     return jsonify({"message": message} if success else {"error": message})
 
+@app.route('/face/remove', methods=['POST'])
+def remove_face_route():
+    """ Deletes the logged-in user's face samples (full retrain) and voice profiles. """
+    if 'username' not in session: return jsonify({"error": "Not logged in"}), 401
+    success, message = face_recognizer.remove_user(session['username'])
+    voice_authenticator.remove_voice(session['username'])
+    return jsonify({"message": message} if success else {"error": message})
+
+@app.errorhandler(TranscriptionQueueFull)
+def transcription_busy(e):
+    """ Whisper queue is full: tell the client to retry instead of piling up request threads. """
+    return jsonify({"status": "busy", "message": "Voice engine is busy, please try again."}), 503
+
 @app.route('/voice/enroll', methods=['POST'])
 def enroll_voice_route():
     if 'username' not in session: return jsonify({"error": "Not logged in"}), 401
@@ -514,414 +471,397 @@ def recognize_voice_route():
     name, _ = voice_authenticator.recognize_voice(request.files.get('audio_data').read())
     return jsonify({"name": name, "status": "recognized" if name == session.get('username') else "mismatch"})
 
-# Search for this function in your app.py and replace it with this:
+@app.route('/voice/wake_word', methods=['GET', 'POST'])
+def enroll_wake_word_route():
+    if 'username' not in session: return jsonify({"error": "Not logged in"}), 401
+    if request.method == 'GET':
+        return jsonify({"templates": len(voice_authenticator.wake_word.templates),
+                        "warning": voice_authenticator.wake_word_warning()})
+    if 'audio_data' not in request.files: return jsonify({"error": "No audio file provided."}), 400
+    success, message = voice_authenticator.enroll_wake_word(request.files['audio_data'].read())
+    return jsonify({"message": message} if success else {"error": message})
+
+@app.route('/voice/trigger', methods=['POST'])
+def check_trigger_route():
+    if 'audio_data' not in request.files: return jsonify({"status": "error"}), 400
+    triggered = voice_authenticator.check_trigger_phrase(request.files['audio_data'].read())
+    return jsonify({"triggered": triggered, "warning": voice_authenticator.wake_word_warning()})
+
 @app.route('/voice/listen', methods=['POST'])
 def listen_route():
     if 'audio_data' not in request.files: return jsonify({"status": "error"}), 400
-    
-    # Filenames
-    webm_filename = "temp_audio.webm"
-    wav_filename = "temp_audio.wav"
 
     try:
-        audio_file = request.files['audio_data']
-        audio_file.save(webm_filename) # Save the WebM file from browser
+        # Decode the browser's WebM in memory (ffmpeg over stdin/stdout) -- no temp files to collide on
+        audio = decode_audio_bytes(request.files['audio_data'].read())
+    except RuntimeError as conversion_error:
+        print(f"🔴 FFmpeg Conversion Error: {conversion_error}")
+        return jsonify({"status": "error", "message": "FFmpeg missing or conversion failed"}), 500
 
-        # 🚀 CRITICAL FIX: Convert WebM to WAV for SpeechRecognition
-        # This requires FFmpeg installed on your system!
-        try:
-            sound = AudioSegment.from_file(webm_filename)
-            sound.export(wav_filename, format="wav")
-        except Exception as conversion_error:
-            print(f"🔴 FFmpeg Conversion Error: {conversion_error}")
-            return jsonify({"status": "error", "message": "FFmpeg missing or conversion failed"}), 500
-
-        # Now recognize the WAV file
-        with sr.AudioFile(wav_filename) as source:
-            recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            audio = recognizer.record(source)
-            text = recognizer.recognize_google(audio)
-            print(f"🎤 Heard: {text}")
-        
-        # Cleanup
-        if os.path.exists(webm_filename): os.remove(webm_filename)
-        if os.path.exists(wav_filename): os.remove(wav_filename)
-        
+    try:
+        # Ambient-noise profile is learned once per session and slowly tracked, instead of 0.5 s of every clip
+        clip_floor = noise_floor_db(audio) if audio.size else -100.0
+        floor = session.get('noise_floor_db')
+        floor = clip_floor if floor is None else 0.8 * floor + 0.2 * min(clip_floor, floor + 6.0)
+        session['noise_floor_db'] = floor
+
+        speech = noise_gate(audio, floor)
+        text = voice_authenticator.transcriber.transcribe(speech) if speech.size else ""
+        if not text:
+            return jsonify({"status": "error", "message": "Could not understand audio"}), 500
+
+        print(f"🎤 Heard: {text}")
         return jsonify({"status": "success", "text": text})
 
-    except sr.UnknownValueError:
-        return jsonify({"status": "error", "message": "Could not understand audio"}), 500
+    except TranscriptionQueueFull:
+        raise # Answered with 503 by transcription_busy()
     except Exception as e:
         print(f"🔴 Voice Error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 # --- 🚀 STEP 8: PROACTIVE PULSE LOGIC ---
-last_pulse_check = time.time()
+def describe_pulse(filename):
+    """ Friendly proactive message for a new workspace file. """
+    if filename.endswith(".py") or filename.endswith(".js"):
+        return f"Ooh, you're coding in {filename}. Need me to check for bugs?"
+    elif "vision_memory" in filename:
+        return "I just memorized that image. Ask me anything about it!"
+    return f"I see you're working on {filename}. That looks interesting."
+
+# Cursors live with the client (session cookie / SSE Last-Event-ID), not in a process global,
+# so a reconnecting client resumes where it left off and every new file is announced exactly once per client.
+pulse_channel = PulseChannel(workspace_index, describe_pulse, max_subscribers=MAX_PULSE_STREAMS)
 
 @app.route('/check_pulse', methods=['GET'])
 def check_pulse():
-    global last_pulse_check
-    workspace = app.config['WORKSPACE_FOLDER']
+    cursor = session.get('pulse_cursor') or pulse_channel.head()
     
     new_files = []
     try:
-        # Scan workspace for files modified since the last check
-        for f in os.listdir(workspace):
-            f_path = os.path.join(workspace, f)
-            if os.path.isfile(f_path):
-                if os.path.getmtime(f_path) > last_pulse_check:
-                    new_files.append(f)
+        # Files modified since this client's last check, answered from the workspace index
+        new_files = pulse_channel.pending(cursor)
     except Exception as e:
         print(f"Pulse Error: {e}")
 
-    last_pulse_check = time.time()
-    
     if new_files:
-        filename = new_files[0]
-        # Friendly Messages
-        if filename.endswith(".py") or filename.endswith(".js"):
-            msg = f"Ooh, you're coding in {filename}. Need me to check for bugs?"
-        elif "vision_memory" in filename:
-            msg = "I just memorized that image. Ask me anything about it!"
-        else:
-            msg = f"I see you're working on {filename}. That looks interesting."
-            
+        item_cursor, filename, msg = new_files[0]
+        session['pulse_cursor'] = item_cursor # The rest are announced on the next polls
         return jsonify({"found": True, "message": msg})
     
+    session['pulse_cursor'] = cursor
     return jsonify({"found": False})
 
-# --- CORE AI LOGIC (COMBINED) ---
-@app.route('/ask', methods=['POST'])
-def ask():
-    if 'username' not in session: return jsonify({"type": "simple_text", "spoken_text": "Login first."}), 401
-    
-    user_input = request.json.get('prompt')
-    if not user_input: return jsonify({"error": "No prompt"}), 400
-    
-    print(f"👤 User: {user_input}") 
-
-    # --- GSOC DEMO INTERCEPTOR (FORCE DRONE COMMANDS) ---
-    # This bypasses the slow AI to guarantee the demo works instantly.
-    user_lower = user_input.lower()
-    
-    forced_data = None
-    
-    if "drone" in user_lower or "take off" in user_lower or "land" in user_lower:
-        print("🚀 FAST TRACK: Detected Drone Command!")
-        
-        if "connect" in user_lower:
-            forced_data = {"type": "drone_control", "command": "connect", "spoken_text": "Connecting to drone."}
-        
-        elif "take off" in user_lower:
-            # Extract altitude number (e.g., "20 meters" -> 20)
-            numbers = re.findall(r'\d+', user_lower)
-            alt = int(numbers[0]) if numbers else 10
-            forced_data = {"type": "drone_control", "command": "takeoff", "altitude": alt, "spoken_text": f"Taking off to {alt} meters."}
-            
-        elif "land" in user_lower:
-             forced_data = {"type": "drone_control", "command": "land", "spoken_text": "Landing now."}
-             
-        elif "return" in user_lower or "rtl" in user_lower:
-             forced_data = {"type": "drone_control", "command": "rtl", "spoken_text": "Returning to launch."}
-
-    # -----------------------------------------------------
+@app.route('/pulse/stream', methods=['GET'])
+def pulse_stream():
+    """ Server-push replacement for /check_pulse polling (EventSource). Idle clients just block on a condition,
+    but each holds a server thread: past MAX_PULSE_STREAMS the client gets 503 and keeps polling /check_pulse. """
+    if pulse_channel.full():
+        return jsonify({"error": "Too many pulse streams open; poll /check_pulse instead."}), 503, {'Retry-After': '30'}
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since') or session.get('pulse_cursor')
+    return Response(pulse_channel.stream(cursor), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-    if 'history' not in session: session['history'] = []
-    history = session['history']
-    # Format history for LLM context
-    history_str = "\n".join([f"User: {h['prompt']}\nBuddy: {h['response']}" for h in history[-5:]]) 
-    
+# --- CORE AI LOGIC (COMBINED) ---
+def route_intent(user_input):
+    """ Runs the deterministic intent router; returns the action JSON or None to use the LLM. """
+    routed = intent_router.route(user_input)
+    if not routed: return None
+    data, confidence, route_name = routed
+    print(f"🚀 FAST TRACK: {route_name} (confidence {confidence})")
+    return data
+
+def wants_recent_vision(user_input):
+    """ True when the prompt is about a photo the user just showed us. """
+    return any(kw in user_input.lower() for kw in ["photo", "image", "picture", "see", "look"])
+
+# --- PARALLEL CONTEXT PROVIDERS (Each gets its own deadline inside one shared budget) ---
+context_gatherer = ContextGatherer(budget=1.6)
+context_gatherer.register("pathway", lambda req: ask_pathway_brain(req["user_input"]), deadline=1.5)
+context_gatherer.register("visual_memory", lambda req: get_recent_visual_memory() if wants_recent_vision(req["user_input"]) else None, deadline=0.5)
+context_gatherer.register("history", lambda req: req["history"][-5:], deadline=0.1)
+
+def build_rag_context(user_input, history):
+    """ Gathers Pathway memory, recent visual memory and history concurrently.
+    Returns (LIVE CONTEXT block, history turns to send). """
     # --- 🔒 LOGIC FIX: PREVENT OLD MEMORY LEAKS ---
     # If user asks about the SCREEN, we must DISABLE Pathway RAG.
     # Otherwise, Pathway will fetch old "vision_memory" files (like the two people)
     # and confuse Buddy.
     
-    live_memory = ""
-    recent_vision = None
-    
     # Check if user is asking about the screen/monitor
     is_screen_request = "screen" in user_input.lower() or "monitor" in user_input.lower()
     
     if is_screen_request:
         print("🚫 Visual Request Detected: Disabling RAG/Memory to force fresh Screen Capture.")
-        live_memory = "" # Force empty memory so it doesn't read old files
-        rag_context_str = "CONTEXT: User wants you to look at the CURRENT screen. IGNORE past memories."
+        return "CONTEXT: User wants you to look at the CURRENT screen. IGNORE past memories.", history[-5:]
+
+    # Only use Memory/RAG for non-screen questions. Whatever isn't back when the budget expires is skipped.
+    gathered = context_gatherer.gather({"user_input": user_input, "history": history})
+    live_memory = gathered.get("pathway")
+    recent_vision = gathered.get("visual_memory")
+
+    # Combine Contexts
+    rag_context_str = ""
+    if recent_vision:
+        rag_context_str += f"\n*** URGENT: USER JUST UPLOADED THIS IMAGE ***\n{recent_vision}\n"
+        print("✅ Injected MOST RECENT VISUAL MEMORY directly.")
     
-    else:
-        # Only use Memory/RAG for non-screen questions
-        live_memory = ask_pathway_brain(user_input)
-        
-        # Check for RECENT photo uploads (only if NOT asking about screen)
-        if any(kw in user_input.lower() for kw in ["photo", "image", "picture", "see", "look"]):
-            recent_vision = get_recent_visual_memory()
-
-        # Combine Contexts
-        rag_context_str = ""
-        if recent_vision:
-            rag_context_str += f"\n*** URGENT: USER JUST UPLOADED THIS IMAGE ***\n{recent_vision}\n"
-            print("✅ Injected MOST RECENT VISUAL MEMORY directly.")
-        
-        if live_memory:
-            rag_context_str += f"\n--- OTHER MEMORY ---\n{live_memory}"
+    if live_memory:
+        rag_context_str += f"\n--- OTHER MEMORY ---\n{live_memory}"
 
-        if not rag_context_str: rag_context_str = "No relevant memory found."
+    if not rag_context_str: rag_context_str = "No relevant memory found."
+    return rag_context_str, gathered.get("history", history[-5:])
 
-    # --- 2. BUILD FINAL PROMPT (INJECTING CONTEXT) ---
+LLM_GLITCH_TEXT = "I understood you, but I had a glitch generating the action."
+
+def parse_llm_json(raw_content):
+    """ Parses the model's JSON answer, falling back to a spoken apology. """
     try:
-        final_prompt = SYSTEM_PROMPT.format(
-            rag_context=rag_context_str,
-            conversation_history=history_str,
-            user_input=user_input
-        )
-    except Exception as e:
-        print(f"Format Error: {e}")
-        final_prompt = f"{SYSTEM_PROMPT}\n\nUSER PROMPT: {user_input}"
+        return json.loads(clean_json_response(raw_content))
+    except json.JSONDecodeError as json_err:
+        print(f"🔴 JSON Parse Failed: {json_err}")
+        return {"type": "simple_text", "spoken_text": LLM_GLITCH_TEXT}
+
+def cache_llm_answer(user_input, fingerprint, data):
+    """ Stores a parsed LLM answer (before actions run) unless parsing failed. """
+    if data.get("spoken_text") != LLM_GLITCH_TEXT:
+        response_cache.put(user_input, fingerprint, data)
+
+def execute_action(data, user_input):
+    """ Runs the side effects for an LLM action and fills in the spoken reply. """
+    print(f"🤖 Action: {data.get('type')}")
+
+    # 4. EXECUTE ACTIONS
+    if data.get("type") == "create_skill":
+        task_name = data.get("task_name")
+        code_content = data.get("code")
+        skill_manager.learn_new_skill(task_name, code_content)
+        result = skill_manager.execute_skill(task_name)
+        data["spoken_text"] = f"I have learned how to {task_name}. The result is: {result}"
+        data["animation_name"] = "Typing"
+
+    elif data.get("type") == "system_control":
+        cmd = data.get("command")
+        target = data.get("target")
+        browser = data.get("browser", "msedge")
+        try:
+            if cmd == "open_url":
+                if "edge" in browser.lower(): subprocess.run(f"start msedge {target}", shell=True)
+                elif "chrome" in browser.lower(): subprocess.run(f"start chrome {target}", shell=True)
+                else: subprocess.run(f"start {target}", shell=True)
+                data["spoken_text"] = "Opening."
+            elif cmd == "open_app":
+                target_lower = target.lower().strip()
+                if "settings" in target_lower:
+                    subprocess.run("start ms-settings:", shell=True)
+                    data["spoken_text"] = "Opening Settings."
+                elif "vsc" in target_lower or "code" in target_lower:
+                    try: subprocess.run("code", shell=True)
+                    except: open_app("visual studio code", match_closest=True)
+                    data["spoken_text"] = "Opening VSC."
+                else:
+                    open_app(target, match_closest=True)
+                    data["spoken_text"] = f"Opening {target}."
+            elif cmd == "type_text":
+                if target != "{{user_input}}": 
+                    pyautogui.write(target, interval=0.01)
+                    data["spoken_text"] = "Typing."
+            elif cmd == "close_app":
+                subprocess.run(f"taskkill /F /IM {target}.exe", shell=True)
+                data["spoken_text"] = f"Closing {target}."
+            elif cmd == "press_key":
+                if "+" in target: pyautogui.hotkey(*target.split("+"))
+                else: pyautogui.press(target)
+                data["spoken_text"] = "Executed."
+        except Exception as e:
+            print(f"System Control Error: {e}")
+            data["spoken_text"] = "I couldn't do that system action."
+    
+    # --- DRONE CONTROL (GSOC ARDUPILOT ADDITION) ---
+    # Commands are queued on the drone thread; poll /drone/status/<command_id> for the outcome
+    elif data.get("type") == "drone_control":
+        cmd = data.get("command")
         
-    try:
-        # 3. LOCAL BRAIN (Ollama) OR FORCED DRONE CMD
-        if forced_data:
-            data = forced_data
-            print("🤖 Action: FORCED DRONE CONTROL")
-        else:
-            start_time = time.time()
-            response = ollama.chat(model=LOCAL_MODEL, messages=[
-                {'role': 'user', 'content': final_prompt}
-            ], format='json', keep_alive='24h')
-            print(f"🧠 Brain Time: {round(time.time() - start_time, 2)}s")
-            
-            raw_content = response['message']['content']
+        if not DRONE_AVAILABLE:
+            data["spoken_text"] = "DroneKit library is missing."
+        elif cmd not in drone.handlers:
+            data["spoken_text"] = "I don't know that drone command."
+        elif cmd != "connect" and not drone.accepting_commands():
+            data["spoken_text"] = "The drone is not connected yet."
+        elif cmd == "mission":
             try:
-                data = json.loads(clean_json_response(raw_content))
-            except json.JSONDecodeError as json_err:
-                print(f"🔴 JSON Parse Failed: {json_err}")
-                data = {"type": "simple_text", "spoken_text": "I understood you, but I had a glitch generating the action."}
-
-        print(f"🤖 Action: {data.get('type')}")
-
-        # 4. EXECUTE ACTIONS
-        if data.get("type") == "create_skill":
-            task_name = data.get("task_name")
-            code_content = data.get("code")
-            skill_manager.learn_new_skill(task_name, code_content)
-            result = skill_manager.execute_skill(task_name)
-            data["spoken_text"] = f"I have learned how to {task_name}. The result is: {result}"
-            data["animation_name"] = "Typing"
-
-        elif data.get("type") == "system_control":
-            cmd = data.get("command")
-            target = data.get("target")
-            browser = data.get("browser", "msedge")
+                waypoints = parse_mission(data.get("waypoints") or user_input, default_alt=data.get("altitude", 10))
+                data["command_id"] = drone.submit("mission", waypoints=waypoints)
+                data["spoken_text"] = f"Uploading a {len(waypoints)} waypoint mission."
+            except ValueError as e:
+                data["spoken_text"] = f"I couldn't read that mission. {e}"
+        else:
+            params = {"altitude": data.get("altitude", 10)} if cmd == "takeoff" else {}
+            data["command_id"] = drone.submit(cmd, **params)
+            data["spoken_text"] = {
+                "connect": "Connecting to the drone simulator.",
+                "takeoff": f"Taking off to {params.get('altitude')} meters.",
+                "land": "Initiating landing sequence.",
+                "rtl": "Returning to Launch.",
+            }[cmd]
+            if cmd == "connect": data["animation_name"] = "Happy"
+
+    elif data.get("type") == "look_at_screen":
+        # If screen_data is NOT provided (real-time screen check)
+        if "screen_data" not in data:
             try:
-                if cmd == "open_url":
-                    if "edge" in browser.lower(): subprocess.run(f"start msedge {target}", shell=True)
-                    elif "chrome" in browser.lower(): subprocess.run(f"start chrome {target}", shell=True)
-                    else: subprocess.run(f"start {target}", shell=True)
-                    data["spoken_text"] = "Opening."
-                elif cmd == "open_app":
-                    target_lower = target.lower().strip()
-                    if "settings" in target_lower:
-                        subprocess.run("start ms-settings:", shell=True)
-                        data["spoken_text"] = "Opening Settings."
-                    elif "vsc" in target_lower or "code" in target_lower:
-                        try: subprocess.run("code", shell=True)
-                        except: open_app("visual studio code", match_closest=True)
-                        data["spoken_text"] = "Opening VSC."
-                    else:
-                        open_app(target, match_closest=True)
-                        data["spoken_text"] = f"Opening {target}."
-                elif cmd == "type_text":
-                    if target != "{{user_input}}": 
-                        pyautogui.write(target, interval=0.01)
-                        data["spoken_text"] = "Typing."
-                elif cmd == "close_app":
-                    subprocess.run(f"taskkill /F /IM {target}.exe", shell=True)
-                    data["spoken_text"] = f"Closing {target}."
-                elif cmd == "press_key":
-                    if "+" in target: pyautogui.hotkey(*target.split("+"))
-                    else: pyautogui.press(target)
-                    data["spoken_text"] = "Executed."
+                # 1. Capture Screen
+                screen_bytes = capture_screen()
+                
+                print("👀 Analyzing screen with Gemini Flash...")
+                if not GEMINI_API_KEY: raise Exception("Gemini Key Missing")
+
+                model = genai.GenerativeModel(GEMINI_VISION_MODEL_LITE)
+                
+                # 2. Detailed Developer Prompt
+                prompt = """
+                You are looking at the user's computer screen. 
+                Analyze it like a developer.
+                
+                1. Identify active windows (VS Code, Browser, Terminal).
+                2. Read visible code, error logs, or specific text content.
+                3. Determine the user's current task.
+                
+                Output STRICT JSON: 
+                {"short_summary": "A natural, direct summary of what is on the screen.", 
+                 "detailed_analysis": "A detailed report including specific text, code, and context found."}
+                """
+                
+                res = model.generate_content(
+                    [prompt, {"mime_type": "image/png", "data": screen_bytes}],
+                    generation_config={"response_mime_type": "application/json"}
+                )
+                
+                vis_text = res.text
+                
+                # 3. 💾 SAVE TO MEMORY (So Pathway can read it next time)
+                memory_filename = f"screen_memory_{int(time.time())}.txt"
+                memory_path = os.path.join(app.config['WORKSPACE_FOLDER'], memory_filename)
+                
+                with open(memory_path, "w", encoding="utf-8") as f:
+                    f.write(f"--- SCREEN SHOT ANALYSIS ({time.ctime()}) ---\n{vis_text}")
+                
+                workspace_index.refresh(memory_filename)
+                print(f"✅ Screen memory saved: {memory_filename}")
+
+                # 4. Parse for immediate response
+                try: vis_data = json.loads(clean_json_response(vis_text))
+                except: vis_data = {"short_summary": "I see your screen.", "detailed_analysis": vis_text}
+                
+                data["screen_data"] = vis_data
+                data["spoken_text"] = vis_data.get("short_summary", "I see your screen.")
+                
             except Exception as e:
-                print(f"System Control Error: {e}")
-                data["spoken_text"] = "I couldn't do that system action."
-        
-        # --- DRONE CONTROL (GSOC ARDUPILOT ADDITION) ---
-        elif data.get("type") == "drone_control":
-            cmd = data.get("command")
-            
-            # 1. CONNECT TO SITL (USING TCP TO BYPASS FIREWALL)
-            # 1. CONNECT TO SITL (USING TCP TO BYPASS FIREWALL)
-            if cmd == "connect":
-                if DRONE_AVAILABLE:
-                    try:
-                        # ⚠️ CHANGED TO TCP:127.0.0.1:5762 (More reliable for WSL)
-                        print("Attempting to connect to ArduPilot SITL via TCP...")
-                        global drone_vehicle
-                        # We use wait_ready=False so it doesn't freeze the whole app if connection fails
-                        drone_vehicle = connect('tcp:127.0.0.1:5762', wait_ready=False)
-                        
-                        # --- 🛠️ AUTO-FIX: DISABLE SAFETY CHECKS ---
-                        print("🔧 waiting for parameters...")
-                        drone_vehicle.wait_ready('parameters') # Wait for params to load
-                        print("🔧 Disabling Safety Checks via Code...")
-                        drone_vehicle.parameters['ARMING_CHECK'] = 0
-                        # ------------------------------------------
-
-                        data["spoken_text"] = "Connection established. Safety checks disabled. Drone is ready."
-                        data["animation_name"] = "Happy"
-                    except Exception as e:
-                        print(f"Drone Connection Error: {e}")
-                        data["spoken_text"] = "I could not find the drone simulator. Is SITL running?"
-                else:
-                    data["spoken_text"] = "DroneKit library is missing."
-
-            # 2. TAKEOFF (ROBUST FORCE-ARM VERSION)
-            elif cmd == "takeoff":
-                if drone_vehicle:
-                    alt = data.get("altitude", 10)
-                    try:
-                        print("⚙️ Forcing GUIDED mode...")
-                        drone_vehicle.mode = VehicleMode("GUIDED")
-                        time.sleep(0.5) 
-                        
-                        print("⚙️ Forcing ARM...")
-                        drone_vehicle.armed = True
-                        
-                        # Wait loop to ensure arming happens
-                        for i in range(3):
-                            if drone_vehicle.armed: break
-                            print("... waiting for arming ...")
-                            time.sleep(1)
-                            drone_vehicle.armed = True # retry
-                        
-                        if drone_vehicle.armed:
-                            print("🚀 ARMED. TAKING OFF!")
-                            drone_vehicle.simple_takeoff(alt)
-                            data["spoken_text"] = f"Taking off to {alt} meters."
-                        else:
-                            print("❌ FAILED TO ARM. CHECK SITL CONSOLE.")
-                            data["spoken_text"] = "I tried, but the drone refused to arm. Check safety switches."
-                    except Exception as e:
-                         data["spoken_text"] = f"Takeoff failed: {e}"
-                else:
-                    data["spoken_text"] = "The drone is not connected yet."
+                print(f"Vision Error: {e}")
+                data["spoken_text"] = "I couldn't analyze the screen with Gemini."
+    elif data.get("type") == "hologram_topic":
+        term = data.get("fallback_image_search")
+        if term: 
+            img_url = fetch_google_image_url(term)
+            data["image_url"] = img_url if img_url else "https://via.placeholder.com/400x300?text=No+Image+Found"
+
+    elif data.get("type") == "comparison_topic":
+        entities = data.get("entities", [])
+        if len(entities) > 0:
+            url1 = fetch_google_image_url(entities[0].get("search_term"))
+            data["image_url_1"] = url1 if url1 else "https://via.placeholder.com/400?text=No+Image"
+            data["label_1"] = entities[0].get("label", "Entity 1")
+        if len(entities) > 1:
+            url2 = fetch_google_image_url(entities[1].get("search_term"))
+            data["image_url_2"] = url2 if url2 else "https://via.placeholder.com/400?text=No+Image"
+            data["label_2"] = entities[1].get("label", "Entity 2")
+
+    elif data.get("type") == "change_background":
+        kw = data.get("keyword")
+        bg_path = os.path.join(app.static_folder, 'backgrounds', f"{kw}.png")
+        if os.path.exists(bg_path):
+            data["image_url"] = f"/static/backgrounds/{kw}.png"
+            data["spoken_text"] = f"Going to {kw}."
+        else: data["spoken_text"] = f"I don't have a {kw} background."
+
+    elif data.get("type") == "play_movie":
+        url, title = search_movie_tmdb(data.get("movie_title"))
+        if url: 
+            data["movie_url"] = url
+            data["movie_title"] = title
+            data["spoken_text"] = f"Playing {title}."
+        else: data["spoken_text"] = "Movie not found."
+
+    elif data.get("type") == "play_youtube":
+        url, title = search_youtube(data.get("search_query"))
+        if url: 
+            data["movie_url"] = url
+            data["spoken_text"] = f"Playing {title}."
+        else: data["spoken_text"] = "Video not found."
+
+    elif data.get("type") == "get_weather":
+        return get_weather(data["city"])
+    
+    elif data.get("type") == "sing_song":
+        data["spoken_text"] = "Twinkle, twinkle, little star, how I wonder what you are."
 
-            # 3. LAND / RTL
-            elif cmd == "land":
-                if drone_vehicle:
-                    drone_vehicle.mode = VehicleMode("LAND")
-                    data["spoken_text"] = "Initiating landing sequence."
-                else:
-                    data["spoken_text"] = "Drone not connected."
-            
-            elif cmd == "rtl":
-                if drone_vehicle:
-                    drone_vehicle.mode = VehicleMode("RTL")
-                    data["spoken_text"] = "Returning to Launch."
-                else:
-                    data["spoken_text"] = "Drone not connected."
-
-        elif data.get("type") == "look_at_screen":
-            # If screen_data is NOT provided (real-time screen check)
-            if "screen_data" not in data:
-                try:
-                    # 1. Capture Screen
-                    screen_bytes = capture_screen()
-                    
-                    print("👀 Analyzing screen with Gemini Flash...")
-                    if not GEMINI_API_KEY: raise Exception("Gemini Key Missing")
-
-                    model = genai.GenerativeModel(GEMINI_VISION_MODEL_LITE)
-                    
-                    # 2. Detailed Developer Prompt
-                    prompt = """
-                    You are looking at the user's computer screen. 
-                    Analyze it like a developer.
-                    
-                    1. Identify active windows (VS Code, Browser, Terminal).
-                    2. Read visible code, error logs, or specific text content.
-                    3. Determine the user's current task.
-                    
-                    Output STRICT JSON: 
-                    {"short_summary": "A natural, direct summary of what is on the screen.", 
-                     "detailed_analysis": "A detailed report including specific text, code, and context found."}
-                    """
-                    
-                    res = model.generate_content(
-                        [prompt, {"mime_type": "image/png", "data": screen_bytes}],
-                        generation_config={"response_mime_type": "application/json"}
-                    )
-                    
-                    vis_text = res.text
-                    
-                    # 3. 💾 SAVE TO MEMORY (So Pathway can read it next time)
-                    memory_filename = f"screen_memory_{int(time.time())}.txt"
-                    memory_path = os.path.join(app.config['WORKSPACE_FOLDER'], memory_filename)
-                    
-                    with open(memory_path, "w", encoding="utf-8") as f:
-                        f.write(f"--- SCREEN SHOT ANALYSIS ({time.ctime()}) ---\n{vis_text}")
-                    
-                    print(f"✅ Screen memory saved: {memory_filename}")
-
-                    # 4. Parse for immediate response
-                    try: vis_data = json.loads(clean_json_response(vis_text))
-                    except: vis_data = {"short_summary": "I see your screen.", "detailed_analysis": vis_text}
-                    
-                    data["screen_data"] = vis_data
-                    data["spoken_text"] = vis_data.get("short_summary", "I see your screen.")
-                    
-                except Exception as e:
-                    print(f"Vision Error: {e}")
-                    data["spoken_text"] = "I couldn't analyze the screen with Gemini."
-        elif data.get("type") == "hologram_topic":
-            term = data.get("fallback_image_search")
-            if term: 
-                img_url = fetch_google_image_url(term)
-                data["image_url"] = img_url if img_url else "https://via.placeholder.com/400x300?text=No+Image+Found"
-
-        elif data.get("type") == "comparison_topic":
-            entities = data.get("entities", [])
-            if len(entities) > 0:
-                url1 = fetch_google_image_url(entities[0].get("search_term"))
-                data["image_url_1"] = url1 if url1 else "https://via.placeholder.com/400?text=No+Image"
-                data["label_1"] = entities[0].get("label", "Entity 1")
-            if len(entities) > 1:
-                url2 = fetch_google_image_url(entities[1].get("search_term"))
-                data["image_url_2"] = url2 if url2 else "https://via.placeholder.com/400?text=No+Image"
-                data["label_2"] = entities[1].get("label", "Entity 2")
-
-        elif data.get("type") == "change_background":
-            kw = data.get("keyword")
-            bg_path = os.path.join(app.static_folder, 'backgrounds', f"{kw}.png")
-            if os.path.exists(bg_path):
-                data["image_url"] = f"/static/backgrounds/{kw}.png"
-                data["spoken_text"] = f"Going to {kw}."
-            else: data["spoken_text"] = f"I don't have a {kw} background."
-
-        elif data.get("type") == "play_movie":
-            url, title = search_movie_tmdb(data.get("movie_title"))
-            if url: 
-                data["movie_url"] = url
-                data["movie_title"] = title
-                data["spoken_text"] = f"Playing {title}."
-            else: data["spoken_text"] = "Movie not found."
-
-        elif data.get("type") == "play_youtube":
-            url, title = search_youtube(data.get("search_query"))
-            if url: 
-                data["movie_url"] = url
-                data["spoken_text"] = f"Playing {title}."
-            else: data["spoken_text"] = "Video not found."
-
-        elif data.get("type") == "get_weather":
-            return jsonify(get_weather(data["city"]))
-        
-        elif data.get("type") == "sing_song":
-            data["spoken_text"] = "Twinkle, twinkle, little star, how I wonder what you are."
+    return data
+
+def remember_turn(history, user_input, data):
+    """ Appends the finished turn to the session history. """
+    if "spoken_text" in data:
+        history.append({"prompt": user_input, "response": data["spoken_text"]})
+        if len(history) > 10: history.pop(0) # Keep history manageable
+        session['history'] = history
+
+def sse_event(event, payload):
+    """ Formats one Server-Sent Event frame. """
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/ask', methods=['POST'])
+def ask():
+    if 'username' not in session: return jsonify({"type": "simple_text", "spoken_text": "Login first."}), 401
+    
+    user_input = request.json.get('prompt')
+    if not user_input: return jsonify({"error": "No prompt"}), 400
+    
+    print(f"👤 User: {user_input}") 
+
+    # --- FAST-PATH INTENT ROUTER (Deterministic commands skip the LLM) ---
+    forced_data = route_intent(user_input)
+
+    if 'history' not in session: session['history'] = []
+    history = session['history']
         
+    try:
+        # 3. LOCAL BRAIN (Ollama) OR FAST-PATH ROUTED CMD
+        if forced_data:
+            data = forced_data
+            print("🤖 Action: FAST-PATH ROUTED")
+        else:
+            rag_context_str, recent_history = build_rag_context(user_input, history)
+
+            # --- RESPONSE CACHE (Same prompt + same context = same answer) ---
+            fingerprint = response_cache.fingerprint(rag_context_str, recent_history[-HISTORY_TURNS:])
+            data = response_cache.get(user_input, fingerprint)
+            if data:
+                print("⚡ Action: CACHED RESPONSE")
+            else:
+                # --- 2. BUILD MESSAGES (STATIC SYSTEM PREFIX + NEW TURN) ---
+                messages = build_messages(user_input, rag_context_str, recent_history)
+
+                start_time = time.time()
+                response = ollama.chat(model=LOCAL_MODEL, messages=messages,
+                                       format='json', keep_alive='24h', options=CHAT_OPTIONS)
+                print(f"🧠 Brain Time: {round(time.time() - start_time, 2)}s "
+                      f"(prompt eval: {response.get('prompt_eval_count', '?')} new tokens)")
+                
+                data = parse_llm_json(response['message']['content'])
+                cache_llm_answer(user_input, fingerprint, data)
+
+        data = execute_action(data, user_input)
+
         # Update History
-        if "spoken_text" in data:
-            history.append({"prompt": user_input, "response": data["spoken_text"]})
-            if len(history) > 10: history.pop(0) # Keep history manageable
-            session['history'] = history
+        remember_turn(history, user_input, data)
         
         return jsonify(data)
 
@@ -929,6 +869,121 @@ def ask():
         print(f"🔴 Handler Error: {e}")
         return jsonify({"type": "simple_text", "spoken_text": "I'm having a bit of trouble thinking."})
 
+# --- STREAMING AI LOGIC (SSE) ---
+# Emits "type" and "spoken_text" as soon as the model has finished writing them,
+# so the avatar can start TTS/animations while the action fields are still generating.
+# NOTE: The session cookie is sent before the body, so streamed turns are not written
+# back to session['history']. The final "done" event carries the full action payload.
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    if 'username' not in session: return jsonify({"type": "simple_text", "spoken_text": "Login first."}), 401
+    
+    user_input = request.json.get('prompt')
+    if not user_input: return jsonify({"error": "No prompt"}), 400
+    
+    print(f"👤 User (stream): {user_input}") 
+
+    ready_data = route_intent(user_input)
+    history = list(session.get('history', []))
+    fingerprint, messages = None, None
+    if not ready_data:
+        rag_context_str, recent_history = build_rag_context(user_input, history)
+        fingerprint = response_cache.fingerprint(rag_context_str, recent_history[-HISTORY_TURNS:])
+        ready_data = response_cache.get(user_input, fingerprint)
+        if not ready_data: messages = build_messages(user_input, rag_context_str, recent_history)
+
+    def generate():
+        try:
+            if ready_data:
+                data = ready_data
+                for key in ("type", "spoken_text"):
+                    if key in data: yield sse_event("field", {key: data[key]})
+            else:
+                start_time = time.time()
+                streamer = JsonFieldStreamer(fields=("type", "spoken_text"))
+                chunks = []
+                for part in ollama.chat(model=LOCAL_MODEL, messages=messages, format='json',
+                                        keep_alive='24h', options=CHAT_OPTIONS, stream=True):
+                    piece = part['message']['content']
+                    chunks.append(piece)
+                    for key, value in streamer.feed(piece):
+                        print(f"⚡ Streamed '{key}' after {round(time.time() - start_time, 2)}s")
+                        yield sse_event("field", {key: value})
+                print(f"🧠 Brain Time (stream): {round(time.time() - start_time, 2)}s")
+                data = parse_llm_json("".join(chunks))
+                cache_llm_answer(user_input, fingerprint, data)
+
+            yield sse_event("done", execute_action(data, user_input))
+        except Exception as e:
+            print(f"🔴 Stream Handler Error: {e}")
+            yield sse_event("done", {"type": "simple_text", "spoken_text": "I'm having a bit of trouble thinking."})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# --- DRONE STATUS ---
+@app.route('/drone/status/<command_id>', methods=['GET'])
+def drone_status_route(command_id):
+    status = drone.status(command_id)
+    return jsonify(status) if status else (jsonify({"error": "Unknown command id"}), 404)
+
+@app.route('/drone/telemetry', methods=['GET'])
+def drone_telemetry_route():
+    return jsonify(drone.telemetry())
+
+@app.route('/drone/mission', methods=['GET', 'POST'])
+def drone_mission_route():
+    """ POST a .waypoints / .plan / JSON file ('file'), a JSON body ({"waypoints": [...]} or {"text": "..."}); GET progress. """
+    if request.method == 'GET':
+        return jsonify(drone.mission.snapshot())
+    if not drone.accepting_commands():
+        return jsonify({"error": "The drone is not connected yet."}), 409
+    try:
+        if 'file' in request.files:
+            source = request.files['file'].read().decode('utf-8', errors='replace')
+        else:
+            body = request.get_json(silent=True) or {}
+            source = body.get("waypoints") or body.get("text") or ""
+        waypoints = parse_mission(source, default_alt=request.args.get('altitude', 10, type=float))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"command_id": drone.submit("mission", waypoints=waypoints), "items": len(waypoints)})
+
+@app.route('/drone/logs', methods=['GET'])
+def drone_logs_route():
+    return jsonify({"recording": flight_recorder.stats(), "logs": list_logs("flight_logs")})
+
+@app.route('/drone/logs/<session_id>', methods=['GET'])
+def drone_log_summary_route(session_id):
+    if session_id not in list_logs("flight_logs"):
+        return jsonify({"error": "Unknown flight log"}), 404
+    return jsonify(FlightLog(os.path.join("flight_logs", session_id)).summary())
+
+@app.route('/drone/telemetry/stream', methods=['GET'])
+def drone_telemetry_stream():
+    """ SSE telemetry feed: ?hz= caps this subscriber's event rate; events carry only changed fields.
+    At most MAX_TELEMETRY_STREAMS at once (each holds a server thread); past that, 503 and poll /drone/telemetry. """
+    if telemetry_stream.full():
+        return jsonify({"error": "Too many telemetry streams open; poll /drone/telemetry instead."}), 503, {'Retry-After': '30'}
+    hz = request.args.get('hz', 10, type=float)
+    return Response(telemetry_stream.stream(hz), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/drone/telemetry/history', methods=['GET'])
+def drone_telemetry_history():
+    seconds = request.args.get('seconds', 60, type=float)
+    points = request.args.get('points', 500, type=int)
+    return jsonify(telemetry_stream.history(seconds, points))
+
+# --- METRICS ---
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({"intent_router": intent_router.stats(), "response_cache": response_cache.stats(),
+                    "context_providers": context_gatherer.stats(),
+                    "pathway": pathway_client.stats(), "wake_word": voice_authenticator.wake_word.stats(),
+                    "transcription": voice_authenticator.transcriber.stats(), "voice_index": voice_authenticator.stats(),
+                    "telemetry": telemetry_stream.stats(), "flight_recorder": flight_recorder.stats()})
+
 # --- VISION AUX ROUTES (LOCAL OLLAMA) ---
 @app.route('/describe-object', methods=['POST'])
 def describe_object_route():
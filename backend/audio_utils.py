@@ -0,0 +1,116 @@
+# audio_utils.py
+
+import io
+import subprocess
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from scipy.fft import dct
+from scipy.io.wavfile import read as read_wav
+from scipy.signal import resample_poly
+
+WHISPER_SAMPLE_RATE = 16000
+
+def to_float32_mono(data):
+    """Converts PCM samples of any common dtype/channel layout to mono float32 in [-1, 1]."""
+    if data.dtype == np.int16:
+        audio = data.astype(np.float32) / 32768.0
+    elif data.dtype == np.int32:
+        audio = data.astype(np.float32) / 2147483648.0
+    elif data.dtype == np.uint8:
+        audio = (data.astype(np.float32) - 128.0) / 128.0
+    else:
+        audio = data.astype(np.float32)
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    return audio
+
+def resample(audio, rate, target_rate=WHISPER_SAMPLE_RATE):
+    if rate == target_rate:
+        return audio.astype(np.float32, copy=False)
+    g = gcd(int(rate), int(target_rate))
+    return resample_poly(audio, target_rate // g, rate // g).astype(np.float32)
+
+def ffmpeg_decode(audio_bytes, sample_rate=WHISPER_SAMPLE_RATE):
+    """Decodes any container ffmpeg understands (WebM/Opus from the browser, OGG, MP3...)
+    by piping bytes through stdin/stdout. Nothing touches the disk."""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+           "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    try:
+        out = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True).stdout
+    except FileNotFoundError as e:
+        raise RuntimeError("FFmpeg is not installed or not on PATH") from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"FFmpeg could not decode audio: {e.stderr.decode(errors='ignore').strip()}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+def decode_audio_bytes(audio_bytes, sample_rate=WHISPER_SAMPLE_RATE):
+    """Decodes uploaded audio bytes to a mono float32 numpy array at sample_rate (what Whisper expects).
+    WAV is parsed in-process; everything else goes through an ffmpeg pipe."""
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        try:
+            rate, data = read_wav(io.BytesIO(audio_bytes))
+            return resample(to_float32_mono(data), rate, sample_rate)
+        except ValueError:
+            pass # WAV flavour scipy can't read (e.g. compressed) -> let ffmpeg handle it
+    return ffmpeg_decode(audio_bytes, sample_rate)
+
+# --- FEATURES (wake word / speaker embeddings) ---
+def frame_signal(audio, frame_len=400, hop=160):
+    """Zero-copy [n_frames, frame_len] view of the signal (25 ms / 10 ms at 16 kHz)."""
+    if len(audio) < frame_len:
+        audio = np.pad(audio, (0, frame_len - len(audio)))
+    n_frames = 1 + (len(audio) - frame_len) // hop
+    return np.lib.stride_tricks.as_strided(
+        audio, shape=(n_frames, frame_len), strides=(audio.strides[0] * hop, audio.strides[0]), writeable=False)
+
+def frame_energy_db(audio, frame_len=400, hop=160):
+    frames = frame_signal(np.ascontiguousarray(audio, dtype=np.float32), frame_len, hop)
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sample_rate=WHISPER_SAMPLE_RATE, n_fft=512, n_mels=26, fmin=20.0, fmax=None):
+    fmax = fmax or sample_rate / 2
+    mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)
+    hz = lambda m: 700.0 * (10 ** (m / 2595.0) - 1.0)
+    bins = np.floor((n_fft + 1) * hz(np.linspace(mel(fmin), mel(fmax), n_mels + 2)) / sample_rate).astype(int)
+    fb = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left: fb[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center: fb[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return fb
+
+@lru_cache(maxsize=8)
+def _hamming(frame_len):
+    return np.hamming(frame_len).astype(np.float32)
+
+def log_mel(audio, sample_rate=WHISPER_SAMPLE_RATE, frame_len=400, hop=160, n_fft=512, n_mels=26):
+    """[n_frames, n_mels] log mel filterbank energies (pre-emphasis + Hamming window)."""
+    audio = np.asarray(audio, dtype=np.float32)
+    emphasized = np.append(audio[:1], audio[1:] - 0.97 * audio[:-1]).astype(np.float32)
+    frames = frame_signal(emphasized, frame_len, hop) * _hamming(frame_len)
+    power = np.abs(np.fft.rfft(frames, n=n_fft)) ** 2 / n_fft
+    return np.log(power @ mel_filterbank(sample_rate, n_fft, n_mels).T + 1e-10).astype(np.float32)
+
+def mfcc(audio, sample_rate=WHISPER_SAMPLE_RATE, n_mfcc=13, frame_len=400, hop=160, n_fft=512, n_mels=26):
+    """[n_frames, n_mfcc] MFCCs: log-mel + DCT-II. Pure numpy/scipy."""
+    features = log_mel(audio, sample_rate, frame_len, hop, n_fft, n_mels)
+    return dct(features, type=2, axis=1, norm="ortho")[:, :n_mfcc].astype(np.float32)
+
+# --- NOISE GATE (/voice/listen) ---
+def noise_floor_db(audio, frame_len=400, hop=160):
+    """Ambient level of a clip: the 10th percentile of frame energies."""
+    return float(np.percentile(frame_energy_db(audio, frame_len, hop), 10))
+
+def noise_gate(audio, floor_db, margin_db=8.0, pad=0.15, sample_rate=WHISPER_SAMPLE_RATE, frame_len=400, hop=160):
+    """Trims leading/trailing audio that stays within margin_db of the noise floor.
+    Returns an empty array when nothing rises above it."""
+    voiced = np.flatnonzero(frame_energy_db(audio, frame_len, hop) > floor_db + margin_db)
+    if len(voiced) == 0:
+        return audio[:0]
+    pad_samples = int(pad * sample_rate)
+    start = max(voiced[0] * hop - pad_samples, 0)
+    end = min(voiced[-1] * hop + frame_len + pad_samples, len(audio))
+    return audio[start:end]
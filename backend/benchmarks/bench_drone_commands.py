@@ -0,0 +1,70 @@
+# bench_drone_commands.py
+# Checks that drone commands no longer block the caller: submit() must return an ID in microseconds
+# while the controller thread connects, arms and flies; telemetry reads must stay lock-free and cheap.
+# Runs against a local SITL (--connect tcp:127.0.0.1:5762) or the in-process stand-in (default).
+# Exits 1 if a command does not finish as "done" or submit() blocks for more than 10 ms (connecting alone takes seconds).
+#
+# Usage (from backend/):  python benchmarks/bench_drone_commands.py [--connect tcp:127.0.0.1:5762]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drone_controller import DroneController
+
+def wait_done(drone, command_id, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = drone.status(command_id)
+        if status["status"] in ("done", "failed", "aborted"):
+            return status
+        time.sleep(0.05)
+    return drone.status(command_id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connect", help="SITL connection string; omit to use the in-process stand-in")
+    parser.add_argument("--altitude", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.connect:
+        from dronekit import connect, VehicleMode
+        drone = DroneController(args.connect, connect_fn=connect, mode_factory=VehicleMode)
+    else:
+        from vehicle_standin import StandinMode, standin_connect
+        drone = DroneController("standin", connect_fn=standin_connect, mode_factory=StandinMode)
+
+    timings, failures = {}, []
+    for command, params in [("connect", {}), ("takeoff", {"altitude": args.altitude})]:
+        start = time.perf_counter()
+        command_id = drone.submit(command, **params)
+        timings[command] = (time.perf_counter() - start) * 1e6
+        status = wait_done(drone, command_id, timeout=60)
+        if status["status"] != "done":
+            print(f"🔴 {command}: {status['status']}: {status['message']}")
+            failures.append(f"{command} {status['status']}")
+            continue
+        print(f"✅ {command}: submit returned in {timings[command]:.0f} µs, "
+              f"{status['status']} after {status['finished'] - status['submitted']:.2f}s: {status['message']}")
+        if timings[command] > 10000: failures.append(f"{command} submit blocked for {timings[command]:.0f} µs")
+    if failures:
+        print(f"🔴 FAILED: {'; '.join(failures)}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    reads = 0
+    while time.perf_counter() - start < 1.0:
+        drone.telemetry()
+        reads += 1
+    print(f"📡 {reads / 1e6:.1f}M telemetry reads/s, snapshot: {drone.telemetry()}")
+
+    while drone.telemetry().get("alt", 0) < args.altitude * 0.95:
+        time.sleep(0.2)
+    land_id = drone.submit("land")
+    status = wait_done(drone, land_id, timeout=30)
+    print(f"🛬 land queued as #{land_id}: {status['message']}")
+    if status["status"] != "done":
+        print(f"🔴 FAILED: land {status['status']}")
+        sys.exit(1)
@@ -0,0 +1,129 @@
+# bench_drone_mission.py
+# End-to-end mission check with dozens of waypoints: builds a lawnmower survey, round-trips it through the
+# QGC WPL 110 parser, uploads it as one mission transaction, switches to AUTO and waits on MISSION_ITEM_REACHED
+# progress (no polling of the vehicle). Reports parse/upload times and checks every item was reached in order,
+# then starts the mission again and sends "land" mid-climb: land must pre-empt it instead of queueing behind it.
+# Finally land is sent right behind queued commands (connect + takeoff, takeoff + mission): it must wait for the
+# connect, cancel the queued flight commands and leave the drone landed. Exits 1 on any failure.
+# Runs against a local SITL (--connect tcp:127.0.0.1:5762) or the in-process stand-in (default).
+#
+# Usage (from backend/):  python benchmarks/bench_drone_mission.py [--connect tcp:127.0.0.1:5762] [--waypoints 48]
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drone_controller import DroneController
+from drone_mission import MAV_CMD_NAV_LAND, mission_item, parse_mission
+
+HOME = (-35.3632621, 149.1652374) # ArduPilot SITL default (CMAC)
+
+def survey(count, spacing, altitude):
+    """Lawnmower pattern of `count` waypoints, `spacing` meters apart, ending with a land."""
+    cols = max(2, int(math.sqrt(count)))
+    dlat = spacing / 111320.0
+    dlon = spacing / (111320.0 * math.cos(math.radians(HOME[0])))
+    points = []
+    for i in range(count):
+        row, col = divmod(i, cols)
+        if row % 2: col = cols - 1 - col
+        points.append(mission_item(HOME[0] + (row + 1) * dlat, HOME[1] + col * dlon, altitude))
+    points.append(mission_item(points[-1]["lat"], points[-1]["lon"], 0, command=MAV_CMD_NAV_LAND))
+    return points
+
+def to_waypoints_file(items):
+    rows = ["QGC WPL 110", f"0\t1\t0\t16\t0\t0\t0\t0\t{HOME[0]}\t{HOME[1]}\t0\t1"]
+    for i, w in enumerate(items, start=1):
+        rows.append("\t".join(str(v) for v in [i, 0, w["frame"], w["command"], *w["params"], w["lat"], w["lon"], w["alt"], 1]))
+    return "\n".join(rows)
+
+def make_drone(args):
+    if args.connect:
+        from dronekit import connect, VehicleMode, Command
+        return DroneController(args.connect, connect_fn=connect, mode_factory=VehicleMode, command_factory=Command)
+    from vehicle_standin import StandinCommand, StandinMode, standin_connect
+    return DroneController("standin", mode_factory=StandinMode, command_factory=StandinCommand,
+                           connect_fn=lambda c, wait_ready=False: standin_connect(c, rate_hz=50, speed=args.speed))
+
+def land_behind_queue(args, waypoints):
+    """Land submitted back to back with other commands; returns a list of failures."""
+    failures = []
+    for label, commands in [("connect, takeoff, land", [("connect", {}), ("takeoff", {"altitude": 20})]),
+                            ("takeoff, mission, land", [("takeoff", {"altitude": 15}), ("mission", {"waypoints": waypoints})])]:
+        drone = make_drone(args)
+        if commands[0][0] != "connect":
+            drone.submit("connect")
+            while not drone.connected: time.sleep(0.05)
+        ids = [drone.submit(command, **params) for command, params in commands] + [drone.submit("land")]
+        deadline = time.monotonic() + 60
+        while any(drone.status(i)["status"] in ("queued", "running") for i in ids) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        while drone.telemetry().get("armed") and time.monotonic() < deadline: time.sleep(0.1)
+        statuses = [(drone.status(i)["command"], drone.status(i)["status"]) for i in ids]
+        telemetry = drone.telemetry()
+        print(f"🛬 {label}: {statuses}, mode {telemetry.get('mode')}, armed {telemetry.get('armed')}")
+        if statuses[-1][1] != "done": failures.append(f"{label}: land {statuses[-1][1]}")
+        if any(status == "done" for command, status in statuses if command in ("takeoff", "mission")):
+            failures.append(f"{label}: a queued flight command still ran")
+        if telemetry.get("armed") or telemetry.get("mode") != "LAND": failures.append(f"{label}: the drone did not stay landed")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connect", help="SITL connection string; omit to use the in-process stand-in")
+    parser.add_argument("--waypoints", type=int, default=48)
+    parser.add_argument("--spacing", type=float, default=20, help="meters between waypoints")
+    parser.add_argument("--altitude", type=float, default=10)
+    parser.add_argument("--speed", type=float, default=200, help="stand-in ground speed (m/s)")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    text = to_waypoints_file(survey(args.waypoints, args.spacing, args.altitude))
+    start = time.perf_counter()
+    waypoints = parse_mission(text)
+    print(f"🗺️ Parsed {len(waypoints)} items from .waypoints in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    drone = make_drone(args)
+    drone.submit("connect")
+
+    start = time.perf_counter()
+    command_id = drone.submit("mission", waypoints=waypoints)
+    print(f"✅ mission submit returned in {(time.perf_counter() - start) * 1e6:.0f} µs (command #{command_id})")
+
+    finished = drone.mission.wait(args.timeout)
+    progress = drone.mission.snapshot()
+    status = drone.status(command_id)
+    print(f"📋 command: {status['status']} — {status['message']}")
+    print(f"🏁 mission {progress['status']}: {progress.get('reached')}/{progress.get('total')} items reached"
+          f"{'' if finished else ' (timed out)'}")
+    seqs = [seq for seq, _ in progress.get("reached_at", [])]
+    print(f"   reached in order: {seqs == list(range(1, len(waypoints) + 1))}")
+    if len(progress.get("reached_at", [])) > 1:
+        times = [t for _, t in progress["reached_at"]]
+        print(f"   first item {times[0] - progress['started']:.1f}s after submit, "
+              f"last {times[-1] - progress['started']:.1f}s, mean leg {(times[-1] - times[0]) / (len(times) - 1):.2f}s")
+
+    # Abort: land while the mission command is still climbing on the drone thread
+    while drone.telemetry().get("armed"): time.sleep(0.1)
+    mission_id = drone.submit("mission", waypoints=waypoints)
+    while (drone.telemetry().get("alt") or 0) < 1.0: time.sleep(0.05)
+    start = time.monotonic()
+    land_id = drone.submit("land")
+    while drone.status(land_id)["status"] in ("queued", "running"): time.sleep(0.01)
+    land_latency = time.monotonic() - start
+    print(f"🛬 land during climb: {drone.status(land_id)['status']} in {land_latency:.2f}s, "
+          f"mission command {drone.status(mission_id)['status']}, mission {drone.mission.snapshot()['status']}")
+
+    failures = []
+    if not finished or progress["status"] != "complete": failures.append("mission did not complete")
+    if seqs != list(range(1, len(waypoints) + 1)): failures.append("items not reached in order")
+    if drone.status(land_id)["status"] != "done" or land_latency > 5: failures.append("land did not pre-empt the mission")
+    if drone.mission.snapshot()["status"] != "aborted": failures.append("mission was not marked aborted")
+    if not args.connect: # A SITL link is shared, so these need a fresh stand-in per scenario
+        failures += land_behind_queue(args, waypoints)
+    if failures:
+        print(f"🔴 FAILED: {'; '.join(failures)}")
+        sys.exit(1)
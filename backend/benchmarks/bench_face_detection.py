@@ -0,0 +1,81 @@
+# bench_face_detection.py
+# Per-frame detection latency: the old full-resolution Haar call in recognize_face() vs FaceDetector
+# (downscaled Haar, downscaled Haar + ROI tracking, and the DNN detector when a model is given).
+# Frames come from a folder of images (sorted, e.g. a recorded login session) or a video file.
+#
+# Usage (from backend/):  python benchmarks/bench_face_detection.py --frames path/to/frames
+#                         python benchmarks/bench_face_detection.py --video login.mp4 --dnn-model res10.caffemodel --dnn-config deploy.prototxt
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from face_detection import FaceDetector
+
+def load_frames(args):
+    if args.video:
+        capture, frames = cv2.VideoCapture(args.video), []
+        while len(frames) < args.max_frames:
+            ok, frame = capture.read()
+            if not ok: break
+            frames.append(frame)
+        return frames
+    paths = sorted(glob.glob(os.path.join(args.frames, "*")))[:args.max_frames]
+    return [f for f in (cv2.imread(p) for p in paths) if f is not None]
+
+def run(name, detect, frames):
+    timings, found = [], 0
+    for frame in frames:
+        start = time.perf_counter()
+        faces = detect(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+        found += len(faces) > 0
+    timings = np.array(timings)
+    print(f"📊 {name:28s} mean {timings.mean():7.2f} ms   p95 {np.percentile(timings, 95):7.2f} ms   "
+          f"face in {found}/{len(frames)} frames")
+    return timings.mean()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames")
+    parser.add_argument("--video")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--cascade", default=None)
+    parser.add_argument("--detect-width", type=int, default=320)
+    parser.add_argument("--min-face", type=int, default=60)
+    parser.add_argument("--dnn-model")
+    parser.add_argument("--dnn-config")
+    args = parser.parse_args()
+    if not (args.frames or args.video):
+        parser.error("pass --frames <folder of images> or --video <file>")
+
+    frames = load_frames(args)
+    if not frames:
+        sys.exit("🔴 No frames. Pass --frames <folder of images> or --video <file>.")
+    local_cascade = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "haarcascade_frontalface_default.xml")
+    cascade_path = args.cascade or (local_cascade if os.path.exists(local_cascade)
+                                    else cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    print(f"🎞️ {len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    cascade = cv2.CascadeClassifier(cascade_path)
+    def old_haar(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30, 30))
+    baseline = run("haar full-res (old)", old_haar, frames)
+
+    haar = FaceDetector(cascade_path, backend="haar", detect_width=args.detect_width, min_face=args.min_face)
+    for name, detect in [("haar downscaled", haar.detect),
+                         ("haar downscaled + ROI track", lambda frame: haar.detect(frame, key="bench"))]:
+        print(f"   -> {baseline / run(name, detect, frames):.1f}x faster than the old path")
+
+    if args.dnn_model:
+        dnn = FaceDetector(cascade_path, backend="dnn", min_face=args.min_face,
+                           dnn_model=args.dnn_model, dnn_config=args.dnn_config)
+        if dnn.backend == "dnn":
+            print(f"   -> {baseline / run('dnn (preallocated blob)', dnn.detect, frames):.1f}x faster than the old path")
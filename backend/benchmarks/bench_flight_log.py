@@ -0,0 +1,130 @@
+# bench_flight_log.py
+# Flight log round trip. First a short live flight (stand-in or SITL): takeoff plus a small mission with a land,
+# recorded arm -> disarm, checking that chunks, commands and the workspace summary are written. Then a long
+# synthetic flight fed straight into the recorder to measure append throughput, memory-mapped analysis
+# (max altitude, first time battery < 20%) and replay through TelemetryStream at N x and unthrottled.
+# Exits 1 if the summary is missing, the analysis disagrees with the synthetic flight or rows go missing.
+#
+# Usage (from backend/):  python benchmarks/bench_flight_log.py [--connect tcp:127.0.0.1:5762] [--minutes 30] [--speed 50]
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drone_controller import DroneController
+from flight_log import FlightLog, FlightRecorder, LogReplay
+from telemetry import FIELDS, TelemetryStream
+from bench_drone_mission import survey
+
+def live_flight(args, root, workspace):
+    if args.connect:
+        from dronekit import connect, VehicleMode, Command
+        drone = DroneController(args.connect, connect_fn=connect, mode_factory=VehicleMode, command_factory=Command)
+    else:
+        from vehicle_standin import StandinCommand, StandinMode, standin_connect
+        drone = DroneController("standin", mode_factory=StandinMode, command_factory=StandinCommand,
+                                connect_fn=lambda c, wait_ready=False: standin_connect(c, rate_hz=50, speed=50))
+    telemetry = TelemetryStream(drone, rate_hz=50)
+    summaries = []
+    recorder = FlightRecorder(root, modes=telemetry.modes, chunk_rows=200, workspace=workspace, on_summary=summaries.append)
+    telemetry.subscribe(recorder.record)
+    drone.subscribe_commands(recorder.record_command)
+    drone.submit("connect")
+    drone.submit("mission", waypoints=survey(6, 20, 8))
+    drone.mission.wait(120)
+    deadline = time.monotonic() + 30
+    while not summaries and time.monotonic() < deadline: # The session closes on the disarm after landing
+        time.sleep(0.1)
+    if not summaries:
+        return ["no flight summary was written"]
+    with open(os.path.join(workspace, summaries[0]), encoding="utf-8") as f:
+        print(f"📝 {summaries[0]}:\n{f.read()}")
+    commands = FlightLog(os.path.join(root, summaries[0][len("flight_log_"):-len(".txt")])).commands()
+    if not any(c["command"] == "mission" and c["status"] == "done" for c in commands):
+        return [f"the mission command is missing from commands.jsonl ({commands})"]
+    return []
+
+def synthetic_rows(minutes, hz=50):
+    """A long hover-and-cruise flight with a linear battery drain, as TelemetryStream rows."""
+    n = int(minutes * 60 * hz)
+    t = time.time() - minutes * 60 + np.arange(n) / hz
+    phase = np.linspace(0, 2 * math.pi, n)
+    columns = {"time": t, "lat": -35.3632621 + 0.001 * np.sin(phase), "lon": 149.1652374 + 0.001 * np.cos(phase),
+               "alt": 30 + 10 * np.sin(3 * phase), "groundspeed": 8 + np.cos(phase), "airspeed": 8 + np.cos(phase),
+               "heading": np.degrees(phase) % 360, "climb": np.cos(3 * phase), "throttle": np.full(n, 55.0),
+               "battery_voltage": np.linspace(12.6, 10.5, n), "battery_level": np.linspace(100, 5, n),
+               "armed": np.ones(n), "mode": np.zeros(n)}
+    return np.stack([columns[f] for f in FIELDS], axis=1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connect", help="SITL connection string; omit to use the in-process stand-in")
+    parser.add_argument("--minutes", type=float, default=30, help="length of the synthetic flight")
+    parser.add_argument("--speed", type=float, default=50, help="replay speed-up")
+    parser.add_argument("--replay-minutes", type=float, default=2, help="how much of the log to replay at --speed")
+    parser.add_argument("--skip-live", action="store_true")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root, workspace = os.path.join(tmp, "flight_logs"), os.path.join(tmp, "workspace")
+        os.makedirs(workspace)
+        if not args.skip_live:
+            failures += live_flight(args, os.path.join(tmp, "live_logs"), workspace)
+
+        rows = synthetic_rows(args.minutes)
+        recorder = FlightRecorder(root, modes=["AUTO"])
+        row_lists = rows.tolist() # TelemetryStream hands the recorder plain float lists
+        start = time.perf_counter()
+        for row in row_lists:
+            recorder.record(row)
+        log = recorder.stop()
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(log.path, c["file"])) for c in log.meta["chunks"])
+        print(f"📼 Recorded {len(rows)} samples ({args.minutes:g} min @ 50 Hz) in {elapsed:.2f}s "
+              f"= {len(rows) / elapsed / 1e3:.0f}k samples/s, {len(log.meta['chunks'])} chunks, {size / 1e6:.1f} MB")
+
+        log = FlightLog(log.path) # Fresh reader: cold memmaps
+        if len(log) != len(rows): failures.append(f"{len(log)} of {len(rows)} samples read back")
+        results = {}
+        for label, fn in [("max altitude", lambda: log.max_of("alt")),
+                          ("battery < 20%", lambda: log.first_below("battery_level", 20)),
+                          ("full summary", log.summary)]:
+            start = time.perf_counter()
+            results[label] = fn()
+            print(f"🔎 {label}: {(time.perf_counter() - start) * 1e3:.2f} ms -> {results[label] if label != 'full summary' else 'ok'}")
+        max_alt, _ = results["max altitude"]
+        low_at = int(np.argmax(rows[:, FIELDS.index("battery_level")] < 20)) / 50 # synthetic_rows is 50 Hz
+        if abs(max_alt - 40) > 0.01: failures.append(f"max altitude {max_alt:.2f}, expected 40")
+        if results["battery < 20%"] is None or abs(results["battery < 20%"] - low_at) > 0.05:
+            failures.append(f"battery < 20% at {results['battery < 20%']}, expected {low_at:.2f}s")
+
+        class Head: # First --replay-minutes of the log, for the real-time-scaled replay
+            def __init__(self, log, rows): self.log, self.n = log, rows
+            def __getattr__(self, name): return getattr(self.log, name)
+            def rows(self):
+                for i, row in enumerate(self.log.rows()):
+                    if i >= self.n: return
+                    yield row
+
+        head = min(int(args.replay_minutes * 60 * 50), len(rows))
+        for speed, source, expected in [(args.speed, Head(log, head), head), (math.inf, log, len(rows))]:
+            replay = LogReplay(source, speed=speed)
+            stream = TelemetryStream(replay, rate_hz=1e9, capacity=3000)
+            start = time.perf_counter()
+            published = replay.run()
+            elapsed = time.perf_counter() - start
+            label = "unthrottled" if math.isinf(speed) else f"{speed:g}x"
+            print(f"⏩ Replay {label}: {published} samples in {elapsed:.2f}s = {published / elapsed:.0f} Hz "
+                  f"({published / elapsed / 50:.1f}x real time), ring holds {min(stream.ring.seq, stream.ring.capacity)}")
+            if published != expected: failures.append(f"replay {label} published {published} of {expected} samples")
+
+    if failures:
+        print(f"🔴 FAILED: {'; '.join(failures)}")
+        sys.exit(1)
@@ -0,0 +1,55 @@
+# bench_lbph_matcher.py
+# LBPHMatcher vs cv2.face.LBPHFaceRecognizer.predict: trains OpenCV's recognizer on synthetic 100x100 faces
+# (noisy copies of a few base images per label), then checks that the batched matcher returns the same
+# nearest label and distance for every query face, and times both. Exits 1 on any disagreement.
+#
+# Usage (from backend/):  python benchmarks/bench_lbph_matcher.py [--labels 20] [--samples 40] [--queries 50]
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lbph_matcher import LBPHMatcher
+
+def noisy(rng, image, amount):
+    return np.clip(image.astype(np.int16) + rng.integers(-amount, amount, image.shape), 0, 255).astype(np.uint8)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=40, help="training samples per label")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base = rng.integers(0, 256, (args.labels, 100, 100)).astype(np.uint8)
+    labels = np.repeat(np.arange(args.labels), args.samples)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train([noisy(rng, base[k], 40) for k in labels], labels)
+    matcher = LBPHMatcher.from_recognizer(recognizer)
+    faces = np.stack([noisy(rng, base[k], 60) for k in rng.integers(0, args.labels, args.queries)])
+    print(f"📊 {len(matcher)} training histograms, {len(faces)} query faces")
+
+    start = time.perf_counter()
+    expected = [recognizer.predict(face) for face in faces]
+    opencv_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    got_labels, got_distances = matcher.predict(faces)
+    matcher_ms = (time.perf_counter() - start) * 1000
+    print(f"⏱️ recognizer.predict x{len(faces)}: {opencv_ms:.1f} ms, LBPHMatcher batch: {matcher_ms:.1f} ms "
+          f"({opencv_ms / max(matcher_ms, 1e-9):.1f}x)")
+
+    mismatches = [(i, exp, (int(l), float(d))) for i, (exp, l, d) in enumerate(zip(expected, got_labels, got_distances))
+                  if exp[0] != l or abs(exp[1] - d) > 1e-3 * max(1.0, exp[1])]
+    for i, exp, got in mismatches[:5]:
+        print(f"   face {i}: recognizer {exp}, matcher {got}")
+    if mismatches:
+        print(f"🔴 FAILED: {len(mismatches)}/{len(faces)} faces disagree with recognizer.predict")
+        sys.exit(1)
+    print("✅ Same label and distance as recognizer.predict for every face")
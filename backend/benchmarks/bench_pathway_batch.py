@@ -0,0 +1,46 @@
+# bench_pathway_batch.py
+# N single /v1/retrieve calls vs one /v1/retrieve_batch call against a running brain_pathway.py.
+#
+# Usage (from backend/, with brain_pathway.py running):  python benchmarks/bench_pathway_batch.py --n 2 4 8
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathway_client import PathwayClient
+
+QUERIES = [
+    "the bug in cal.py", "the mission file", "conversation history", "what was in the last photo",
+    "drone altitude", "screen analysis", "api keys in the docs", "timer script",
+]
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--n", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    # cache_ttl=0 so every call really reaches the server
+    client = PathwayClient(args.url, timeout=10, cache_ttl=0)
+    if client.retrieve("warm up", k=1) is None:
+        sys.exit("🔴 Pathway server not reachable. Start brain_pathway.py first.")
+
+    print(f"⏱️ Pathway batch retrieval benchmark (median of {args.repeats}, k={args.k})")
+    for n in args.n:
+        queries = (QUERIES * (n // len(QUERIES) + 1))[:n]
+        single = timed(lambda: [client.retrieve(q, k=args.k) for q in queries], args.repeats)
+        batched = timed(lambda: client.retrieve_batch(queries, k=args.k), args.repeats)
+        print(f"N={n:<3} | {n} x /v1/retrieve {single:8.1f} ms | 1 x /v1/retrieve_batch {batched:8.1f} ms | speedup {single / batched:5.2f}x")
@@ -0,0 +1,60 @@
+# bench_prompt_prefix.py
+# Compares Ollama prompt-eval cost of the old single-message prompt (context in the middle)
+# against the static system message + per-turn suffix layout from prompt_builder.py.
+#
+# Usage (from backend/, with Ollama running):  python benchmarks/bench_prompt_prefix.py --turns 8
+
+import argparse
+import os
+import sys
+import time
+
+import ollama
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from prompt_builder import SYSTEM_PROMPT, CHAT_OPTIONS, build_messages
+
+PROMPTS = [
+    "hello", "what is 5 + 7?", "who is Ada Lovelace", "what was in that photo?",
+    "tell me a joke", "sun vs moon", "how do I fix an import error?", "what's in mission.txt?",
+]
+
+def build_legacy_messages(user_input, rag_context, history):
+    """The pre-split layout: one user message with memory/history injected mid-prompt."""
+    history_str = "\n".join([f"User: {h['prompt']}\nBuddy: {h['response']}" for h in history[-5:]])
+    prompt = (f"{SYSTEM_PROMPT}\n--- LIVE CONTEXT (Your Pathway Memory) ---\n{rag_context}\n"
+              f"------------------------------------------\n\n--- CONVERSATION HISTORY ---\n{history_str}\n"
+              f"----------------------------\n\nUser Prompt: \"{user_input}\"\n\nReturn ONLY valid JSON.")
+    return [{"role": "user", "content": prompt}]
+
+def run(layout, builder, model, turns):
+    history, rows = [], []
+    for i in range(turns):
+        user_input = PROMPTS[i % len(PROMPTS)]
+        rag_context = f"--- OTHER MEMORY ---\nworkspace note #{i}: {user_input} (updated {time.ctime()})"
+        start = time.perf_counter()
+        first_token = None
+        final = None
+        for part in ollama.chat(model=model, messages=builder(user_input, rag_context, history), format='json',
+                                keep_alive='24h', options=dict(CHAT_OPTIONS, num_predict=32), stream=True):
+            if first_token is None and part['message']['content']:
+                first_token = time.perf_counter() - start
+            final = part
+        rows.append((final.get('prompt_eval_count', 0), final.get('prompt_eval_duration', 0) / 1e6, (first_token or 0) * 1000))
+        history.append({"prompt": user_input, "response": f"answer {i}"})
+
+    # Turn 0 warms the cache for both layouts, so report the steady state separately
+    steady = rows[1:] or rows
+    avg = lambda col: sum(r[col] for r in steady) / len(steady)
+    print(f"{layout:<8} | eval tokens/turn {avg(0):8.0f} | prompt eval {avg(1):8.1f} ms | TTFT {avg(2):8.1f} ms")
+    return steady
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--turns", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"⏱️ Prompt prefix benchmark on '{args.model}' ({args.turns} turns each, first turn excluded)")
+    run("legacy", build_legacy_messages, args.model, args.turns)
+    run("split", build_messages, args.model, args.turns)
@@ -0,0 +1,73 @@
+# bench_speaker_embedding.py
+# Latency and equal error rate of voice identification:
+#   speaker  - acoustic embedding from the waveform (SpeakerEmbedder, what VoiceAuthenticator uses now)
+#   text     - Whisper transcript embedded with all-MiniLM-L6-v2 (the previous approach), with --text
+# Fixture layout: <fixtures>/<speaker_name>/*.wav|webm, several clips per speaker.
+#
+# Usage (from backend/):  python benchmarks/bench_speaker_embedding.py --fixtures benchmarks/fixtures/speakers [--text]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_utils import decode_audio_bytes
+from speaker_embedding import SpeakerEmbedder
+
+def load_fixtures(folder):
+    clips = []
+    for speaker in sorted(os.listdir(folder)):
+        for path in sorted(glob.glob(os.path.join(folder, speaker, "*"))):
+            with open(path, "rb") as f:
+                clips.append((speaker, decode_audio_bytes(f.read())))
+    return clips
+
+def equal_error_rate(genuine, impostor):
+    """EER and its threshold from same-speaker and different-speaker distances."""
+    best = (1.0, 0.0, 0.0)
+    for t in np.unique(np.concatenate([genuine, impostor])):
+        frr, far = np.mean(genuine > t), np.mean(impostor <= t)
+        if abs(frr - far) < best[0]:
+            best = (abs(frr - far), (frr + far) / 2, t)
+    return best[1], best[2]
+
+def evaluate(name, embed, clips):
+    start = time.perf_counter()
+    vectors = [embed(audio) for _, audio in clips]
+    per_clip = (time.perf_counter() - start) / len(clips) * 1000
+    keep = [i for i, v in enumerate(vectors) if v is not None]
+    labels = np.array([clips[i][0] for i in keep])
+    matrix = np.vstack([vectors[i] for i in keep])
+    distances = ((matrix[:, None, :] - matrix[None, :, :]) ** 2).sum(axis=2) # Same metric as the FAISS L2 index
+    upper = np.triu_indices(len(keep), k=1)
+    same = labels[upper[0]] == labels[upper[1]]
+    eer, threshold = equal_error_rate(distances[upper][same], distances[upper][~same])
+    print(f"📊 {name:8s} {per_clip:8.1f} ms/clip   EER {eer:6.1%} at distance {threshold:.3f}   "
+          f"({len(clips) - len(keep)} clips without usable speech)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=os.path.join("benchmarks", "fixtures", "speakers"))
+    parser.add_argument("--text", action="store_true", help="also run the Whisper + MiniLM transcript approach")
+    args = parser.parse_args()
+
+    clips = load_fixtures(args.fixtures)
+    if len({speaker for speaker, _ in clips}) < 2:
+        sys.exit(f"🔴 Need clips from at least two speakers under {args.fixtures}/<speaker>/")
+    print(f"🎧 {len(clips)} clips from {len({speaker for speaker, _ in clips})} speakers")
+
+    evaluate("speaker", SpeakerEmbedder().embed, clips)
+
+    if args.text:
+        import whisper
+        from sentence_transformers import SentenceTransformer
+        model = whisper.load_model("base")
+        embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        def text_embed(audio):
+            transcript = model.transcribe(audio, fp16=False)["text"].strip().lower()
+            return np.array(embedder.encode([transcript]), dtype="float32") if transcript else None
+        evaluate("text", text_embed, clips)
@@ -0,0 +1,75 @@
+# bench_telemetry_stream.py
+# Sustained-rate check for the telemetry pipeline: a vehicle feeding listeners at 50 Hz, the ring buffer
+# recording, and several SSE subscribers at different rates. Reports recorded Hz, per-subscriber event
+# rates and payload sizes (deltas vs full samples), and Python heap growth (should stay flat).
+# The vehicle starts at DroneKit's default ~4 Hz streams; the controller must request --rate on connect
+# (MAV_CMD_SET_MESSAGE_INTERVAL). Exits 1 if the recorded rate stays below 90% of --rate.
+#
+# Usage (from backend/):  python benchmarks/bench_telemetry_stream.py [--connect tcp:127.0.0.1:5762] [--seconds 20]
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drone_controller import DroneController
+from telemetry import TelemetryStream
+
+def consume(stream, stop, stats):
+    for event in stream:
+        if event.startswith("id:"):
+            stats["events"] += 1
+            stats["bytes"] += len(event)
+            stats["fields"] += len(json.loads(event.split("data: ", 1)[1]))
+        if stop.is_set():
+            break
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connect", help="SITL connection string; omit to use the in-process stand-in")
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--capacity", type=int, default=3000)
+    args = parser.parse_args()
+
+    if args.connect:
+        from dronekit import connect, VehicleMode
+        drone = DroneController(args.connect, connect_fn=connect, mode_factory=VehicleMode, stream_hz=args.rate)
+    else:
+        from vehicle_standin import StandinMode, standin_connect
+        drone = DroneController("standin", connect_fn=lambda c, wait_ready=False: standin_connect(c, rate_hz=4),
+                                mode_factory=StandinMode, stream_hz=args.rate)
+    telemetry = TelemetryStream(drone, rate_hz=args.rate, capacity=args.capacity)
+    drone.submit("connect")
+    drone.submit("takeoff", altitude=30)
+
+    stop = threading.Event()
+    subscribers = {hz: {"events": 0, "bytes": 0, "fields": 0} for hz in (1, 10, 50)}
+    for hz, stats in subscribers.items():
+        threading.Thread(target=consume, args=(telemetry.stream(max_hz=hz), stop, stats), daemon=True).start()
+
+    time.sleep(2) # warm-up: connect + ring fill
+    tracemalloc.start()
+    heap_start = tracemalloc.get_traced_memory()[0]
+    seq_start = telemetry.ring.seq
+    counts_start = {hz: dict(s) for hz, s in subscribers.items()}
+    time.sleep(args.seconds)
+    heap_end = tracemalloc.get_traced_memory()[0]
+    stop.set()
+
+    recorded = (telemetry.ring.seq - seq_start) / args.seconds
+    print(f"📡 Recorded {recorded:.1f} Hz (target {args.rate:g} Hz), ring {telemetry.ring.capacity} rows "
+          f"= {telemetry.ring.data.nbytes / 1024:.0f} KB fixed")
+    for hz, stats in subscribers.items():
+        events = stats["events"] - counts_start[hz]["events"]
+        size = (stats["bytes"] - counts_start[hz]["bytes"]) / max(events, 1)
+        fields = (stats["fields"] - counts_start[hz]["fields"]) / max(events, 1)
+        print(f"   subscriber @{hz:>2} Hz: {events / args.seconds:5.1f} events/s, {size:5.0f} B/event, {fields:.1f} fields/event")
+    print(f"🧠 Heap growth over {args.seconds:g}s: {(heap_end - heap_start) / 1024:.1f} KB")
+    if recorded < 0.9 * args.rate:
+        print(f"🔴 FAILED: recorded {recorded:.1f} Hz, target {args.rate:g} Hz")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+# bench_voice_concurrency.py
+# Fires simultaneous transcriptions at VoiceAuthenticator to check the in-memory audio path.
+# With the old shared temp files ("temp_verify.wav", "temp_trigger.wav") concurrent requests
+# overwrote each other's audio; now every request must get back the transcript of its own clip.
+#
+# Usage (from backend/):  python benchmarks/bench_voice_concurrency.py clip1.wav clip2.webm ... [--threads 8]
+# Use clips with different spoken content so a mix-up is visible.
+# Then checks the persisted voice index through the public API: every clip enrolled under its own name, a
+# restarted authenticator loads the same profiles and next_id, remove_voice survives another restart, and a
+# re-enrolled user gets a fresh ID. Exits 1 on any wrong result.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voice_recognition_module import VoiceAuthenticator
+
+class BenchUsers:
+    """Just enough of UserManager for enroll_voice(): every name exists."""
+    def get_user_by_name(self, name): return {"name": name}
+    def mark_voice_enrolled(self, name): pass
+
+def check_index(index_dir, clips):
+    """Enroll / restart / remove round trip on the persisted index; returns a list of failures."""
+    failures = []
+    auth = VoiceAuthenticator(BenchUsers(), index_dir=index_dir)
+    enrolled = {}
+    for i, (path, audio) in enumerate(clips):
+        ok, message = auth.enroll_voice(f"bench_user_{i}", audio)
+        if ok: enrolled[f"bench_user_{i}"] = audio
+        else: print(f"   {path}: {message} (skipped)")
+    if len(enrolled) < 2:
+        return ["need at least two clips with enough speech for the index check"]
+    for name, audio in enrolled.items(): # Exact search: each clip's own profile is at distance ~0
+        if auth.recognize_voice(audio)[0] != name: failures.append(f"{name} is not recognized from its own clip")
+    saved = auth.stats()
+
+    restarted = VoiceAuthenticator(BenchUsers(), index_dir=index_dir)
+    if restarted.stats() != saved: failures.append(f"restart changed the index: {saved} -> {restarted.stats()}")
+    removed, audio = next(iter(enrolled.items()))
+    if not restarted.remove_voice(removed): failures.append(f"remove_voice({removed!r}) returned False")
+    if restarted.remove_voice("bench_user_missing"): failures.append("remove_voice of an unknown user returned True")
+
+    restarted = VoiceAuthenticator(BenchUsers(), index_dir=index_dir)
+    after = restarted.stats()
+    if restarted.recognize_voice(audio)[0] == removed or after["users"] != saved["users"] - 1:
+        failures.append(f"{removed} is still enrolled after remove_voice and a restart")
+    if after["next_id"] != saved["next_id"]: failures.append(f"next_id went from {saved['next_id']} to {after['next_id']}")
+    restarted.enroll_voice(removed, audio)
+    if restarted.stats()["next_id"] != saved["next_id"] + 1 or restarted.recognize_voice(audio)[0] != removed:
+        failures.append(f"re-enrolling {removed} did not add a fresh ID")
+    print(f"🗂️ Index check: {len(enrolled)} users enrolled, restarted twice, {removed} removed and re-enrolled "
+          f"({restarted.stats()})")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("clips", nargs="+")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    clips = []
+    for path in args.clips:
+        with open(path, "rb") as f:
+            clips.append((path, f.read()))
+
+    # Only transcription is exercised, so no user manager is needed
+    auth = VoiceAuthenticator(user_manager=None, index_dir=os.path.join("benchmarks", ".voice_index_bench"))
+    before = set(os.listdir("."))
+
+    print("🎧 Sequential reference transcripts:")
+    expected = {}
+    start = time.perf_counter()
+    for path, audio in clips:
+        expected[path] = auth.transcribe(audio)
+        print(f"   {path}: '{expected[path]}'")
+    sequential = time.perf_counter() - start
+
+    jobs = clips * args.rounds * max(1, args.threads // len(clips))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda job: (job[0], auth.transcribe(job[1])), jobs))
+    concurrent = time.perf_counter() - start
+
+    mismatches = [(path, text) for path, text in results if text != expected[path]]
+    leftovers = sorted(set(os.listdir(".")) - before)
+
+    print(f"⏱️ Sequential: {sequential / len(clips) * 1000:.0f} ms/clip")
+    print(f"⏱️ Concurrent: {len(jobs)} requests on {args.threads} threads in {concurrent:.2f}s "
+          f"({concurrent / len(jobs) * 1000:.0f} ms/request)")
+    for path, text in mismatches[:10]:
+        print(f"🔴 {path}: expected '{expected[path]}', got '{text}'")
+    if leftovers:
+        print(f"🔴 Files left behind in the working directory: {leftovers}")
+    if not mismatches and not leftovers:
+        print(f"✅ All {len(jobs)} concurrent transcripts matched their own clip, no temp files written.")
+
+    with tempfile.TemporaryDirectory(prefix="voice_index_check_") as index_dir: # Empty index every run
+        failures = check_index(index_dir, clips)
+    for failure in failures:
+        print(f"🔴 {failure}")
+    if mismatches or leftovers or failures:
+        sys.exit(1)
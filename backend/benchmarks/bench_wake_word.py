@@ -0,0 +1,84 @@
+# bench_wake_word.py
+# CPU cost and accuracy of the wake-word gate in front of Whisper.
+# Fixture layout (record a few clips with the browser or any recorder, WAV or WebM):
+#   <fixtures>/templates/*   the wake word, used as enrollment templates
+#   <fixtures>/positive/*    clips that contain the wake word (must fire)
+#   <fixtures>/negative/*    other speech, music, room noise (must not fire)
+#
+# Usage (from backend/):  python benchmarks/bench_wake_word.py --fixtures benchmarks/fixtures/wake_word [--whisper]
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_utils import WHISPER_SAMPLE_RATE, decode_audio_bytes
+from wake_word import WakeWordDetector
+
+def load_clips(folder):
+    clips = []
+    for path in sorted(glob.glob(os.path.join(folder, "*"))):
+        with open(path, "rb") as f:
+            clips.append((os.path.basename(path), decode_audio_bytes(f.read())))
+    return clips
+
+def cpu_per_audio_second(fn, clips, repeats):
+    audio_seconds = sum(len(audio) for _, audio in clips) / WHISPER_SAMPLE_RATE * repeats
+    start = time.process_time()
+    for _ in range(repeats):
+        for _, audio in clips:
+            fn(audio)
+    return (time.process_time() - start) / audio_seconds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=os.path.join("benchmarks", "fixtures", "wake_word"))
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--whisper", action="store_true", help="also time the old full-transcription check")
+    args = parser.parse_args()
+
+    templates = load_clips(os.path.join(args.fixtures, "templates"))
+    positives = load_clips(os.path.join(args.fixtures, "positive"))
+    negatives = load_clips(os.path.join(args.fixtures, "negative"))
+    if not templates or not positives or not negatives:
+        sys.exit(f"🔴 Need templates/, positive/ and negative/ clips under {args.fixtures}")
+
+    detector = WakeWordDetector(tempfile.mkdtemp(prefix="wake_word_bench_"), threshold=args.threshold)
+    for _, audio in templates:
+        detector.add_template(audio)
+
+    pos_scores = np.array([s if s is not None else np.inf for s in (detector.score(a) for _, a in positives)])
+    neg_scores = np.array([s if s is not None else np.inf for s in (detector.score(a) for _, a in negatives)])
+    frr = np.mean(pos_scores > detector.threshold)
+    far = np.mean(neg_scores <= detector.threshold)
+
+    # Threshold sweep: where false accepts and false rejects cross
+    scores = np.concatenate([pos_scores, neg_scores])
+    candidates = np.unique(scores[np.isfinite(scores)])
+    eer_threshold, best_gap = detector.threshold, 1.0
+    for t in candidates:
+        gap = abs(np.mean(pos_scores > t) - np.mean(neg_scores <= t))
+        if gap < best_gap:
+            best_gap, eer_threshold = gap, t
+    eer_rate = (np.mean(pos_scores > eer_threshold) + np.mean(neg_scores <= eer_threshold)) / 2
+
+    all_clips = positives + negatives
+    gate_cpu = cpu_per_audio_second(detector.detect, all_clips, args.repeats)
+
+    print(f"📊 {len(templates)} templates, {len(positives)} positive / {len(negatives)} negative clips")
+    print(f"🎯 Threshold {detector.threshold:.3f}: FRR {frr:.1%}, FAR {far:.1%}")
+    print(f"🎯 EER ~{eer_rate:.1%} at threshold {eer_threshold:.3f} (set WAKE_WORD_THRESHOLD to use it)")
+    print(f"⏱️ Wake-word gate: {gate_cpu * 1000:.1f} ms CPU per second of audio")
+
+    if args.whisper:
+        import whisper
+        model = whisper.load_model("base")
+        whisper_cpu = cpu_per_audio_second(lambda audio: model.transcribe(audio, fp16=False), all_clips, 1)
+        print(f"⏱️ Whisper base:   {whisper_cpu * 1000:.1f} ms CPU per second of audio "
+              f"({whisper_cpu / max(gate_cpu, 1e-9):.0f}x the gate)")
@@ -0,0 +1,72 @@
+# bench_workspace_cache.py
+# Cold vs warm indexing cost of ./oni_workspace with the content-hash cache used by brain_pathway.py.
+# "Cold" starts from an empty cache directory (old with_cache=False behaviour on every restart),
+# "warm" is a restart with nothing changed, "one changed" touches a single file.
+# Exits 1 if the warm restart misses the cache or a restart changes the chunk count.
+#
+# Usage (from backend/):  python benchmarks/bench_workspace_cache.py
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathway.xpacks.llm.parsers import ParseUnstructured
+from brain_pathway import CachedParser, BatchedSentenceTransformerEmbedder
+from workspace_cache import ContentHashCache
+
+def index_workspace(workspace, parser, embedder):
+    start = time.perf_counter()
+    chunks = 0
+    for name in sorted(os.listdir(workspace)):
+        path = os.path.join(workspace, name)
+        if not os.path.isfile(path): continue
+        with open(path, "rb") as f:
+            parsed = parser.parse_bytes(f.read())
+        embedder.embed_texts([text for text, _ in parsed])
+        chunks += len(parsed)
+    return time.perf_counter() - start, chunks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workspace", default="oni_workspace")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="pathway_cache_bench_")
+    work_copy = tempfile.mkdtemp(prefix="workspace_bench_")
+    try:
+        for name in os.listdir(args.workspace):
+            src = os.path.join(args.workspace, name)
+            if os.path.isfile(src): shutil.copy2(src, work_copy)
+
+        embedder = BatchedSentenceTransformerEmbedder(model="all-MiniLM-L6-v2", cache=ContentHashCache(cache_dir))
+        cold, chunks = index_workspace(work_copy, CachedParser(ParseUnstructured(), embedder.cache), embedder)
+
+        warm_cache = ContentHashCache(cache_dir) # fresh instance = simulated restart
+        embedder.cache = warm_cache
+        warm, warm_chunks = index_workspace(work_copy, CachedParser(ParseUnstructured(), warm_cache), embedder)
+
+        changed = sorted(os.listdir(work_copy))[0]
+        with open(os.path.join(work_copy, changed), "a", encoding="utf-8") as f:
+            f.write(f"\nedited at {time.ctime()}\n")
+        warm_stats = dict(warm_cache.stats())
+        one_changed, _ = index_workspace(work_copy, CachedParser(ParseUnstructured(), warm_cache), embedder)
+
+        print(f"⏱️ Workspace indexing: {len(os.listdir(work_copy))} files, {chunks} chunks")
+        print(f"cold start        {cold:8.2f} s")
+        print(f"warm start        {warm:8.2f} s  ({cold / max(warm, 1e-9):.0f}x faster)")
+        print(f"one file changed  {one_changed:8.2f} s")
+        print(f"cache counters    {warm_cache.stats()}")
+        failures = []
+        if warm_stats.get("chunk_misses") or warm_stats.get("embedding_misses"):
+            failures.append(f"warm restart missed the cache ({warm_stats})")
+        if warm_chunks != chunks: failures.append(f"warm restart produced {warm_chunks} chunks, cold {chunks}")
+        if failures:
+            print(f"🔴 FAILED: {'; '.join(failures)}")
+            sys.exit(1)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        shutil.rmtree(work_copy, ignore_errors=True)
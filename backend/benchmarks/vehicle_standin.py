@@ -0,0 +1,213 @@
+# vehicle_standin.py
+# Minimal in-process stand-in for a DroneKit Vehicle connected to ArduPilot SITL, for the drone
+# benchmarks when no SITL is running. It implements only the surface DroneController uses and
+# fires attribute listeners from its own thread, like DroneKit's MAVLink reader does. In AUTO it flies the
+# uploaded mission item by item and emits MISSION_ITEM_REACHED like ArduCopter.
+#
+# Usage:  DroneController(connect_fn=standin_connect, mode_factory=StandinMode, command_factory=StandinCommand)
+
+import math
+import threading
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+METERS_PER_DEGREE = 111320.0
+
+# Same positional signature as dronekit.Command
+StandinCommand = namedtuple("StandinCommand", "target_system target_component seq frame command current autocontinue "
+                                              "param1 param2 param3 param4 x y z")
+
+class StandinMode:
+    def __init__(self, name):
+        self.name = name
+
+class StandinCommands:
+    """vehicle.commands: staged edits become the mission on upload(), which costs one simulated
+    MISSION_REQUEST/MISSION_ITEM round trip per item."""
+    def __init__(self, vehicle, link_latency=0.002):
+        self._vehicle = vehicle
+        self.link_latency = link_latency
+        self.items = []
+        self._staged = []
+
+    def download(self):
+        self._staged = list(self.items)
+
+    def wait_ready(self, **kwargs):
+        return True
+
+    def clear(self):
+        self._staged = []
+
+    def add(self, cmd):
+        self._staged.append(cmd)
+
+    def upload(self, timeout=None):
+        time.sleep(self.link_latency * (len(self._staged) + 2)) # clear + count, then one round trip per item
+        self.items = list(self._staged)
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def next(self):
+        return self._vehicle._current_seq
+
+    @next.setter
+    def next(self, index):
+        self._vehicle._current_seq = index
+
+class StandinVehicle:
+    def __init__(self, rate_hz=10.0, climb_rate=2.5, arm_delay=0.2, speed=10.0):
+        self.rate_hz = rate_hz
+        self.climb_rate = climb_rate
+        self.arm_delay = arm_delay
+        self.speed = speed
+        self.parameters = {}
+        self._mode = StandinMode("STABILIZE")
+        self._armed = False
+        self._arm_requested_at = None
+        self._target_alt = 0.0
+        self._location = SimpleNamespace(lat=-35.3632621, lon=149.1652374, alt=0.0)
+        self._battery = SimpleNamespace(voltage=12.6, level=100)
+        self._gps = SimpleNamespace(fix_type=3, satellites_visible=10)
+        self._home = (self._location.lat, self._location.lon)
+        self.commands = StandinCommands(self)
+        self.message_factory = SimpleNamespace(command_long_encode=lambda *fields: fields)
+        self.intervals = {} # msg_id -> µs, from MAV_CMD_SET_MESSAGE_INTERVAL
+        self._current_seq = 1
+        self._hold_until = None
+        self._listeners = {}
+        self._message_listeners = {}
+        self._stop = threading.Event()
+        threading.Thread(target=self._loop, name="standin-vehicle", daemon=True).start()
+
+    # --- DroneKit surface ---
+    def wait_ready(self, *attributes):
+        return True
+
+    def send_mavlink(self, message):
+        """Honours MAV_CMD_SET_MESSAGE_INTERVAL for GLOBAL_POSITION_INT (33), which paces this simulation."""
+        _, _, command, _, msg_id, interval_us = message[:6]
+        if command == 511 and interval_us > 0:
+            self.intervals[int(msg_id)] = interval_us
+            if int(msg_id) == 33: self.rate_hz = 1e6 / interval_us
+
+    def add_attribute_listener(self, name, callback):
+        self._listeners.setdefault(name, []).append(callback)
+
+    def add_message_listener(self, name, callback):
+        self._message_listeners.setdefault(name, []).append(callback)
+
+    def _notify_message(self, name, message):
+        for callback in self._message_listeners.get(name, []):
+            callback(self, name, message)
+
+    def _notify(self, name, value):
+        for callback in self._listeners.get(name, []):
+            callback(self, name, value)
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, mode):
+        self._mode = StandinMode(mode.name)
+        if mode.name in ("LAND", "RTL"): self._target_alt = 0.0
+        self._notify("mode", self._mode)
+
+    @property
+    def armed(self):
+        return self._armed
+
+    @armed.setter
+    def armed(self, value):
+        if value and not self._armed and self._arm_requested_at is None:
+            self._arm_requested_at = time.monotonic()
+        if not value:
+            self._armed = False
+            self._notify("armed", False)
+
+    def simple_takeoff(self, altitude):
+        self._target_alt = float(altitude)
+
+    def close(self):
+        self._stop.set()
+
+    # --- Simulation ---
+    def _loop(self):
+        while not self._stop.wait(1.0 / self.rate_hz):
+            dt = 1.0 / self.rate_hz
+            if self._arm_requested_at is not None and time.monotonic() - self._arm_requested_at >= self.arm_delay:
+                self._arm_requested_at = None
+                self._armed = True
+                self._notify("armed", True)
+            step = 0.0
+            moved = 0.0
+            if self._armed:
+                target = self._mission_target() if self._mode.name == "AUTO" else None
+                lat, lon = self._location.lat, self._location.lon
+                if target:
+                    lat, lon, moved = self._move_towards(target[0], target[1], self.speed * dt)
+                    self._target_alt = target[2]
+                step = max(-self.climb_rate * dt, min(self.climb_rate * dt, self._target_alt - self._location.alt))
+                self._location = SimpleNamespace(lat=lat, lon=lon, alt=self._location.alt + step)
+                self._battery = SimpleNamespace(voltage=self._battery.voltage - 0.0005, level=max(0, self._battery.level - 0.01))
+                if target: self._check_item_reached(target)
+                if self._mode.name in ("LAND", "AUTO") and self._target_alt == 0 and self._location.alt <= 0.05:
+                    self._armed = False
+                    self._notify("armed", False)
+            self._notify("location.global_relative_frame", self._location)
+            self._notify("battery", self._battery)
+            self._notify("gps_0", self._gps)
+            self._notify_message("VFR_HUD", SimpleNamespace(
+                groundspeed=moved * self.rate_hz, airspeed=moved * self.rate_hz, heading=90, throttle=60 if self._armed else 0,
+                climb=step * self.rate_hz, alt=self._location.alt))
+
+    # --- AUTO mission ---
+    def _mission_target(self):
+        """(lat, lon, alt) the current mission item flies to, or None once the mission is done."""
+        items = self.commands.items
+        if not 1 <= self._current_seq <= len(items): return None
+        item = items[self._current_seq - 1]
+        if item.command == 22: # NAV_TAKEOFF
+            return self._location.lat, self._location.lon, item.z
+        if item.command == 20: # NAV_RETURN_TO_LAUNCH: home at the current altitude, then descend
+            at_home = self._distance(*self._home) < 0.5
+            return self._home[0], self._home[1], 0.0 if at_home else self._location.alt
+        if item.command == 21: # NAV_LAND
+            return item.x, item.y, 0.0
+        return item.x, item.y, item.z
+
+    def _distance(self, lat, lon):
+        dn = (lat - self._location.lat) * METERS_PER_DEGREE
+        de = (lon - self._location.lon) * METERS_PER_DEGREE * math.cos(math.radians(self._location.lat))
+        return math.hypot(dn, de)
+
+    def _move_towards(self, lat, lon, max_step):
+        distance = self._distance(lat, lon)
+        if distance <= max_step:
+            return lat, lon, distance
+        f = max_step / distance
+        return (self._location.lat + (lat - self._location.lat) * f,
+                self._location.lon + (lon - self._location.lon) * f, max_step)
+
+    def _check_item_reached(self, target):
+        if self._distance(target[0], target[1]) > 0.5 or abs(self._location.alt - target[2]) > 0.3:
+            return
+        item = self.commands.items[self._current_seq - 1]
+        if item.command == 19 and item.param1 > 0: # NAV_LOITER_TIME holds before counting as reached
+            if self._hold_until is None: self._hold_until = time.monotonic() + item.param1
+            if time.monotonic() < self._hold_until: return
+            self._hold_until = None
+        self._notify_message("MISSION_ITEM_REACHED", SimpleNamespace(seq=self._current_seq))
+        self._current_seq += 1
+
+def standin_connect(connection_string, wait_ready=False, rate_hz=10.0, speed=10.0, **kwargs):
+    return StandinVehicle(rate_hz=rate_hz, speed=speed)
@@ -1,7 +1,14 @@
+import asyncio
+import inspect
+import threading
+import time
+
+import numpy as np
 import pathway as pw
 from pathway.xpacks.llm.vector_store import VectorStoreServer
 from pathway.xpacks.llm.parsers import ParseUnstructured
-from pathway.xpacks.llm.embedders import SentenceTransformerEmbedder
+from sentence_transformers import SentenceTransformer
+from workspace_cache import ContentHashCache
 
 # 1. THE WATCHER
 data_sources = [
@@ -13,25 +20,144 @@ data_sources = [
     )
 ]
 
-# 2. THE SERVER
-def run_pathway_server():
+# Content-hash cache shared by the parser and the embedder (survives restarts)
+workspace_cache = ContentHashCache("./pathway_cache")
+
+# 2. THE PARSER
+class CachedParser(pw.UDF):
+    """Wraps a Pathway parser and skips it for file contents that were parsed before."""
+    def __init__(self, parser, cache):
+        super().__init__()
+        self.parser = parser
+        self.cache = cache
+
+    def parse_bytes(self, contents):
+        chunks = self.cache.get_chunks(contents)
+        if chunks is not None:
+            return chunks
+        start = time.perf_counter()
+        chunks = self.parser.__wrapped__(contents)
+        if inspect.isawaitable(chunks):
+            chunks = asyncio.run(chunks)
+        chunks = [(text, dict(metadata)) for text, metadata in chunks]
+        self.cache.put_chunks(contents, chunks)
+        print(f"📄 Parsed {len(contents)} bytes into {len(chunks)} chunks in {time.perf_counter() - start:.2f}s")
+        return chunks
+
+    def __wrapped__(self, contents: bytes, **kwargs) -> list[tuple[str, dict]]:
+        return self.parse_bytes(contents)
+
+# 3. THE EMBEDDER
+class BatchedSentenceTransformerEmbedder(pw.UDF):
+    """SentenceTransformer embedder that encodes all rows of a commit in one forward pass,
+    re-using cached vectors for chunk texts it has embedded before."""
+    def __init__(self, model="all-MiniLM-L6-v2", max_batch_size=64, cache=None):
+        super().__init__(max_batch_size=max_batch_size)
+        self.model = SentenceTransformer(model)
+        self.cache = cache
+
+    def embed_texts(self, texts):
+        vectors = [self.cache.get_embedding(t) for t in texts] if self.cache else [None] * len(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            encoded = self.model.encode([texts[i] for i in missing], batch_size=max(len(missing), 1))
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+                if self.cache: self.cache.put_embedding(texts[i], vector)
+        return vectors
+
+    def __wrapped__(self, texts: list[str], **kwargs) -> list[np.ndarray]:
+        if isinstance(texts, str): # single-text probe (used to size the index)
+            return self.model.encode(texts)
+        return self.embed_texts(list(texts))
+
+    def get_embedding_dimension(self, **kwargs):
+        return self.model.get_sentence_embedding_dimension()
+
+# 4. BATCH RETRIEVAL ("compare the bug in cal.py with the mission file" -> several lookups, one round-trip)
+class BatchRetrieveQuerySchema(pw.Schema):
+    queries: list[str]
+    k: int = pw.column_definition(default_value=3)
+    metadata_filter: str | None = pw.column_definition(default_value=None)
+    filepath_globpattern: str | None = pw.column_definition(default_value=None)
+
+def _enumerate_queries(queries: list[str]) -> list[tuple[int, str]]:
+    return list(enumerate(queries))
+
+def _ordered_results(pairs: tuple) -> pw.Json:
+    return pw.Json([result.value for _, result in sorted(pairs, key=lambda p: p[0])])
+
+def retrieve_batch_query(server, batch_queries):
+    """Explodes each request into one row per query, runs them through the normal retrieval
+    in the same commit (so the embedder sees them as one batch) and regroups per request."""
+    exploded = batch_queries.select(
+        pw.this.k, pw.this.metadata_filter, pw.this.filepath_globpattern,
+        item=pw.apply(_enumerate_queries, pw.this.queries),
+    ).flatten(pw.this.item, origin_id="request_id")
+    exploded = exploded.select(
+        pw.this.request_id, pw.this.k, pw.this.metadata_filter, pw.this.filepath_globpattern,
+        position=pw.this.item[0], query=pw.this.item[1],
+    )
+
+    results = server.retrieve_query(
+        exploded.select(pw.this.query, pw.this.k, pw.this.metadata_filter, pw.this.filepath_globpattern)
+    ).with_universe_of(exploded)
+    combined = exploded.select(pw.this.request_id, pw.this.position, result=results.result)
+
+    return (
+        combined.groupby(pw.this.request_id)
+        .reduce(pw.this.request_id, pairs=pw.reducers.tuple(pw.make_tuple(pw.this.position, pw.this.result)))
+        .with_id(pw.this.request_id)
+        .select(result=pw.apply(_ordered_results, pw.this.pairs))
+    )
+
+def report_index_progress(cache, started, interval=5.0):
+    """Prints cache hit/miss counters whenever indexing makes progress (cold vs warm startup at a glance)."""
+    last = None
+    while True:
+        time.sleep(interval)
+        stats = cache.stats()
+        if stats != last:
+            print(f"📊 Index cache after {time.time() - started:.1f}s: {stats}")
+            last = stats
+
+# 5. THE SERVER
+def run_pathway_server(host="127.0.0.1", port=8000):
+    started = time.time()
     print("🧠 PATHWAY BRAIN ACTIVATED: Watching ./oni_workspace")
     print("⏳ Loading Embedding Model (This takes 10s the first time)...")
-    
-    local_embedder = SentenceTransformerEmbedder(model="all-MiniLM-L6-v2")
 
+    local_embedder = BatchedSentenceTransformerEmbedder(model="all-MiniLM-L6-v2", cache=workspace_cache)
+
+    # Unchanged files hit ./pathway_cache instead of being re-parsed and re-embedded on restart
     server = VectorStoreServer(
         *data_sources,
         embedder=local_embedder,
-        parser=ParseUnstructured()
-    )
-    
-    # <--- FIX IS HERE: Changed .run() to .run_server()
-    server.run_server(
-        host="127.0.0.1", 
-        port=8000,
-        with_cache=False
+        parser=CachedParser(ParseUnstructured(), workspace_cache)
     )
 
+    # Same routes as server.run_server(), plus /v1/retrieve_batch on the same webserver
+    webserver = pw.io.http.PathwayWebserver(host=host, port=port)
+
+    def serve(route, schema, handler):
+        queries, writer = pw.io.http.rest_connector(
+            webserver=webserver,
+            route=route,
+            methods=("GET", "POST"),
+            schema=schema,
+            autocommit_duration_ms=50,
+            delete_completed_queries=True,
+        )
+        writer(handler(queries))
+
+    serve("/v1/retrieve", server.RetrieveQuerySchema, server.retrieve_query)
+    serve("/v1/retrieve_batch", BatchRetrieveQuerySchema, lambda queries: retrieve_batch_query(server, queries))
+    serve("/v1/statistics", server.StatisticsQuerySchema, server.statistics_query)
+    serve("/v1/inputs", server.InputsQuerySchema, server.inputs_query)
+
+    threading.Thread(target=report_index_progress, args=(workspace_cache, started), daemon=True).start()
+    print(f"✅ Serving /v1/retrieve, /v1/retrieve_batch, /v1/statistics, /v1/inputs on {host}:{port}")
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+
 if __name__ == "__main__":
-    run_pathway_server()
\ No newline at end of file
+    run_pathway_server()
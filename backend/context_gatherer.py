@@ -0,0 +1,71 @@
+# context_gatherer.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class ContextGatherer:
+    """Runs context providers concurrently on a shared thread pool under a deadline budget."""
+    def __init__(self, budget=1.6, max_workers=8):
+        self.budget = budget
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="context")
+        self.providers = {} # name -> (fn, deadline)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def register(self, name, fn, deadline):
+        """Adds a provider. fn(request) is called with the dict passed to gather()."""
+        self.providers[name] = (fn, deadline)
+        self._stats[name] = {"calls": 0, "ok": 0, "timeouts": 0, "errors": 0, "last_ms": 0.0, "avg_ms": 0.0, "max_ms": 0.0}
+
+    def _record(self, name, started, outcome):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            s = self._stats[name]
+            s["calls"] += 1
+            s[outcome] += 1
+            s["last_ms"] = round(elapsed_ms, 1)
+            s["max_ms"] = round(max(s["max_ms"], elapsed_ms), 1)
+            s["avg_ms"] = round(s["avg_ms"] + (elapsed_ms - s["avg_ms"]) / s["calls"], 1)
+
+    def gather(self, request, budget=None):
+        """Starts every provider at once and returns {name: result} for those that beat their deadline.
+        Returns as soon as every provider has either finished or passed its own deadline (capped by the
+        overall budget); late providers are left out of the prompt."""
+        budget = self.budget if budget is None else budget
+        started = time.perf_counter()
+        futures = {}
+        for name, (fn, deadline) in self.providers.items():
+            future = self.executor.submit(fn, request)
+            futures[future] = (name, min(deadline, budget))
+
+        results = {}
+        pending = set(futures)
+        while pending:
+            elapsed = time.perf_counter() - started
+            # Only providers still inside their own deadline are worth waiting for
+            next_deadline = min((futures[f][1] for f in pending if futures[f][1] > elapsed), default=None)
+            if next_deadline is None: break
+            done, pending = wait(pending, timeout=next_deadline - elapsed, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, deadline = futures[future]
+                if future.exception() is not None:
+                    print(f"🔴 Context provider '{name}' failed: {future.exception()}")
+                    self._record(name, started, "errors")
+                elif time.perf_counter() - started > deadline:
+                    self._record(name, started, "timeouts")
+                else:
+                    results[name] = future.result()
+                    self._record(name, started, "ok")
+
+        for future in pending:
+            name, deadline = futures[future]
+            print(f"⏳ Context provider '{name}' missed its {deadline}s deadline.")
+            # Still record how long it really took once it finishes
+            future.add_done_callback(lambda f, name=name: self._record(name, started, "timeouts"))
+        return results
+
+    def stats(self):
+        """Per-provider latency, to see which one is the slow one."""
+        with self._lock:
+            return {name: dict(s) for name, s in self._stats.items()}
@@ -0,0 +1,344 @@
+# drone_controller.py
+
+import collections
+import itertools
+import os
+import queue
+import threading
+import time
+
+from drone_mission import MissionProgress, upload_mission
+
+TELEMETRY_ATTRIBUTES = ("location.global_relative_frame", "battery", "mode", "armed", "gps_0")
+TELEMETRY_MESSAGES = ("VFR_HUD", "MISSION_ITEM_REACHED")
+# Messages behind the telemetry snapshot (ids from common.xml); their rate is requested on connect
+STREAM_MESSAGES = {"SYS_STATUS": 1, "ATTITUDE": 30, "GLOBAL_POSITION_INT": 33, "VFR_HUD": 74}
+MAV_CMD_SET_MESSAGE_INTERVAL = 511
+URGENT_COMMANDS = ("land", "rtl") # Jump the queue and interrupt whatever the drone thread is waiting on
+FLIGHT_COMMANDS = ("takeoff", "mission") # Cancelled while still queued when an urgent command arrives
+
+class DroneCommandAborted(RuntimeError):
+    pass
+
+def _claim(path):
+    """Exclusive, non-blocking OS lock on path, held until the process exits (the OS drops it on a crash).
+    Returns the open file, or None if another process holds it."""
+    f = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+class DroneController:
+    """Owns the DroneKit vehicle on one dedicated thread. Request threads submit commands and get an ID back
+    immediately; the telemetry snapshot is an immutable dict that vehicle listeners replace as a whole,
+    so readers never lock or touch the connection.
+    connect_fn/mode_factory/command_factory are dronekit's connect/VehicleMode/Command or a stand-in.
+    The queue and snapshot are per process, so exactly one process may own the vehicle: with link_lock set,
+    connect fails in any other process instead of opening a second link (app.py runs one gunicorn worker)."""
+    def __init__(self, connection_string="tcp:127.0.0.1:5762", connect_fn=None, mode_factory=None, command_factory=None,
+                 arm_timeout=5.0, mode_timeout=3.0, max_commands=256, upload_timeout=30.0, climb_timeout=60.0,
+                 link_lock=None, stream_hz=None):
+        self.connection_string = connection_string
+        self.stream_hz = stream_hz # Rate asked of the autopilot for STREAM_MESSAGES (None keeps its defaults)
+        self.link_lock = link_lock
+        self._link_claim = None
+        self.connect_fn = connect_fn
+        self.mode_factory = mode_factory
+        self.command_factory = command_factory
+        self.arm_timeout = arm_timeout
+        self.mode_timeout = mode_timeout
+        self.max_commands = max_commands
+        self.upload_timeout = upload_timeout
+        self.climb_timeout = climb_timeout
+        self.mission = MissionProgress()
+        self.vehicle = None # Only touched on the drone thread
+        self._queue = queue.PriorityQueue() # (priority, id, record): urgent commands first, FIFO otherwise
+        self._abort = threading.Event() # Set by an urgent submit; checked by every wait on the drone thread
+        self._ids = itertools.count(1)
+        self._commands = collections.OrderedDict() # id -> command record (bounded)
+        self._commands_lock = threading.Lock()
+        self._telemetry_lock = threading.Lock() # Serializes writers only
+        self._telemetry = {"connected": False, "updated": None}
+        self._changed = threading.Condition() # Wakes waiters (arming, mode) on listener updates
+        self._listeners = []
+        self._command_listeners = []
+        self._thread = None
+        self.handlers = {"connect": self._connect, "takeoff": self._takeoff, "land": self._land, "rtl": self._rtl,
+                         "mission": self._mission}
+
+    # --- LIFECYCLE ---
+    def _ensure_worker(self):
+        with self._commands_lock:
+            if self._thread and self._thread.is_alive(): return
+            self._thread = threading.Thread(target=self._run, name="drone-controller", daemon=True)
+            self._thread.start()
+
+    @property
+    def connected(self):
+        return self._telemetry["connected"]
+
+    def accepting_commands(self):
+        """Connected, or a connect is already queued/running (flight commands will run after it)."""
+        return self.connected or any(c["command"] == "connect" for c in self.pending())
+
+    # --- COMMANDS ---
+    def submit(self, command, **params):
+        """Queues a command and returns its ID without waiting for the vehicle.
+        land/rtl abort queued flight commands and the running command's waits (climb, arming, upload), and go
+        to the front of the queue unless a connect is still pending (they run right after it instead)."""
+        if command not in self.handlers:
+            raise ValueError(f"Unknown drone command: {command}")
+        self._ensure_worker()
+        command_id = str(next(self._ids))
+        record = {"id": command_id, "command": command, "params": params, "status": "queued",
+                  "message": None, "submitted": time.time(), "finished": None}
+        urgent = command in URGENT_COMMANDS
+        with self._commands_lock:
+            connecting = any(r["command"] == "connect" and r["status"] in ("queued", "running")
+                             for r in self._commands.values())
+            if urgent:
+                for r in self._commands.values():
+                    if r["command"] in FLIGHT_COMMANDS and r["status"] == "queued":
+                        r.update(status="aborted", message=f"Cancelled by {command} before it started.",
+                                 finished=time.time())
+            self._commands[command_id] = record
+            while len(self._commands) > self.max_commands:
+                self._commands.popitem(last=False)
+        self._queue.put((0 if urgent and not connecting else 1, int(command_id), record))
+        if urgent:
+            self._abort.set()
+            with self._changed:
+                self._changed.notify_all()
+        return command_id
+
+    def status(self, command_id):
+        with self._commands_lock:
+            record = self._commands.get(command_id)
+            return dict(record) if record else None
+
+    def pending(self):
+        """Commands still queued or running, oldest first."""
+        with self._commands_lock:
+            return [dict(r) for r in self._commands.values() if r["status"] in ("queued", "running")]
+
+    def _run(self):
+        while True:
+            _, _, record = self._queue.get()
+            with self._commands_lock:
+                cancelled = record["status"] != "queued" # Aborted by a land/rtl while it waited
+                if not cancelled: record["status"] = "running"
+            if cancelled:
+                self._notify_command(record)
+                continue
+            if record["command"] in URGENT_COMMANDS:
+                self._abort.clear() # This is the command the abort was for
+            try:
+                message = self.handlers[record["command"]](**record["params"])
+                self._update(record, status="done", message=message, finished=time.time())
+            except DroneCommandAborted as e:
+                print(f"⚠️ Drone command {record['command']} aborted: {e}")
+                self._update(record, status="aborted", message=str(e), finished=time.time())
+            except Exception as e:
+                print(f"🔴 Drone command {record['command']} failed: {e}")
+                self._update(record, status="failed", message=str(e), finished=time.time())
+            self._notify_command(record)
+
+    def _notify_command(self, record):
+        for callback in list(self._command_listeners):
+            try:
+                callback(self.status(record["id"]) or dict(record))
+            except Exception as e:
+                print(f"🔴 Command listener failed: {e}")
+
+    def subscribe_commands(self, callback):
+        """callback(record) after each command finishes (called on the drone thread)."""
+        self._command_listeners.append(callback)
+
+    def _update(self, record, **changes):
+        with self._commands_lock:
+            record.update(changes)
+
+    # --- TELEMETRY ---
+    def telemetry(self):
+        """Latest snapshot (a plain dict; never mutated after publication)."""
+        return self._telemetry
+
+    def subscribe(self, callback):
+        """callback(snapshot) after every telemetry change (called on DroneKit's listener thread)."""
+        self._listeners.append(callback)
+
+    def _publish(self, **fields):
+        with self._telemetry_lock:
+            snapshot = {**self._telemetry, **fields, "updated": time.time()}
+            self._telemetry = snapshot # Atomic reference swap: readers see the old or the new dict
+        with self._changed:
+            self._changed.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"🔴 Telemetry listener failed: {e}")
+
+    def _on_attribute(self, vehicle, name, value):
+        if name == "location.global_relative_frame":
+            self._publish(lat=value.lat, lon=value.lon, alt=value.alt)
+        elif name == "battery":
+            self._publish(battery_voltage=value.voltage, battery_level=value.level)
+        elif name == "mode":
+            self._publish(mode=value.name)
+        elif name == "armed":
+            self._publish(armed=bool(value))
+        elif name == "gps_0":
+            self._publish(gps_fix=value.fix_type, satellites=value.satellites_visible)
+
+    def _on_message(self, vehicle, name, message):
+        if name == "VFR_HUD":
+            self._publish(groundspeed=message.groundspeed, airspeed=message.airspeed, heading=message.heading,
+                          climb=message.climb, throttle=message.throttle)
+        elif name == "MISSION_ITEM_REACHED":
+            self.mission.on_item_reached(message.seq)
+            self._publish(mission_reached=message.seq)
+
+    def _wait_for(self, predicate, timeout):
+        """Blocks the drone thread until a telemetry snapshot satisfies predicate (no sleep polling).
+        Raises DroneCommandAborted as soon as an urgent command (land/rtl) is submitted."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while not predicate(self._telemetry):
+                if self._abort.is_set():
+                    raise DroneCommandAborted("Interrupted by an urgent command.")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: return False
+                self._changed.wait(remaining)
+        return True
+
+    def _run_abortable(self, fn, timeout, *args):
+        """Runs a blocking vehicle call (e.g. a mission upload) on a helper thread so the drone thread
+        keeps honouring aborts while it waits."""
+        result = {}
+        def target():
+            try:
+                fn(*args)
+            except Exception as e:
+                result["error"] = e
+            finally:
+                result["done"] = True
+                with self._changed:
+                    self._changed.notify_all()
+        threading.Thread(target=target, name="drone-blocking-call", daemon=True).start()
+        if not self._wait_for(lambda t: result.get("done"), timeout):
+            raise RuntimeError(f"{fn.__name__} timed out.")
+        if "error" in result: raise result["error"]
+
+    # --- HANDLERS (drone thread only) ---
+    def _require_vehicle(self):
+        if self.vehicle is None:
+            raise RuntimeError("The drone is not connected yet.")
+        return self.vehicle
+
+    def _set_mode(self, name):
+        self._require_vehicle().mode = self.mode_factory(name)
+        return self._wait_for(lambda t: t.get("mode") == name, self.mode_timeout)
+
+    def _connect(self):
+        if self.vehicle is not None:
+            return "Already connected."
+        if self.link_lock and self._link_claim is None:
+            self._link_claim = _claim(self.link_lock)
+            if self._link_claim is None:
+                raise RuntimeError(f"Another process owns the drone link ({self.link_lock}). Run a single app worker.")
+        print(f"Attempting to connect to ArduPilot SITL via {self.connection_string}...")
+        # wait_ready=False so a missing SITL fails fast instead of hanging
+        vehicle = self.connect_fn(self.connection_string, wait_ready=False)
+        print("🔧 waiting for parameters...")
+        vehicle.wait_ready('parameters')
+        print("🔧 Disabling Safety Checks via Code...")
+        vehicle.parameters['ARMING_CHECK'] = 0
+        for name in TELEMETRY_ATTRIBUTES:
+            vehicle.add_attribute_listener(name, self._on_attribute)
+        for name in TELEMETRY_MESSAGES:
+            vehicle.add_message_listener(name, self._on_message)
+        if self.stream_hz:
+            self._request_stream_rate(vehicle, self.stream_hz)
+        self.vehicle = vehicle
+        self._publish(connected=True, mode=getattr(vehicle.mode, "name", None), armed=bool(vehicle.armed))
+        return "Connection established. Safety checks disabled. Drone is ready."
+
+    def _request_stream_rate(self, vehicle, hz):
+        """MAV_CMD_SET_MESSAGE_INTERVAL for every STREAM_MESSAGES entry: ArduPilot streams them at ~4 Hz by
+        default (SR*_ parameters), far below what the telemetry ring records. Not fatal if the link refuses."""
+        interval_us = int(1e6 / hz)
+        try:
+            for msg_id in STREAM_MESSAGES.values():
+                vehicle.send_mavlink(vehicle.message_factory.command_long_encode(
+                    0, 0, MAV_CMD_SET_MESSAGE_INTERVAL, 0, msg_id, interval_us, 0, 0, 0, 0, 0))
+            print(f"📡 Requested {hz:g} Hz telemetry ({', '.join(STREAM_MESSAGES)}).")
+        except Exception as e:
+            print(f"⚠️ Could not request telemetry stream rates: {e}")
+
+    def _takeoff(self, altitude=10):
+        vehicle = self._require_vehicle()
+        print("⚙️ Forcing GUIDED mode...")
+        self._set_mode("GUIDED")
+        print("⚙️ Forcing ARM...")
+        deadline = time.monotonic() + self.arm_timeout
+        while not self._telemetry.get("armed"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError("The drone refused to arm. Check safety switches.")
+            vehicle.armed = True # Re-sent every second until the armed listener fires
+            self._wait_for(lambda t: t.get("armed"), min(1.0, remaining))
+        print("🚀 ARMED. TAKING OFF!")
+        vehicle.simple_takeoff(altitude)
+        return f"Taking off to {altitude} meters."
+
+    def _abort_mission(self):
+        if self.mission.snapshot()["status"] in ("uploading", "starting", "active"):
+            self.mission.set_status("aborted")
+
+    def _land(self):
+        self._abort_mission()
+        if not self._set_mode("LAND"):
+            raise RuntimeError("The drone refused LAND mode.")
+        return "Initiating landing sequence."
+
+    def _rtl(self):
+        self._abort_mission()
+        if not self._set_mode("RTL"):
+            raise RuntimeError("The drone refused RTL mode.")
+        return "Returning to Launch."
+
+    def _mission(self, waypoints, altitude=None):
+        """Uploads the whole mission, climbs first if still on the ground, then hands over to AUTO.
+        Progress after that arrives through MISSION_ITEM_REACHED (see self.mission)."""
+        vehicle = self._require_vehicle()
+        if self.command_factory is None:
+            raise RuntimeError("Mission upload needs a command factory (dronekit.Command).")
+        self.mission.start(waypoints)
+        try:
+            print(f"🗺️ Uploading {len(waypoints)} mission items...")
+            self._run_abortable(upload_mission, self.upload_timeout + 5, vehicle, waypoints, self.command_factory,
+                                self.upload_timeout)
+            if not self._telemetry.get("armed"):
+                # Copter won't start an AUTO mission from the ground without pilot throttle; take off in GUIDED first
+                altitude = altitude or next((w["alt"] for w in waypoints if w["alt"] > 0), 10)
+                self._takeoff(altitude)
+                if not self._wait_for(lambda t: (t.get("alt") or 0) >= altitude * 0.95, self.climb_timeout):
+                    raise RuntimeError("The drone did not reach mission altitude.")
+            self.mission.set_status("starting")
+            if not self._set_mode("AUTO"):
+                raise RuntimeError("The drone refused AUTO mode.")
+            self.mission.set_status("active")
+        except Exception as e:
+            self.mission.set_status("aborted" if isinstance(e, DroneCommandAborted) else "failed", str(e))
+            raise
+        return f"Mission uploaded: flying {len(waypoints)} waypoints in AUTO."
@@ -0,0 +1,183 @@
+# drone_mission.py
+
+import json
+import math
+import re
+import threading
+import time
+
+# MAVLink constants (values from common.xml) so parsing doesn't need pymavlink
+MAV_FRAME_GLOBAL_RELATIVE_ALT = 3
+MAV_CMD_NAV_WAYPOINT = 16
+MAV_CMD_NAV_LOITER_TIME = 19
+MAV_CMD_NAV_RETURN_TO_LAUNCH = 20
+MAV_CMD_NAV_LAND = 21
+MAV_CMD_NAV_TAKEOFF = 22
+COMMAND_NAMES = {"waypoint": MAV_CMD_NAV_WAYPOINT, "loiter": MAV_CMD_NAV_LOITER_TIME, "rtl": MAV_CMD_NAV_RETURN_TO_LAUNCH,
+                 "land": MAV_CMD_NAV_LAND, "takeoff": MAV_CMD_NAV_TAKEOFF}
+MAX_ITEMS = 700 # ArduCopter's default mission storage on most boards
+
+def mission_item(lat, lon, alt, command=MAV_CMD_NAV_WAYPOINT, params=(0, 0, 0, 0), frame=MAV_FRAME_GLOBAL_RELATIVE_ALT):
+    """One mission item as a plain dict (the shape every parser returns)."""
+    return {"command": int(command), "frame": int(frame), "params": [math.nan if p is None else float(p) for p in params], # QGC writes NaN ("unchanged") as null
+            "lat": float(lat), "lon": float(lon), "alt": float(alt)}
+
+def _validate(items):
+    if not items:
+        raise ValueError("The mission has no waypoints.")
+    if len(items) > MAX_ITEMS:
+        raise ValueError(f"The mission has {len(items)} items; the autopilot holds at most {MAX_ITEMS}.")
+    for i, item in enumerate(items):
+        if item["command"] == MAV_CMD_NAV_RETURN_TO_LAUNCH: continue # RTL ignores its coordinates
+        if not (-90 <= item["lat"] <= 90 and -180 <= item["lon"] <= 180):
+            raise ValueError(f"Waypoint {i + 1} has invalid coordinates ({item['lat']}, {item['lon']}).")
+    return items
+
+# --- PARSERS ---
+def parse_waypoints_file(text):
+    """QGC WPL 110 text (Mission Planner / QGroundControl .waypoints). Row 0 is home and is skipped:
+    DroneKit keeps the vehicle's own home when the mission is cleared."""
+    lines = [l for l in text.strip().splitlines() if l.strip()]
+    if not lines or not lines[0].startswith("QGC WPL"):
+        raise ValueError("Not a QGC WPL waypoints file.")
+    items = []
+    for line in lines[1:]:
+        cols = line.split()
+        if len(cols) < 12:
+            raise ValueError(f"Malformed waypoint row: {line!r}")
+        if int(cols[0]) == 0: continue
+        items.append(mission_item(cols[8], cols[9], cols[10], command=cols[3], params=cols[4:8], frame=cols[2]))
+    return _validate(items)
+
+def _command_code(value):
+    if value is None: return MAV_CMD_NAV_WAYPOINT
+    if isinstance(value, str) and not value.isdigit():
+        if value.lower() not in COMMAND_NAMES:
+            raise ValueError(f"Unknown mission command: {value}")
+        return COMMAND_NAMES[value.lower()]
+    return int(value)
+
+def parse_mission_json(data, default_alt=10):
+    """Accepts a list of [lat, lon(, alt)] or {"lat", "lon", "alt", "command", "hold"} entries, an object with
+    a "waypoints" list, or a QGroundControl .plan file (mission.items)."""
+    if isinstance(data, str): data = json.loads(data)
+    if isinstance(data, dict):
+        if "mission" in data: # QGC .plan
+            items = []
+            for entry in data["mission"].get("items", []):
+                if entry.get("type") != "SimpleItem":
+                    raise ValueError("Complex .plan items (surveys, corridors) are not supported.")
+                p = entry["params"]
+                items.append(mission_item(p[4], p[5], p[6], command=entry["command"], params=p[:4],
+                                          frame=entry.get("frame", MAV_FRAME_GLOBAL_RELATIVE_ALT)))
+            return _validate(items)
+        data = data.get("waypoints", [])
+    items = []
+    for entry in data:
+        if isinstance(entry, (list, tuple)):
+            items.append(mission_item(entry[0], entry[1], entry[2] if len(entry) > 2 else default_alt))
+            continue
+        command = _command_code(entry.get("command"))
+        params = entry.get("params") or [entry.get("hold", 0), 0, 0, 0]
+        items.append(mission_item(entry.get("lat", 0), entry.get("lon", 0), entry.get("alt", default_alt),
+                                  command=command, params=params))
+    return _validate(items)
+
+_COORD = re.compile(r"(-?\d{1,2}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)")
+# An altitude needs an explicit marker ("at 20", "@20", "altitude 20") or unit ("20 m", "60 ft"), so the next
+# waypoint's latitude in "a, b, c, d" is never mistaken for one
+_ALT = re.compile(r"(?:\bat\b|@|\balt(?:itude)?\b)\s*(\d+(?:\.\d+)?)\s*(m|meters?|metres?|ft|feet)?\b"
+                  r"|(\d+(?:\.\d+)?)\s*(m|meters?|metres?|ft|feet)\b", re.IGNORECASE)
+
+def _altitude(segment):
+    match = _ALT.search(segment)
+    if not match: return None
+    value, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    return float(value) * (0.3048 if unit and unit.lower() in ("ft", "feet") else 1.0)
+
+def parse_mission_text(text, default_alt=10):
+    """Free-text prompt: every "lat, lon" pair in order, each with the altitude stated after it. Waypoints
+    without one take the previous stated altitude, or the first one stated anywhere (so a single trailing
+    "at 20 meters" covers the whole route). A land / return home after the last waypoint is appended."""
+    pairs = list(_COORD.finditer(text))
+    if not pairs:
+        raise ValueError("No waypoint coordinates found in the request.")
+    ends = [m.start() for m in pairs[1:]] + [len(text)]
+    own = [_altitude(text[m.end():end]) for m, end in zip(pairs, ends)]
+    stated = [a for a in [_altitude(text[:pairs[0].start()])] + own if a is not None]
+    alt = stated[0] if stated else default_alt
+    items = []
+    for m, own_alt in zip(pairs, own):
+        if own_alt is not None: alt = own_alt
+        items.append(mission_item(m.group(1), m.group(2), alt))
+    tail = text[pairs[-1].end():].lower()
+    if re.search(r"\b(?:rtl|return|come back)\b", tail):
+        items.append(mission_item(0, 0, 0, command=MAV_CMD_NAV_RETURN_TO_LAUNCH))
+    elif re.search(r"\bland\b", tail):
+        items.append(mission_item(items[-1]["lat"], items[-1]["lon"], 0, command=MAV_CMD_NAV_LAND))
+    return _validate(items)
+
+def parse_mission(source, default_alt=10):
+    """Dispatches on content: already-parsed JSON, QGC WPL text, JSON text, or a prompt."""
+    if isinstance(source, (list, dict)):
+        return parse_mission_json(source, default_alt)
+    text = source.strip()
+    if text.startswith("QGC WPL"):
+        return parse_waypoints_file(text)
+    if text[:1] in "[{":
+        return parse_mission_json(text, default_alt)
+    return parse_mission_text(text, default_alt)
+
+# --- UPLOAD ---
+def upload_mission(vehicle, items, command_factory, timeout=30):
+    """Replaces the vehicle's mission in one MAVLink transaction (clear, count, item requests) via vehicle.commands.
+    Items land at seq 1..N; seq 0 stays the vehicle's home."""
+    cmds = vehicle.commands
+    cmds.download()
+    cmds.wait_ready()
+    cmds.clear()
+    for item in items:
+        p1, p2, p3, p4 = item["params"]
+        cmds.add(command_factory(0, 0, 0, item["frame"], item["command"], 0, 0, p1, p2, p3, p4,
+                                 item["lat"], item["lon"], item["alt"]))
+    cmds.upload(timeout=timeout)
+    cmds.next = 1 # Start from the first uploaded item even if an older mission was part-flown
+
+# --- PROGRESS ---
+class MissionProgress:
+    """Mission state driven by MISSION_ITEM_REACHED messages (seq 1..N) rather than polling the vehicle."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {"status": "idle"}
+        self._done = threading.Event()
+
+    def start(self, items):
+        with self._lock:
+            self._state = {"status": "uploading", "total": len(items), "reached": 0, "current": 1,
+                           "reached_at": [], "started": time.time(), "finished": None, "error": None}
+            self._done.clear()
+
+    def set_status(self, status, error=None):
+        with self._lock:
+            if self._done.is_set(): return # Terminal states only change through start()
+            self._state = {**self._state, "status": status, "error": error}
+            if status in ("complete", "failed", "aborted"):
+                self._state["finished"] = time.time()
+                self._done.set()
+
+    def on_item_reached(self, seq):
+        with self._lock:
+            state = self._state
+            if state.get("status") not in ("starting", "active") or seq <= state["reached"]: return # Duplicate / stale reports
+            self._state = {**state, "reached": seq, "current": min(seq + 1, state["total"]),
+                           "reached_at": state["reached_at"] + [(seq, time.time())]}
+            finished = seq >= state["total"]
+        if finished: self.set_status("complete")
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._state)
+
+    def wait(self, timeout=None):
+        """Blocks until the mission completes, fails or is aborted."""
+        return self._done.wait(timeout)
@@ -0,0 +1,123 @@
+# face_detection.py
+
+import collections
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+class FaceDetector:
+    """Configurable face detection for camera frames:
+    downscales before detecting (boxes are mapped back to full resolution), searches near the last
+    known face of a client first (ROI tracking), drops faces below a minimum size, and can use
+    OpenCV's DNN SSD face detector with a preallocated input blob instead of the Haar cascade."""
+    DNN_SIZE = 300
+    DNN_MEAN = np.array([104.0, 177.0, 123.0], dtype=np.float32)
+
+    def __init__(self, cascade_path, backend=None, detect_width=320, min_face=60, roi_margin=0.5,
+                 track_ttl=2.0, max_tracks=256, dnn_model=None, dnn_config=None, dnn_confidence=0.6):
+        self.backend = backend or os.getenv("FACE_DETECTOR", "haar")
+        self.detect_width = detect_width # Frames wider than this are downscaled before detection (never below min_face)
+        self.min_face = min_face # Minimum face size in full-resolution pixels
+        self.roi_margin = roi_margin # ROI = last box grown by this fraction on each side
+        self.track_ttl = track_ttl
+        self.max_tracks = max_tracks
+        self.dnn_confidence = dnn_confidence
+        self._tracks = collections.OrderedDict() # key -> ((x, y, w, h), timestamp)
+        self._lock = threading.Lock()
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        # Haar can't find faces smaller than its training window, so this is the real minSize floor
+        self.haar_window = 24 if self.cascade.empty() else int(self.cascade.getOriginalWindowSize()[0])
+
+        self.net = None
+        if self.backend == "dnn":
+            dnn_model = dnn_model or os.getenv("FACE_DNN_MODEL")
+            dnn_config = dnn_config or os.getenv("FACE_DNN_CONFIG")
+            try:
+                self.net = cv2.dnn.readNet(dnn_model, dnn_config)
+                self._resized = np.empty((self.DNN_SIZE, self.DNN_SIZE, 3), dtype=np.uint8)
+                self._blob = np.empty((1, 3, self.DNN_SIZE, self.DNN_SIZE), dtype=np.float32)
+                self._dnn_lock = threading.Lock() # The net and the blob are shared
+                print(f"✅ DNN face detector loaded ({os.path.basename(dnn_model)}).")
+            except (cv2.error, TypeError) as e:
+                print(f"⚠️ Could not load DNN face detector ({e}). Using the Haar cascade.")
+                self.backend = "haar"
+
+    # --- BACKENDS ---
+    def _haar(self, gray, min_size):
+        min_size = max(int(round(min_size)), self.haar_window)
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(min_size, min_size))
+        return [tuple(int(v) for v in f) for f in faces]
+
+    def _dnn(self, bgr, min_size):
+        h, w = bgr.shape[:2]
+        with self._dnn_lock:
+            cv2.resize(bgr, (self.DNN_SIZE, self.DNN_SIZE), dst=self._resized)
+            np.subtract(self._resized.transpose(2, 0, 1), self.DNN_MEAN[:, None, None], out=self._blob[0])
+            self.net.setInput(self._blob)
+            detections = self.net.forward()[0, 0]
+        faces = []
+        for _, _, confidence, x1, y1, x2, y2 in detections:
+            if confidence < self.dnn_confidence: continue
+            x1, y1 = max(int(x1 * w), 0), max(int(y1 * h), 0)
+            x2, y2 = min(int(x2 * w), w), min(int(y2 * h), h)
+            if min(x2 - x1, y2 - y1) >= min_size:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return faces
+
+    def _detect_region(self, frame, gray, offset=(0, 0)):
+        """Detects in a (possibly cropped) region, downscaled to detect_width; returns full-resolution boxes.
+        Haar never downscales so far that a min_face face shrinks below the cascade window: below that the
+        effective minimum in the original frame would be window / scale instead of min_face."""
+        scale = min(1.0, self.detect_width / gray.shape[1])
+        if self.backend == "dnn":
+            faces = self._dnn(frame, self.min_face) # The net resizes to 300x300 itself
+            scale = 1.0
+        else:
+            scale = max(scale, min(1.0, self.haar_window / self.min_face))
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+            faces = self._haar(small, self.min_face * scale)
+        ox, oy = offset
+        return [(int(x / scale) + ox, int(y / scale) + oy, int(w / scale), int(h / scale)) for x, y, w, h in faces]
+
+    # --- TRACKING ---
+    def _track(self, key):
+        with self._lock:
+            track = self._tracks.get(key)
+            if track and time.monotonic() - track[1] > self.track_ttl:
+                del self._tracks[key]
+                return None
+            return track[0] if track else None
+
+    def _update_track(self, key, faces):
+        with self._lock:
+            if not faces:
+                self._tracks.pop(key, None)
+                return
+            self._tracks[key] = (max(faces, key=lambda f: f[2] * f[3]), time.monotonic())
+            self._tracks.move_to_end(key)
+            while len(self._tracks) > self.max_tracks:
+                self._tracks.popitem(last=False)
+
+    # --- PUBLIC ---
+    def detect(self, frame, gray=None, key=None):
+        """Face boxes (x, y, w, h) in full-resolution coordinates, largest first.
+        Pass a stable key (e.g. per browser session) to enable ROI tracking between frames."""
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = []
+        box = self._track(key) if key is not None else None
+        if box:
+            x, y, w, h = box
+            mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+            x0, y0 = max(x - mx, 0), max(y - my, 0)
+            x1, y1 = min(x + w + mx, gray.shape[1]), min(y + h + my, gray.shape[0])
+            faces = self._detect_region(frame[y0:y1, x0:x1], gray[y0:y1, x0:x1], offset=(x0, y0))
+        if not faces:
+            faces = self._detect_region(frame, gray)
+        faces.sort(key=lambda f: f[2] * f[3], reverse=True)
+        if key is not None:
+            self._update_track(key, faces)
+        return faces
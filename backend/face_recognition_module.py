@@ -2,9 +2,15 @@
 
 import cv2
 import os
+import json
+import threading
 import numpy as np
 import base64
-import time 
+from face_store import FaceStore, normalize_face
+from face_detection import FaceDetector
+from lbph_matcher import LBPHMatcher
+
+DUPLICATE_SAMPLE = "Sample too similar to a previous one. Move slightly." # /face/register answers 409 with this
 
 class FaceRecognizer:
     """Handles face registration, training, and recognition."""
@@ -13,9 +19,15 @@ class FaceRecognizer:
         # NOTE: This code uses "faces" as the folder name. Ensure this matches everywhere.
         self.dataset_path = "faces" 
         self.model_path = "face_model.yml"
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self.manifest_path = "face_model_manifest.json" # How many samples per user the saved model already contains
+        self._train_lock = threading.Lock()
+        # Downscaled Haar (or DNN via FACE_DETECTOR=dnn) with per-client ROI tracking
+        self.detector = FaceDetector(cv2.data.haarcascades + "haarcascade_frontalface_default.xml",
+                                     detect_width=int(os.getenv("FACE_DETECT_WIDTH", 320)),
+                                     min_face=int(os.getenv("FACE_MIN_SIZE", 60)))
         self.recognizer = cv2.face.LBPHFaceRecognizer_create()
-        os.makedirs(self.dataset_path, exist_ok=True)
+        self.matcher = LBPHMatcher() # Vectorized view of the recognizer's histograms, rebuilt after training
+        self.store = FaceStore(self.dataset_path, max_samples=50) # Packed per-user .npy samples
         if os.path.exists(self.model_path):
             try:
                 self.recognizer.read(self.model_path)
@@ -23,6 +35,10 @@ class FaceRecognizer:
             except cv2.error as e:
                 print(f"🔴 Error loading face model: {e}. It may be corrupted. Please retrain.")
                 os.remove(self.model_path)
+        self.matcher = LBPHMatcher.from_recognizer(self.recognizer)
+        if self.store.migrate_legacy():
+            # Old model was trained on un-normalized JPEG crops
+            self.train_model(full=True)
 
 
     def _convert_data_url_to_image(self, data_url):
@@ -46,27 +62,24 @@ class FaceRecognizer:
             return False, "Invalid image data."
             
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # ✅ FIXED: Made the detector less strict to improve detection
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4)
+        faces = self.detector.detect(frame, gray) # Largest face first
 
         if len(faces) == 0:
             return False, "No face detected in the frame."
 
-        person_path = os.path.join(self.dataset_path, name)
-        os.makedirs(person_path, exist_ok=True)
-        
-        count = len(os.listdir(person_path))
-        if count >= 50: # Reduced sample count for faster registration
+        count = self.store.count(name)
+        if count >= self.store.max_samples: # Reduced sample count for faster registration
             return False, "Maximum samples collected for this user."
 
         (x, y, w, h) = faces[0]
-        face_img = gray[y:y+h, x:x+w]
+        face_img = normalize_face(gray[y:y+h, x:x+w])
         
         # Save just one good sample per request for smoother progress
-        cv2.imwrite(os.path.join(person_path, f"{int(time.time() * 1000)}.jpg"), face_img)
+        added, count = self.store.add(name, [face_img])
+        if not added:
+            return False, DUPLICATE_SAMPLE
 
-        return True, f"Saved sample {count + 1} for {name}."
+        return True, f"Saved sample {count} for {name}."
 
     def save_friend_face_sample(self, owner_username, friend_name, image_data_url):
         """Saves face samples for a friend and registers them."""
@@ -83,93 +96,154 @@ class FaceRecognizer:
             return False, "Invalid image data provided."
             
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # ✅ FIXED: Made the detector less strict to improve detection
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4)
+        faces = self.detector.detect(frame, gray) # Largest face first
 
         if len(faces) == 0:
             return False, "No face detected. Please look directly at the camera."
 
-        person_path = os.path.join(self.dataset_path, friend_name)
-        os.makedirs(person_path, exist_ok=True)
-        count = len(os.listdir(person_path))
-        if count >= 50: # Reduced sample count
+        if self.store.count(friend_name) >= self.store.max_samples: # Reduced sample count
              return True, f"Already have enough samples for {friend_name}."
 
         (x, y, w, h) = faces[0]
-        face_img = gray[y:y+h, x:x+w]
+        face_img = normalize_face(gray[y:y+h, x:x+w])
         
-        # Save a good number of samples at once for friend registration
-        num_samples_to_save = 20
-        for i in range(num_samples_to_save):
-            filename = f"{int(time.time() * 1000) + i}.jpg"
-            cv2.imwrite(os.path.join(person_path, filename), face_img)
+        # One copy is enough: identical copies add nothing to LBPH (the store would dedup them anyway)
+        added, count = self.store.add(friend_name, [face_img])
         
         self.user_manager.add_friend(owner_username, friend_name)
 
-        print(f"✅ Saved {num_samples_to_save} samples for friend '{friend_name}' of '{owner_username}'.")
+        print(f"✅ Saved {added} sample(s) for friend '{friend_name}' of '{owner_username}' ({count} total).")
         return True, f"Face data for friend '{friend_name}' saved successfully."
 
-    def train_model(self):
-        """Trains the LBPH recognizer on all collected face samples."""
-        print("⏳ Training face model...")
-        faces, labels = [], []
-        
-        for person_name in os.listdir(self.dataset_path):
-            person_path = os.path.join(self.dataset_path, person_name)
-            if not os.path.isdir(person_path):
-                continue
-
+    def _collect_samples(self):
+        """Sample counts and face IDs per stored user: ({person: count}, {person: face_id})."""
+        counts, people = {}, {}
+        for person_name in self.store.users():
             user_data = self.user_manager.get_user_by_name(person_name)
             if not user_data:
-                print(f"⚠️ Warning: No user data found for directory '{person_name}'. Skipping.")
+                print(f"⚠️ Warning: No user data found for samples of '{person_name}'. Skipping.")
                 continue
             
-            face_id = user_data['face_id']
-
-            for img_name in os.listdir(person_path):
-                img_path = os.path.join(person_path, img_name)
-                img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                if img is not None:
-                    faces.append(img)
-                    labels.append(face_id)
-        
-        if len(faces) < 2 or len(np.unique(labels)) < 1:
-            return False, "Not enough data or users to train the model. Please add more face samples."
-
-        self.recognizer.train(faces, np.array(labels))
-        self.recognizer.write(self.model_path)
-        print("✅ Training complete! Model saved.")
-        return True, "Model trained successfully."
+            people[person_name] = user_data['face_id']
+            counts[person_name] = self.store.count(person_name)
+        return counts, people
 
-    def recognize_face(self, image_data_url):
-        """Recognizes a face from a camera frame."""
-        if not os.path.exists(self.model_path):
-            return "unrecognized", 0.0
-
-        frame = self._convert_data_url_to_image(image_data_url)
-        if frame is None:
-            return "unrecognized", 100.0
+    def _load_manifest(self):
+        if not (os.path.exists(self.model_path) and os.path.exists(self.manifest_path)):
+            return None
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest if "counts" in manifest else None # Older JPEG-path manifests mean a full retrain
+        except (OSError, ValueError):
+            return None
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # ✅ FIXED: Made the detector less strict to improve detection
-        detected_faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30, 30))
+    def _save_manifest(self, counts, people):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"counts": counts, "people": people}, f)
+        os.replace(tmp_path, self.manifest_path)
 
-        if len(detected_faces) == 0:
-            return "unrecognized", 100.0
+    def _read_samples(self, ranges, people):
+        """Stored rows [start, end) per person, with their labels."""
+        faces, labels = [], []
+        for person_name, (start, end) in ranges.items():
+            rows = self.store.load(person_name)[start:end]
+            faces.extend(rows)
+            labels.extend([people[person_name]] * len(rows))
+        return faces, labels
+
+    def train_model(self, full=False):
+        """Trains the LBPH recognizer. Only rows appended since the last run are fed to update();
+        a full retrain happens when users disappeared (LBPH can't forget) or when forced."""
+        with self._train_lock:
+            counts, people = self._collect_samples()
+            manifest = None if full else self._load_manifest()
+
+            if manifest is not None:
+                trained, trained_people = manifest["counts"], manifest["people"]
+                removed = [p for p in trained if counts.get(p, 0) < trained[p] or people.get(p) != trained_people.get(p)]
+                if not removed:
+                    new_ranges = {p: (trained.get(p, 0), n) for p, n in counts.items() if n > trained.get(p, 0)}
+                    if not new_ranges:
+                        return True, "Model already up to date."
+                    faces, labels = self._read_samples(new_ranges, people)
+                    print(f"⏳ Updating face model with {len(faces)} new samples...")
+                    self.recognizer.update(faces, np.array(labels))
+                    self.recognizer.write(self.model_path)
+                    self.matcher = LBPHMatcher.from_recognizer(self.recognizer)
+                    self._save_manifest(counts, people)
+                    print("✅ Incremental training complete! Model saved.")
+                    return True, "Model trained successfully."
+                print(f"⚠️ Samples of {len(removed)} trained users were removed. Falling back to a full retrain.")
+
+            print("⏳ Training face model...")
+            faces, labels = self._read_samples({p: (0, n) for p, n in counts.items()}, people)
             
-        for (x, y, w, h) in detected_faces:
-            face_img = gray[y:y+h, x:x+w]
-            try:
-                label_id, confidence = self.recognizer.predict(face_img)
-                
-                # Confidence threshold: lower value means a better match
-                if confidence < 80:
-                    name = self.user_manager.get_user_by_face_id(label_id)
-                    if name:
-                        return name, round(confidence, 2)
-            except cv2.error:
+            if len(faces) < 2 or len(np.unique(labels)) < 1:
+                return False, "Not enough data or users to train the model. Please add more face samples."
+
+            self.recognizer = cv2.face.LBPHFaceRecognizer_create() # Fresh model: train() on a loaded one keeps nothing stale
+            self.recognizer.train(faces, np.array(labels))
+            self.recognizer.write(self.model_path)
+            self.matcher = LBPHMatcher.from_recognizer(self.recognizer)
+            self._save_manifest(counts, people)
+            print("✅ Training complete! Model saved.")
+            return True, "Model trained successfully."
+
+    def remove_user(self, name):
+        """Deletes a user's face samples and retrains from scratch without them."""
+        if not self.store.remove(name):
+            return False, f"No face data found for {name}."
+        success, message = self.train_model(full=True)
+        if not success:
+            # Too little data left to train: drop the old model rather than keep recognizing the removed user
+            with self._train_lock:
+                for path in (self.model_path, self.manifest_path):
+                    if os.path.exists(path): os.remove(path)
+                self.recognizer = cv2.face.LBPHFaceRecognizer_create()
+                self.matcher = LBPHMatcher()
+        return True, f"Face data for {name} removed. {message}"
+
+    def match_faces(self, faces):
+        """Best (name, confidence) for each normalized face, all compared in one batch.
+        Confidence is the LBPH distance: lower is better, "unrecognized" at 80 and above."""
+        if not faces:
+            return []
+        labels, distances = self.matcher.predict(np.stack(faces))
+        matches = []
+        for label_id, confidence in zip(labels, distances):
+            confidence = max(float(confidence), 0.0) # float32 rounding can dip below zero on exact matches
+            name = self.user_manager.get_user_by_face_id(int(label_id)) if confidence < 80 else None
+            matches.append((name, round(confidence, 2)) if name else ("unrecognized", round(min(confidence, 100.0), 2)))
+        return matches
+
+    def recognize_burst(self, image_data_urls, track_key=None):
+        """Detects faces in several frames and matches all of them together. Returns per-frame matches."""
+        frame_faces = []
+        for data_url in image_data_urls:
+            frame = self._convert_data_url_to_image(data_url)
+            if frame is None:
+                frame_faces.append([])
                 continue
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            detected_faces = self.detector.detect(frame, gray, key=track_key)
+            frame_faces.append([normalize_face(gray[y:y+h, x:x+w]) for (x, y, w, h) in detected_faces]) # Same normalization as the stored samples
+        matches = self.match_faces([face for faces in frame_faces for face in faces])
+        per_frame, i = [], 0
+        for faces in frame_faces:
+            per_frame.append(matches[i:i + len(faces)])
+            i += len(faces)
+        return per_frame
+
+    def recognize_face(self, image_data_url, track_key=None):
+        """Recognizes a face from a camera frame (or a list of frames). Returns the best match over all faces."""
+        if not os.path.exists(self.model_path) or not len(self.matcher):
+            return "unrecognized", 0.0
 
-        return "unrecognized", 100.0
\ No newline at end of file
+        frames = image_data_url if isinstance(image_data_url, list) else [image_data_url]
+        matches = [m for frame_matches in self.recognize_burst(frames, track_key) for m in frame_matches]
+        known = [m for m in matches if m[0] != "unrecognized"]
+        if not known:
+            return "unrecognized", 100.0
+        return min(known, key=lambda m: m[1])
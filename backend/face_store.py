@@ -0,0 +1,139 @@
+# face_store.py
+
+import os
+import shutil
+import threading
+import time
+
+import cv2
+import numpy as np
+
+FACE_SIZE = 100 # Every stored and recognized crop is FACE_SIZE x FACE_SIZE grayscale
+
+def normalize_face(gray_crop):
+    """Resizes a grayscale face crop to FACE_SIZE and equalizes its histogram.
+    Used for stored samples and live frames alike, so both look the same to LBPH."""
+    face = cv2.resize(gray_crop, (FACE_SIZE, FACE_SIZE), interpolation=cv2.INTER_AREA)
+    return cv2.equalizeHist(face)
+
+def dhash(face):
+    """64-bit difference hash (perceptual): near-identical frames differ in only a few bits."""
+    small = cv2.resize(face, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+class FaceStore:
+    """Per-user packed face samples: <root>/<user>.npy holds an [n, FACE_SIZE, FACE_SIZE] uint8 array.
+    Rows are only ever appended, so row indices are stable until the user is removed.
+    Files are read fully and closed under the lock (no lingering memmaps): Windows refuses to replace or delete
+    a file that is still mapped or open."""
+    def __init__(self, root="faces", max_samples=50, dedup_bits=4):
+        self.root = root
+        self.max_samples = max_samples
+        self.dedup_bits = dedup_bits # dHash Hamming distance at or below which a sample counts as a duplicate
+        self._lock = threading.Lock()
+        self._hashes = {} # user -> [dhash] of stored rows
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, f"{name}.npy")
+
+    # --- READ ---
+    def users(self):
+        return sorted(f[:-4] for f in os.listdir(self.root) if f.endswith(".npy"))
+
+    def load(self, name):
+        """In-memory [n, FACE_SIZE, FACE_SIZE] array (at most max_samples * 10 KB), or an empty array."""
+        with self._lock:
+            return self._load(name)
+
+    def _load(self, name):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return np.empty((0, FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+        return np.load(path)
+
+    def count(self, name):
+        """Row count from the .npy header alone."""
+        with self._lock:
+            path = self._path(name)
+            if not os.path.exists(path): return 0
+            with open(path, "rb") as f:
+                major, _ = np.lib.format.read_magic(f)
+                read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+                shape, _, _ = read_header(f)
+            return shape[0]
+
+    def _user_hashes(self, name):
+        if name not in self._hashes:
+            self._hashes[name] = [dhash(face) for face in self._load(name)]
+        return self._hashes[name]
+
+    # --- WRITE ---
+    def add(self, name, faces):
+        """Appends normalized faces, skipping perceptual duplicates. Returns (added, total)."""
+        with self._lock:
+            hashes = self._user_hashes(name)
+            existing = self._load(name)
+            fresh = []
+            for face in faces:
+                h = dhash(face)
+                if len(existing) + len(fresh) >= self.max_samples: break
+                if any(bin(h ^ other).count("1") <= self.dedup_bits for other in hashes): continue
+                hashes.append(h)
+                fresh.append(face)
+            if fresh:
+                packed = np.concatenate([existing, np.stack(fresh)]).astype(np.uint8)
+                tmp_path = os.path.join(self.root, f".{name}.tmp.npy")
+                np.save(tmp_path, packed)
+                os.replace(tmp_path, self._path(name)) # Atomic: readers see the old or the new file
+            return len(fresh), len(existing) + len(fresh)
+
+    def remove(self, name):
+        with self._lock:
+            self._hashes.pop(name, None)
+            path = self._path(name)
+            if not os.path.exists(path): return False
+            os.remove(path)
+            return True
+
+    # --- MIGRATION ---
+    def migrate_legacy(self):
+        """Packs old faces/<user>/*.jpg folders into <user>.npy stores. Each folder is first moved aside to
+        <root>_legacy/<user> and only deleted once every JPEG decoded and is in the pack (or is a dHash
+        duplicate of a packed sample); otherwise it stays there for a manual check. Returns users migrated."""
+        legacy_root = self.root.rstrip("/\\") + "_legacy"
+        migrated = []
+        for name in os.listdir(self.root):
+            folder = os.path.join(self.root, name)
+            if not os.path.isdir(folder): continue
+            os.makedirs(legacy_root, exist_ok=True)
+            kept = os.path.join(legacy_root, name)
+            if os.path.exists(kept): kept = f"{kept}_{int(time.time())}"
+            os.replace(folder, kept) # Out of the store first, so a crash mid-pack never loses or re-packs it
+            faces, unreadable = [], []
+            for img_name in sorted(os.listdir(kept)):
+                img = cv2.imread(os.path.join(kept, img_name), cv2.IMREAD_GRAYSCALE)
+                if img is None: unreadable.append(img_name)
+                else: faces.append(normalize_face(img))
+            added, total = self.add(name, faces)
+            missing = self._unpacked(name, faces)
+            migrated.append(name)
+            print(f"📦 Packed {len(faces)} legacy JPEGs of '{name}' into {total} samples ({len(faces) - added} duplicates dropped).")
+            if unreadable or missing:
+                print(f"⚠️ Kept {kept}: {len(unreadable)} unreadable files, {missing} decoded faces not in the pack "
+                      f"(max {self.max_samples} samples per user).")
+            else:
+                shutil.rmtree(kept, ignore_errors=True)
+        if os.path.isdir(legacy_root) and not os.listdir(legacy_root):
+            os.rmdir(legacy_root)
+        return migrated
+
+    def _unpacked(self, name, faces):
+        """How many faces are neither stored in name's pack nor a dHash duplicate of a stored sample."""
+        with self._lock:
+            packed = self._load(name)
+            hashes = [dhash(face) for face in packed]
+        return sum(1 for face in faces
+                   if not any(np.array_equal(face, row) for row in packed)
+                   and not any(bin(dhash(face) ^ other).count("1") <= self.dedup_bits for other in hashes))
@@ -0,0 +1,242 @@
+# flight_log.py
+
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from telemetry import FIELDS
+
+LOW_BATTERY = 20 # percent
+
+# --- READER ---
+class FlightLog:
+    """Memory-mapped reader for one recorded flight. Each chunk_NNNNN.npy is (fields, rows) float64, so a
+    column is one contiguous slice and analysis never copies the other fields."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.fields = self.meta["fields"]
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        self.modes = self.meta.get("modes", [])
+        self._chunks = [np.load(os.path.join(path, c["file"]), mmap_mode="r") for c in self.meta["chunks"]]
+
+    def __len__(self):
+        return sum(c.shape[1] for c in self._chunks)
+
+    def column(self, name):
+        parts = [c[self.index[name]] for c in self._chunks]
+        if not parts: return np.empty(0)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def rows(self):
+        """Yields (fields,) rows in time order, one chunk in memory at a time."""
+        for chunk in self._chunks:
+            yield from np.asarray(chunk).T
+
+    def commands(self):
+        path = os.path.join(self.path, "commands.jsonl")
+        if not os.path.exists(path): return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # --- ANALYSIS (vectorized) ---
+    def _elapsed(self, i):
+        t = self.column("time")
+        return float(t[i] - t[0])
+
+    def max_of(self, name):
+        """(value, seconds into the flight) of a column's maximum, ignoring gaps."""
+        col = self.column(name)
+        if not len(col) or np.isnan(col).all(): return None, None
+        i = int(np.nanargmax(col))
+        return float(col[i]), self._elapsed(i)
+
+    def first_below(self, name, threshold):
+        """Seconds into the flight when a column first dropped below threshold, or None."""
+        hits = np.flatnonzero(self.column(name) < threshold) # NaN compares False
+        return self._elapsed(hits[0]) if len(hits) else None
+
+    def distance(self):
+        """Ground track length in meters (equirectangular, fine at multicopter scale)."""
+        lat, lon = np.radians(self.column("lat")), np.radians(self.column("lon"))
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        lat, lon = lat[ok], lon[ok]
+        if len(lat) < 2: return 0.0
+        dx = np.diff(lon) * np.cos((lat[1:] + lat[:-1]) / 2)
+        return float(6371000.0 * np.hypot(dx, np.diff(lat)).sum())
+
+    def summary(self):
+        t = self.column("time")
+        battery = self.column("battery_level")
+        battery = battery[~np.isnan(battery)]
+        mode_codes = self.column("mode")
+        mode_codes = np.unique(mode_codes[~np.isnan(mode_codes)]).astype(int)
+        max_alt, max_alt_at = self.max_of("alt")
+        max_speed, _ = self.max_of("groundspeed")
+        return {"session": self.meta["session"], "started": self.meta["started"],
+                "duration": float(t[-1] - t[0]) if len(t) else 0.0, "samples": len(t),
+                "max_alt": max_alt, "max_alt_at": max_alt_at, "max_groundspeed": max_speed,
+                "distance": self.distance(),
+                "battery_start": float(battery[0]) if len(battery) else None,
+                "battery_end": float(battery[-1]) if len(battery) else None,
+                "low_battery_at": self.first_below("battery_level", LOW_BATTERY),
+                "modes": [self.modes[i] for i in mode_codes if i < len(self.modes)],
+                "commands": [f"{c['command']} ({c['status']})" for c in self.commands()]}
+
+    def summary_text(self):
+        s = self.summary()
+        fmt = lambda v, unit="", nd=1: "n/a" if v is None else f"{v:.{nd}f}{unit}"
+        low = "never" if s["low_battery_at"] is None else f"{s['low_battery_at']:.0f}s into the flight"
+        return "\n".join([
+            f"--- DRONE FLIGHT LOG {s['session']} ({time.ctime(s['started'])}) ---",
+            f"Duration: {s['duration']:.0f}s, {s['samples']} telemetry samples",
+            f"Max altitude: {fmt(s['max_alt'], ' m')} at {fmt(s['max_alt_at'], 's', 0)}",
+            f"Max ground speed: {fmt(s['max_groundspeed'], ' m/s')}, distance flown: {s['distance']:.0f} m",
+            f"Battery: {fmt(s['battery_start'], '%', 0)} -> {fmt(s['battery_end'], '%', 0)}, below {LOW_BATTERY}%: {low}",
+            f"Flight modes: {', '.join(s['modes']) or 'n/a'}",
+            f"Commands: {', '.join(s['commands']) or 'none'}"]) + "\n"
+
+def list_logs(root="flight_logs"):
+    """Session directories under root, newest first."""
+    if not os.path.isdir(root): return []
+    return sorted((d for d in os.listdir(root) if os.path.exists(os.path.join(root, d, "meta.json"))), reverse=True)
+
+# --- RECORDER ---
+class FlightRecorder:
+    """Append-only columnar recorder fed with TelemetryStream rows. A session opens when the drone arms and
+    closes when it disarms; full chunks are written once and never rewritten (only meta.json is replaced).
+    On close, the flight summary goes into the workspace so Pathway can answer questions about it."""
+    def __init__(self, root="flight_logs", modes=None, chunk_rows=3000, workspace=None, on_summary=None, fields=FIELDS):
+        self.root = root
+        self.modes = modes if modes is not None else [] # TelemetryStream.modes (shared, append-only)
+        self.chunk_rows = chunk_rows
+        self.workspace = workspace
+        self.on_summary = on_summary
+        self.fields = fields
+        self._armed = fields.index("armed")
+        self._lock = threading.Lock()
+        self._buffer = np.empty((len(fields), chunk_rows), dtype=np.float64)
+        self._fill = 0
+        self.session = None
+        self.path = None
+        self.meta = None
+        os.makedirs(root, exist_ok=True)
+
+    # --- SESSION ---
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        self.session = time.strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(self.root, self.session)
+        os.makedirs(self.path, exist_ok=True)
+        self.meta = {"session": self.session, "started": time.time(), "fields": list(self.fields),
+                     "modes": [], "chunks": [], "finished": None}
+        self._fill = 0
+        self._write_meta()
+        print(f"📼 Flight log recording: {self.path}")
+
+    def stop(self):
+        """Closes the session and returns its FlightLog (or None if nothing was recording)."""
+        with self._lock:
+            if self.session is None: return None
+            self._flush()
+            self.meta["finished"] = time.time()
+            self._write_meta()
+            path, self.session, self.path = self.path, None, None
+        log = FlightLog(path)
+        if log.meta["chunks"]:
+            self._write_summary(log)
+        return log
+
+    # --- RECORDING ---
+    def record(self, row):
+        """TelemetryStream subscriber: one (fields,) row per sample."""
+        armed = row[self._armed] == 1.0
+        if self.session is None:
+            if not armed: return
+            with self._lock:
+                if self.session is None: self._start()
+        elif not armed and not math.isnan(row[self._armed]):
+            self.stop() # Disarmed: the flight is over
+            return
+        with self._lock:
+            if self.session is None: return
+            self._buffer[:, self._fill] = row
+            self._fill += 1
+            if self._fill == self.chunk_rows:
+                self._flush()
+
+    def record_command(self, record):
+        """DroneController command listener: finished commands go to commands.jsonl of the open session."""
+        with self._lock:
+            if self.session is None: return
+            entry = {k: record.get(k) for k in ("id", "command", "status", "message", "submitted", "finished")}
+            with open(os.path.join(self.path, "commands.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _flush(self):
+        if not self._fill: return
+        name = f"chunk_{len(self.meta['chunks']):05d}.npy"
+        np.save(os.path.join(self.path, name), np.ascontiguousarray(self._buffer[:, :self._fill]))
+        t = self._buffer[self.fields.index("time"), :self._fill]
+        self.meta["chunks"].append({"file": name, "rows": self._fill, "t0": float(t[0]), "t1": float(t[-1])})
+        self.meta["modes"] = list(self.modes)
+        self._fill = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.path, ".meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def _write_summary(self, log):
+        if not self.workspace: return
+        filename = f"flight_log_{log.meta['session']}.txt"
+        with open(os.path.join(self.workspace, filename), "w", encoding="utf-8") as f:
+            f.write(log.summary_text())
+        print(f"✅ Flight summary stored in memory: {filename}")
+        if self.on_summary: self.on_summary(filename)
+
+    def stats(self):
+        with self._lock:
+            return {"session": self.session, "buffered": self._fill,
+                    "chunks": len(self.meta["chunks"]) if self.session else 0}
+
+# --- REPLAY ---
+class LogReplay:
+    """Drone-shaped telemetry source for a recorded flight: anything that takes a DroneController for
+    subscribe() (e.g. TelemetryStream) can consume a log at `speed`x real time."""
+    def __init__(self, log, speed=1.0):
+        self.log = log
+        self.speed = speed
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def run(self):
+        """Publishes every row as a snapshot dict on the calling thread; returns rows published."""
+        t_index = self.log.index["time"]
+        mode_index = self.log.index["mode"]
+        start_wall = time.monotonic()
+        t0 = None
+        count = 0
+        for row in self.log.rows():
+            if t0 is None: t0 = row[t_index]
+            delay = (row[t_index] - t0) / self.speed - (time.monotonic() - start_wall)
+            if delay > 0: time.sleep(delay)
+            snapshot = {f: (None if math.isnan(v) else v) for f, v in zip(self.log.fields, row.tolist())}
+            if snapshot["mode"] is not None: snapshot["mode"] = self.log.modes[int(row[mode_index])]
+            if snapshot["armed"] is not None: snapshot["armed"] = bool(snapshot["armed"])
+            for callback in self._listeners:
+                callback(snapshot)
+            count += 1
+        return count
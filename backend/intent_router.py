@@ -0,0 +1,212 @@
+# intent_router.py
+
+import re
+import threading
+
+WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "forty": 40, "forty five": 45, "sixty": 60,
+}
+UNIT_SECONDS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60, "h": 3600, "hr": 3600, "hour": 3600}
+KEY_ALIASES = {"control": "ctrl", "escape": "esc", "return": "enter", "windows": "win", "delete": "del", "page up": "pageup", "page down": "pagedown"}
+# pyautogui key names the fast path will press; anything else goes to the LLM
+NAMED_KEYS = {"enter", "esc", "tab", "space", "backspace", "del", "insert", "home", "end", "pageup", "pagedown",
+              "up", "down", "left", "right", "ctrl", "alt", "shift", "win", "capslock", "printscreen",
+              "volumeup", "volumedown", "volumemute", "playpause", "nexttrack", "prevtrack"} | {f"f{i}" for i in range(1, 13)}
+# Apps the fast path may open; AppOpener's match_closest would otherwise launch *something* for any phrase
+KNOWN_APPS = {"notepad", "calculator", "calc", "paint", "chrome", "google chrome", "edge", "microsoft edge", "firefox",
+              "brave", "opera", "spotify", "vlc", "vs code", "vscode", "visual studio code", "code", "word", "excel",
+              "powerpoint", "outlook", "onenote", "teams", "discord", "slack", "zoom", "whatsapp", "telegram", "steam",
+              "obs", "notion", "settings", "task manager", "cmd", "command prompt", "terminal", "powershell",
+              "explorer", "file explorer", "control panel", "snipping tool", "photos", "camera app", "clock", "mail"}
+FEET = 0.3048
+# Words that mean the "city" is really an object, a time or a longer question ("temperature in the oven",
+# "weather for the weekend in paris"); those go to the LLM
+NOT_CITY = {"the", "a", "an", "my", "our", "your", "this", "that", "these", "next", "in", "at", "for", "on", "of", "and",
+            "today", "tonight", "tomorrow", "weekend", "week", "morning", "afternoon", "evening", "night", "now",
+            "room", "house", "home", "here", "outside", "inside", "kitchen", "office", "oven", "fridge", "freezer", "water"}
+
+# Polite wrappers that don't change the intent ("hey buddy, could you please open notepad")
+FILLER_PATTERN = re.compile(r"^(?:(?:hey|hi|ok|okay)\s+buddy\s*,?\s*)?(?:(?:can|could|would|will)\s+you\s+)?(?:please\s+)?|\s+(?:please|for me|now)$")
+NUMBER_PATTERN = r"\d+(?:\.\d+)?|" + "|".join(sorted(WORD_NUMBERS, key=len, reverse=True))
+DURATION_PATTERN = re.compile(rf"\b(?P<n>{NUMBER_PATTERN})\s*-?\s*(?P<unit>hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)\b")
+# Fractions rewritten to decimals before DURATION_PATTERN runs ("half an hour" -> "0.5 hour")
+FRACTIONS = [
+    (re.compile(r"\b(hour|minute)s?\s+and\s+a\s+half\b"), r"\1 and 0.5 \1"),
+    (re.compile(rf"\b({NUMBER_PATTERN})\s+and\s+a\s+half\s+(hour|minute|second)s?\b"), lambda m: f"{_to_number(m.group(1)) + 0.5} {m.group(2)}"),
+    (re.compile(r"\b(?:a\s+)?half\s+(?:an?\s+)?(hour|minute)\b"), r"0.5 \1"),
+    (re.compile(r"\b(?:a\s+)?quarter\s+(?:of\s+)?(?:an?\s+)?(hour|minute)\b"), r"0.25 \1"),
+    (re.compile(r"\bthree\s+quarters\s+(?:of\s+)?(?:an?\s+)?(hour|minute)\b"), r"0.75 \1"),
+]
+ALTITUDE_PATTERN = re.compile(rf"^(?P<n>{NUMBER_PATTERN})\s*(?P<unit>m|meters?|metres?|ft|feet|foot)?$")
+
+# Targets that look like "open X" but belong to other LLM types (open_url, open_camera, files...)
+OPEN_APP_EXCLUDE = re.compile(r"\b(?:on|in|with|camera|file|folder|url|link|website|site|tab|game|trivia|timer|movie|video|youtube)\b|https?:|\.(?:com|org|net|io|py|js|txt)\b")
+
+
+def _to_number(token):
+    token = token.strip()
+    if token in WORD_NUMBERS: return WORD_NUMBERS[token]
+    return float(token) if "." in token else int(token)
+
+def _format_duration(seconds):
+    parts = []
+    for label, size in (("hour", 3600), ("minute", 60), ("second", 1)):
+        count, seconds = divmod(seconds, size)
+        if count: parts.append(f"{count} {label}{'s' if count != 1 else ''}")
+    return " and ".join(parts) or "0 seconds"
+
+
+def parse_duration(text):
+    """Seconds in a spoken duration ("1 hour and 30 minutes", "half an hour"), or None when any word
+    is left unexplained (the LLM handles those)."""
+    for pattern, replacement in FRACTIONS:
+        text = pattern.sub(replacement, text)
+    total = 0
+    for m in DURATION_PATTERN.finditer(text):
+        unit = m.group("unit").rstrip("s") or "s"
+        total += _to_number(m.group("n")) * UNIT_SECONDS.get(unit, 1)
+    leftover = re.sub(r"\b(?:and|for|of)\b|,", " ", DURATION_PATTERN.sub(" ", text))
+    if leftover.strip() or total <= 0: return None
+    return int(round(total))
+
+# --- ROUTE BUILDERS (match -> SYSTEM_PROMPT style JSON) ---
+def _build_timer(match, text):
+    total = parse_duration(match.group("dur") or match.group("dur2"))
+    if not total: return None
+    return {"type": "set_timer", "seconds": total, "spoken_text": f"Okay, timer set for {_format_duration(total)}."}
+
+def _build_weather(match, text):
+    city = match.group("city").strip(" .")
+    if not city or NOT_CITY & set(city.split()): return None
+    return {"type": "get_weather", "city": city.title()}
+
+def _build_open_app(match, text, known_apps=KNOWN_APPS):
+    target = match.group("target").strip()
+    if OPEN_APP_EXCLUDE.search(target) or target not in known_apps: return None
+    return {"type": "system_control", "command": "open_app", "target": target, "animation_name": "Typing"}
+
+def _build_press_key(match, text):
+    key = re.sub(r"\b(?:the|a|an|keys?)\b", " ", match.group("key")).strip()
+    for alias, name in KEY_ALIASES.items():
+        key = re.sub(rf"\b{alias}\b", name, key)
+    key = re.sub(r"\s*(?:\+|\bplus\b)\s*", "+", key)
+    key = re.sub(r"\s+", "+", key)
+    parts = key.split("+")
+    if len(parts) > 4 or not all(p in NAMED_KEYS or re.fullmatch(r"[a-z0-9]", p) for p in parts): return None
+    return {"type": "system_control", "command": "press_key", "target": key}
+
+def _build_close_window(match, text):
+    return {"type": "system_control", "command": "press_key", "target": "alt+f4"}
+
+def _build_background(match, text):
+    return {"type": "change_background", "keyword": match.group("kw")}
+
+def _build_perception_on(match, text):
+    return {"type": "toggle_perception", "state": "on"}
+
+def _build_perception_off(match, text):
+    return {"type": "toggle_perception", "state": "off"}
+
+def _build_drone_connect(match, text):
+    return {"type": "drone_control", "command": "connect", "spoken_text": "Connecting to drone."}
+
+def _build_drone_takeoff(match, text):
+    if match.group("alt"):
+        alt_match = ALTITUDE_PATTERN.match(match.group("alt").strip())
+        if not alt_match or alt_match.group("n") in ("a", "an"): return None
+        alt = _to_number(alt_match.group("n"))
+        if alt_match.group("unit") in ("ft", "feet", "foot"): alt = round(alt * FEET, 1)
+    elif match.group("drone"):
+        alt = 10
+    else:
+        return None # A bare "take off" is too ambiguous for the fast path
+    return {"type": "drone_control", "command": "takeoff", "altitude": alt, "spoken_text": f"Taking off to {alt} meters."}
+
+def _build_drone_land(match, text):
+    return {"type": "drone_control", "command": "land", "spoken_text": "Landing now."}
+
+def _build_drone_rtl(match, text):
+    return {"type": "drone_control", "command": "rtl", "spoken_text": "Returning to launch."}
+
+
+class IntentRouter:
+    """Deterministic fast path that answers obvious commands before the LLM is called."""
+    # (name, pattern, builder, weight). Order matters: the first route that clears the threshold wins.
+    ROUTES = [
+        ("drone_connect", r"^(?:connect|link)\s+(?:to\s+|with\s+)?(?:the\s+|my\s+)?drone(?:\s+simulator)?$|^drone\s+connect$",
+                          _build_drone_connect, 0.95),
+        ("drone_takeoff", r"^(?:(?:the\s+)?drone\s+)?(?:take\s?-?off|lift\s?-?off)(?P<drone>\s+(?:the\s+|with\s+the\s+)?drone)?"
+                          r"(?:\s+(?:to|at)?\s*(?P<alt>[a-z0-9. ]+?))?$", _build_drone_takeoff, 0.95),
+        ("drone_rtl", r"^(?:the\s+)?drone\s+(?:rtl|return(?:\s+to)?\s+(?:home|launch|base)|come\s+back(?:\s+home)?)$"
+                      r"|^(?:rtl|return)\s+(?:the\s+)?drone(?:\s+(?:to\s+)?(?:home|launch|base))?$"
+                      r"|^bring\s+(?:the\s+)?drone\s+back(?:\s+home)?$", _build_drone_rtl, 0.95),
+        ("drone_land", r"^(?:(?:the\s+)?drone\s+)?land(?:\s+(?:the\s+)?drone)?$", _build_drone_land, 0.85),
+        ("set_timer", r"^(?:(?:set|start)\s+)?(?:a\s+|the\s+)?(?:timer|countdown)\s+(?:for\s+|of\s+)?(?P<dur>.+)$"
+                      r"|^(?:(?:set|start)\s+)?(?:a\s+)?(?P<dur2>.+?)\s+(?:timer|countdown)$", _build_timer, 0.95),
+        ("get_weather", r"^(?:what(?:'s| is)\s+)?(?:the\s+)?(?:weather|temperature)(?:\s+like)?(?:\s+today)?\s+(?:in|at|for)\s+(?P<city>[a-z][a-z .'-]{1,40}?)(?:\s+today)?$", _build_weather, 0.95),
+        ("toggle_perception_on", r"^(?:start|begin|keep)\s+(?:looking|watching)(?:\s+around)?$", _build_perception_on, 0.9),
+        ("toggle_perception_off", r"^stop\s+(?:looking|watching)(?:\s+around)?$", _build_perception_off, 0.9),
+        ("change_background", r"^(?:take me to|change (?:the )?background to|switch (?:the )?background to)\s+(?:the\s+|a\s+)?(?P<kw>[a-z]+)$", _build_background, 0.9),
+        ("close_window", r"^close (?:this|the current) window$", _build_close_window, 0.9),
+        ("press_key", r"^(?:press|hit)\s+(?P<key>[a-z0-9+ ]{1,30})$", _build_press_key, 0.9),
+        ("open_app", r"^(?:open|launch|start|run)\s+(?:the\s+|my\s+)?(?P<target>[a-z0-9][a-z0-9 .+-]{0,30}?)(?:\s+app)?$", _build_open_app, 0.9),
+    ]
+
+    def __init__(self, threshold=0.75, known_apps=None):
+        """known_apps: extra app names open_app may launch directly (e.g. AppOpener's installed apps)."""
+        self.threshold = threshold
+        self.known_apps = KNOWN_APPS | {a.lower() for a in (known_apps or ())}
+        overrides = {"open_app": lambda match, text: _build_open_app(match, text, self.known_apps)}
+        self.routes = [(name, re.compile(pattern), overrides.get(name, build), weight)
+                       for name, pattern, build, weight in self.ROUTES]
+        self._lock = threading.Lock()
+        self.total = 0
+        self.fallthrough = 0
+        self.hits = {name: 0 for name, _, _, _ in self.ROUTES}
+
+    @staticmethod
+    def normalize(user_input):
+        """Lowercases, trims punctuation and strips polite filler around the command."""
+        text = re.sub(r"\s+", " ", user_input.lower()).strip(" .!?,")
+        return FILLER_PATTERN.sub("", text).strip(" .!?,")
+
+    def score(self, text, match, weight):
+        """Confidence = route weight scaled by how much of the prompt the rule explains."""
+        coverage = (match.end() - match.start()) / max(len(text), 1)
+        return round(weight * (0.6 + 0.4 * coverage), 3)
+
+    def route(self, user_input):
+        """Returns (data, confidence, route_name) for a confident match, or None to fall through to the LLM."""
+        text = self.normalize(user_input)
+        best = None
+        for name, pattern, build, weight in self.routes:
+            match = pattern.search(text)
+            if not match: continue
+            confidence = self.score(text, match, weight)
+            if confidence < self.threshold: continue
+            data = build(match, text)
+            if data is None: continue
+            best = (data, confidence, name)
+            break
+
+        with self._lock:
+            self.total += 1
+            if best: self.hits[best[2]] += 1
+            else: self.fallthrough += 1
+        return best
+
+    def stats(self):
+        """Per-route hit counters and the share of traffic that skipped the LLM."""
+        with self._lock:
+            total = self.total
+            routed = total - self.fallthrough
+            return {
+                "total": total,
+                "routed": routed,
+                "fallthrough": self.fallthrough,
+                "hit_rate": round(routed / total, 3) if total else 0.0,
+                "routes": {name: {"hits": hits, "hit_rate": round(hits / total, 3) if total else 0.0}
+                           for name, hits in self.hits.items()},
+            }
@@ -0,0 +1,69 @@
+# json_stream.py
+
+import json
+
+class JsonFieldStreamer:
+    """Incrementally scans a streamed JSON object and reports top-level string fields as soon as they close."""
+    def __init__(self, fields=("type", "spoken_text")):
+        self.fields = set(fields)
+        self.found = {}
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._raw = []
+        self._expect_key = False
+        self._key = None
+
+    def feed(self, chunk):
+        """Consumes a chunk of model output. Returns a list of (field, value) pairs completed by this chunk."""
+        completed = []
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._raw.append(ch)
+                elif ch == '\\':
+                    self._escape = True
+                    self._raw.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    pair = self._close_string()
+                    if pair: completed.append(pair)
+                else:
+                    self._raw.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._raw = []
+            elif ch in '{[':
+                self._depth += 1
+                self._expect_key = (ch == '{' and self._depth == 1)
+            elif ch in '}]':
+                self._depth -= 1
+            elif self._depth == 1:
+                if ch == ',':
+                    self._expect_key = True
+                    self._key = None
+                elif ch == ':':
+                    self._expect_key = False
+        return completed
+
+    def _close_string(self):
+        """Handles a finished string token at the current position."""
+        if self._depth != 1:
+            return None
+        try:
+            text = json.loads('"' + ''.join(self._raw) + '"')
+        except json.JSONDecodeError:
+            text = ''.join(self._raw)
+
+        if self._expect_key:
+            self._key = text
+            return None
+
+        key, self._key = self._key, None
+        if key in self.fields and key not in self.found:
+            self.found[key] = text
+            return key, text
+        return None
@@ -0,0 +1,111 @@
+# lbph_matcher.py
+
+import numpy as np
+
+class LBPHMatcher:
+    """Vectorized LBPH nearest-neighbour search, compatible with cv2.face.LBPHFaceRecognizer.
+    Training histograms live in one contiguous [n_samples, cells * 2^neighbors] float32 matrix;
+    all faces of a frame (or a burst of frames) get a chi-square lower bound for every row from one
+    matmul on square-rooted histograms, then exact chi-square (HISTCMP_CHISQR_ALT) runs on rows in bound order, in growing blocks,
+    until no remaining row can beat the best distance. The result is the same nearest neighbour
+    recognizer.predict returns, without one predict() call per face."""
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8, block=32):
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.block = block # Rows scored with exact chi-square in the first step of the bound-ordered scan (doubles after)
+        self.matrix = None
+        self.labels = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        """Builds the matrix from a trained OpenCV LBPH model (same histograms, same parameters)."""
+        matcher = cls(recognizer.getRadius(), recognizer.getNeighbors(), recognizer.getGridX(), recognizer.getGridY())
+        histograms = recognizer.getHistograms()
+        if histograms:
+            matcher.matrix = np.ascontiguousarray(np.vstack([h.reshape(1, -1) for h in histograms]), dtype=np.float32)
+            matcher.labels = np.asarray(recognizer.getLabels(), dtype=np.int32).reshape(-1)
+            matcher._row_sums = matcher.matrix.sum(axis=1)
+            matcher._sqrt = np.sqrt(matcher.matrix)
+        return matcher
+
+    def __len__(self):
+        return 0 if self.matrix is None else len(self.matrix)
+
+    # --- FEATURES ---
+    def elbp(self, images):
+        """Extended (circular) LBP codes for a [n, h, w] stack, as OpenCV computes them."""
+        src = images.astype(np.float32)
+        _, h, w = src.shape
+        r = self.radius
+        center = src[:, r:h - r, r:w - r]
+        codes = np.zeros(center.shape, dtype=np.int32)
+        eps = np.finfo(np.float32).eps
+        shifted = lambda dy, dx: src[:, r + dy:h - r + dy, r + dx:w - r + dx]
+        for n in range(self.neighbors):
+            x = np.float32(r * np.cos(2.0 * np.pi * n / self.neighbors))
+            y = np.float32(-r * np.sin(2.0 * np.pi * n / self.neighbors))
+            fx, fy, cx, cy = int(np.floor(x)), int(np.floor(y)), int(np.ceil(x)), int(np.ceil(y))
+            tx, ty = x - fx, y - fy
+            t = ((1 - tx) * (1 - ty) * shifted(fy, fx) + tx * (1 - ty) * shifted(fy, cx)
+                 + (1 - tx) * ty * shifted(cy, fx) + tx * ty * shifted(cy, cx))
+            codes |= ((t > center) | (np.abs(t - center) < eps)).astype(np.int32) << n
+        return codes
+
+    def histograms(self, faces):
+        """[n, grid_x * grid_y * 2^neighbors] normalized spatial histograms for equally sized grayscale faces."""
+        faces = np.asarray(faces)
+        if faces.ndim == 2: faces = faces[None]
+        codes = self.elbp(faces)
+        n, h, w = codes.shape
+        ch, cw = h // self.grid_y, w // self.grid_x
+        cells = self.grid_x * self.grid_y
+        bins = 1 << self.neighbors
+        codes = codes[:, :ch * self.grid_y, :cw * self.grid_x]
+        codes = codes.reshape(n, self.grid_y, ch, self.grid_x, cw).transpose(0, 1, 3, 2, 4).reshape(n * cells, ch * cw)
+        offsets = (np.arange(n * cells, dtype=np.int64) * bins)[:, None]
+        counts = np.bincount((codes + offsets).ravel(), minlength=n * cells * bins)
+        return (counts.reshape(n, cells * bins) / float(ch * cw)).astype(np.float32)
+
+    # --- MATCHING ---
+    def chisqr(self, query, rows):
+        """Exact HISTCMP_CHISQR_ALT, 2 * sum((a - b)^2 / (a + b)), between one histogram and matrix rows.
+        Bins where the query is empty contribute b, so only the query's non-zero bins need the division."""
+        nz = np.flatnonzero(query)
+        cols = self.matrix[np.ix_(rows, nz)]
+        a = query[nz]
+        total = cols + a
+        diff = cols - a
+        diff *= diff
+        diff /= np.maximum(total, 1e-30, out=total) # 0 / 0 bins are 0
+        return 2.0 * (diff.sum(axis=1) + self._row_sums[rows] - cols.sum(axis=1))
+
+    def predict(self, faces):
+        """Best (label, distance) per face; label -1 and distance inf when there is no training data."""
+        faces = np.asarray(faces)
+        count = 1 if faces.ndim == 2 else len(faces)
+        labels = np.full(count, -1, dtype=np.int32)
+        distances = np.full(count, np.inf, dtype=np.float32)
+        if not len(self) or count == 0:
+            return labels, distances
+
+        queries = self.histograms(faces)
+        # (a - b)^2 / (a + b) = (sqrt(a) - sqrt(b))^2 * (sqrt(a) + sqrt(b))^2 / (a + b) >= (sqrt(a) - sqrt(b))^2,
+        # so chi-square >= 2 * (sum(a) + sum(b) - 2 * sqrt(a) . sqrt(b)) for every row, from one BLAS matmul
+        sums = queries.sum(axis=1)[:, None] + self._row_sums[None, :]
+        bounds = 2.0 * (sums - 2.0 * (np.sqrt(queries) @ self._sqrt.T))
+        bounds -= 1e-4 * sums # Headroom for float32 rounding in the matmul
+        for i, (query, bound) in enumerate(zip(queries, bounds)):
+            order = np.argsort(bound)
+            best, best_row, start, size = np.inf, -1, 0, self.block
+            while start < len(order):
+                rows = order[start:start + size]
+                rows = rows[bound[rows] < best] # Sorted, so once this is empty no remaining row can be closer
+                if not len(rows): break
+                d = self.chisqr(query, rows)
+                j = int(d.argmin())
+                if d[j] < best: best, best_row = float(d[j]), int(rows[j])
+                start, size = start + size, size * 2
+            labels[i], distances[i] = self.labels[best_row], best
+        return labels, distances
@@ -0,0 +1,191 @@
+# memory_compactor.py
+
+import os
+import re
+import tempfile
+import threading
+import time
+
+class MemoryCompactor:
+    """Keeps oni_workspace memory captures bounded by rolling old ones into digest files."""
+    MEMORY_PREFIXES = ("vision_memory_", "screen_memory_")
+    DIGEST_PREFIX = "memory_digest_"
+
+    def __init__(self, workspace, keep_newest=20, max_count=50, max_age_seconds=7 * 24 * 3600,
+                 max_bytes=2 * 1024 * 1024, max_digests=10, excerpt_chars=600, interval=300,
+                 summarizer=None, lock_path=None, stale_lock_seconds=120, heartbeat_seconds=10):
+        self.workspace = workspace
+        self.keep_newest = keep_newest
+        self.max_count = max_count
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.max_digests = max_digests
+        self.excerpt_chars = excerpt_chars
+        self.interval = interval
+        self.summarizer = summarizer # Optional callable(text) -> short summary
+        # Lock lives outside the workspace so Pathway never indexes it; shared by all gunicorn workers
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), "oni_memory_compactor.lock")
+        # The holder touches the lock every heartbeat_seconds (LLM summaries can take minutes), so only a lock
+        # untouched for stale_lock_seconds belongs to a crashed worker
+        self.stale_lock_seconds = stale_lock_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        # Digests are staged next to the workspace (same filesystem for os.replace) so the watcher and
+        # Pathway never see a half-written file
+        workspace_abs = os.path.abspath(workspace)
+        self.staging_dir = os.path.join(os.path.dirname(workspace_abs), f".{os.path.basename(workspace_abs)}_staging")
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._thread = threading.Thread(target=self._run, name="memory-compactor", daemon=True)
+        self._thread.start()
+        print(f"🧹 Memory compactor running every {self.interval}s "
+              f"(keep {self.keep_newest} raw, max {self.max_count} files / {self.max_bytes // 1024} KB / {self.max_age_seconds // 3600} h)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"🔴 Memory compaction failed: {e}")
+
+    def _acquire(self):
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            # Stale lock from a crashed worker
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) > self.stale_lock_seconds:
+                    os.remove(self.lock_path)
+            except OSError:
+                pass
+            return False
+
+    def _heartbeat(self, done):
+        while not done.wait(self.heartbeat_seconds):
+            try: os.utime(self.lock_path)
+            except OSError: pass
+
+    def _release(self):
+        try: os.remove(self.lock_path)
+        except OSError: pass
+
+    def _list(self, prefixes):
+        entries = []
+        for name in os.listdir(self.workspace):
+            if not name.startswith(prefixes): continue
+            path = os.path.join(self.workspace, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        entries.sort(reverse=True) # newest first
+        return entries
+
+    def select_for_rollup(self, memories, now=None):
+        """Picks which raw memories (newest-first list of (mtime, name, size)) exceed the limits."""
+        now = now or time.time()
+        older = memories[self.keep_newest:]
+
+        # Oldest first, so count/bytes limits always evict the oldest captures
+        rollup = []
+        count = len(memories)
+        total_bytes = sum(size for _, _, size in memories)
+        for mtime, name, size in reversed(older):
+            if now - mtime > self.max_age_seconds or count > self.max_count or total_bytes > self.max_bytes:
+                rollup.append((mtime, name, size))
+                count -= 1
+                total_bytes -= size
+        return rollup
+
+    def _summarize(self, text):
+        if self.summarizer:
+            try:
+                return self.summarizer(text).strip()
+            except Exception as e:
+                print(f"⚠️ Memory summarizer failed, keeping excerpt: {e}")
+        text = text.strip()
+        return text if len(text) <= self.excerpt_chars else text[:self.excerpt_chars].rstrip() + " [...]"
+
+    def compact(self):
+        """One compaction pass. Returns a small report dict."""
+        if not self._acquire():
+            return {"skipped": True}
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(done,), name="memory-compactor-lock", daemon=True).start()
+        try:
+            rollup = self.select_for_rollup(self._list(self.MEMORY_PREFIXES))
+            report = {"rolled_up": len(rollup), "digest": None, "digests_merged": 0}
+            if rollup:
+                report["digest"] = self._write_digest(sorted(rollup))
+                for _, name, _ in rollup:
+                    try: os.remove(os.path.join(self.workspace, name))
+                    except OSError: pass
+
+            # Digests are bounded too: the oldest ones beyond max_digests are merged (re-summarized) into one
+            excess = self._list((self.DIGEST_PREFIX,))[self.max_digests - 1:]
+            if len(excess) > 1:
+                self._merge_digests(sorted(excess))
+                report["digests_merged"] = len(excess)
+
+            if rollup:
+                print(f"🧹 Rolled {len(rollup)} memories into {report['digest']}")
+            return report
+        finally:
+            done.set()
+            self._release()
+
+    def _write_digest(self, rollup):
+        """rollup is oldest-first. Writes one digest file and returns its name."""
+        first, last = int(rollup[0][0]), int(rollup[-1][0])
+        digest_name = f"{self.DIGEST_PREFIX}{first}_{last}.txt"
+        lines = [f"--- MEMORY DIGEST ({time.ctime(first)} -> {time.ctime(last)}, {len(rollup)} captures) ---\n"]
+        for mtime, name, _ in rollup:
+            try:
+                with open(os.path.join(self.workspace, name), "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            kind = "SCREEN" if name.startswith("screen_memory_") else "VISION"
+            lines.append(f"\n### {kind} MEMORY {name} ({time.ctime(mtime)})\n{self._summarize(text)}\n")
+
+        self._publish(digest_name, lines)
+        return digest_name
+
+    def _publish(self, name, lines, mtime=None):
+        """Writes in the staging dir, then moves the finished file into the workspace atomically."""
+        os.makedirs(self.staging_dir, exist_ok=True)
+        tmp_path = os.path.join(self.staging_dir, name)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        if mtime: os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, os.path.join(self.workspace, name))
+
+    def _merge_digests(self, digests):
+        """digests is oldest-first [(mtime, name, size)]. Each is re-summarized into one section of a single
+        digest covering their whole span, which keeps the old mtime so it stays the oldest."""
+        spans = [re.match(rf"{self.DIGEST_PREFIX}(\d+)_(\d+)\.txt$", name) for _, name, _ in digests]
+        first = min(int(m.group(1)) for m in spans if m) if any(spans) else int(digests[0][0])
+        last = max(int(m.group(2)) for m in spans if m) if any(spans) else int(digests[-1][0])
+        merged_name = f"{self.DIGEST_PREFIX}{first}_{last}.txt"
+        lines = [f"--- MEMORY DIGEST ({time.ctime(first)} -> {time.ctime(last)}, {len(digests)} digests merged) ---\n"]
+        for _, name, _ in digests:
+            try:
+                with open(os.path.join(self.workspace, name), "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            lines.append(f"\n### DIGEST {name}\n{self._summarize(text)}\n")
+        self._publish(merged_name, lines, mtime=digests[-1][0])
+        for _, name, _ in digests:
+            if name == merged_name: continue
+            try: os.remove(os.path.join(self.workspace, name))
+            except OSError: pass
+        print(f"🧹 Merged {len(digests)} old digests into {merged_name}")
@@ -0,0 +1,140 @@
+# pathway_client.py
+
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+class PathwayClient:
+    """Pooled keep-alive client for the brain_pathway.py server with a circuit breaker and a short result cache."""
+    def __init__(self, base_url="http://127.0.0.1:8000", timeout=1.5, failure_threshold=3,
+                 probe_interval=5.0, cache_ttl=30.0, cache_size=128):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+
+        # One pooled session: the TCP connection to Pathway is reused across prompts
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8, max_retries=0))
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict() # (query, k) -> (expires_at, results)
+        self._failures = 0
+        self._open = False # True = brain marked down, requests short-circuit
+        self._probe_thread = None
+        self.counters = {"requests": 0, "short_circuited": 0, "failures": 0, "cache_hits": 0, "trips": 0, "batched_queries": 0}
+
+    @property
+    def is_down(self):
+        return self._open
+
+    def retrieve(self, query, k=3):
+        """Returns the list of {'text', 'metadata', 'dist'} results, or None if the brain is down/failed."""
+        key = (query, k)
+        with self._lock:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            if self._open:
+                self.counters["short_circuited"] += 1
+                return None
+            self.counters["requests"] += 1
+
+        try:
+            response = self.session.post(f"{self.base_url}/v1/retrieve", json={"query": query, "k": k}, timeout=self.timeout)
+            response.raise_for_status()
+            results = response.json()
+        except Exception as e:
+            self._record_failure(e)
+            return None
+
+        with self._lock:
+            self._failures = 0
+            self._cache_put(key, results)
+        return results
+
+    def retrieve_batch(self, queries, k=3):
+        """Retrieves several queries in one /v1/retrieve_batch round-trip.
+        Returns one result list per query, with None for queries that could not be answered."""
+        results = [None] * len(queries)
+        missing = []
+        with self._lock:
+            for i, query in enumerate(queries):
+                cached = self._cache_get((query, k))
+                if cached is not None: results[i] = cached
+                else: missing.append(i)
+            if not missing:
+                return results
+            if self._open:
+                self.counters["short_circuited"] += 1
+                return results
+            self.counters["requests"] += 1
+            self.counters["batched_queries"] += len(missing)
+
+        try:
+            response = self.session.post(f"{self.base_url}/v1/retrieve_batch",
+                                         json={"queries": [queries[i] for i in missing], "k": k}, timeout=self.timeout)
+            response.raise_for_status()
+            batch = response.json()
+        except Exception as e:
+            self._record_failure(e)
+            return results
+
+        with self._lock:
+            self._failures = 0
+            for i, query_results in zip(missing, batch):
+                results[i] = query_results
+                self._cache_put((queries[i], k), query_results)
+        return results
+
+    def _cache_get(self, key):
+        """Caller holds the lock."""
+        cached = self._cache.get(key)
+        if cached and cached[0] >= time.time():
+            self._cache.move_to_end(key)
+            self.counters["cache_hits"] += 1
+            return cached[1]
+        return None
+
+    def _cache_put(self, key, results):
+        """Caller holds the lock."""
+        if self.cache_ttl <= 0: return
+        self._cache[key] = (time.time() + self.cache_ttl, results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _record_failure(self, error):
+        with self._lock:
+            self.counters["failures"] += 1
+            self._failures += 1
+            if self._open or self._failures < self.failure_threshold:
+                return
+            self._open = True
+            self.counters["trips"] += 1
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="pathway-probe", daemon=True)
+            self._probe_thread.start()
+        print(f"🔴 PATHWAY MARKED DOWN after {self._failures} failures ({error}). Probing every {self.probe_interval}s.")
+
+    def _probe_loop(self):
+        """Background health check; closes the breaker once the server answers again."""
+        while self._open:
+            time.sleep(self.probe_interval)
+            try:
+                response = self.session.post(f"{self.base_url}/v1/statistics", json={}, timeout=self.timeout)
+                if response.status_code == 200:
+                    with self._lock:
+                        self._open = False
+                        self._failures = 0
+                    print("✅ PATHWAY BRAIN IS BACK ONLINE.")
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, down=self._open, cached_queries=len(self._cache))
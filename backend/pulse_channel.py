@@ -0,0 +1,85 @@
+# pulse_channel.py
+
+import json
+import threading
+import time
+
+class PulseChannel:
+    """Pushes workspace file events to Server-Sent-Events clients.
+    Cursors are "<mtime_ns>:<filename>" positions in the workspace index, not per-process counters,
+    so a client can reconnect to any gunicorn worker (Last-Event-ID) and resume without gaps or repeats.
+    Every open stream holds a server thread, so at most max_subscribers run at once (None = no cap)."""
+    def __init__(self, index, describe, exclude_kinds=("digest",), heartbeat=15.0, max_subscribers=None):
+        self.index = index
+        self.describe = describe # callable(filename) -> spoken message
+        self.exclude_kinds = set(exclude_kinds)
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._cond = threading.Condition()
+        self.subscribers = 0
+        index.subscribe(self._on_event)
+
+    def _on_event(self, event, name, mtime_ns, kind):
+        if event == "upsert" and kind not in self.exclude_kinds:
+            with self._cond:
+                self._cond.notify_all()
+
+    # --- CURSORS ---
+    @staticmethod
+    def encode_cursor(mtime_ns, name):
+        return f"{mtime_ns}:{name}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Parses a cursor string; returns None if it is missing or malformed."""
+        try:
+            mtime_ns, name = cursor.split(":", 1)
+            return int(mtime_ns), name
+        except (AttributeError, ValueError):
+            return None
+
+    def head(self):
+        """Cursor for "now": only files written after this point will be announced."""
+        return self.encode_cursor(time.time_ns(), "")
+
+    # --- EVENTS ---
+    def pending(self, cursor):
+        """Announceable files after the cursor, oldest first, as (cursor, filename, message)."""
+        position = self.decode_cursor(cursor) or self.decode_cursor(self.head())
+        return [(self.encode_cursor(mtime_ns, name), name, self.describe(name))
+                for mtime_ns, name, kind in self.index.after(position) if kind not in self.exclude_kinds]
+
+    def wait(self, cursor, timeout):
+        """Blocks (without polling) until something is pending after the cursor or the timeout expires."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                items = self.pending(cursor)
+                remaining = deadline - time.monotonic()
+                if items or remaining <= 0:
+                    return items
+                self._cond.wait(remaining)
+
+    def full(self):
+        """True when another stream would exceed max_subscribers (the route answers 503 instead)."""
+        return self.max_subscribers is not None and self.subscribers >= self.max_subscribers
+
+    def stream(self, cursor):
+        """SSE generator: one "pulse" event per new file, keep-alive comments while idle."""
+        cursor = cursor if self.decode_cursor(cursor) else self.head()
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                items = self.wait(cursor, self.heartbeat)
+                if not items:
+                    yield ": keep-alive\n\n"
+                    continue
+                for item_cursor, name, message in items:
+                    payload = json.dumps({"found": True, "file": name, "message": message})
+                    yield f"id: {item_cursor}\nevent: pulse\ndata: {payload}\n\n"
+                    cursor = item_cursor
+        finally:
+            with self._cond:
+                self.subscribers -= 1
@@ -0,0 +1,117 @@
+# response_cache.py
+
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+# Words a paraphrase may add, drop or swap. Any other differing token (a number, a city, a name) means
+# the two prompts ask for different things, however close their embeddings are.
+FUNCTION_WORDS = frozenset("""a an the is are was were be am do does did what whats s how me my i you your can could
+would will please tell show give to in at for of on about like current currently right now just hey hi ok okay
+buddy it that this there so up want need know let us""".split())
+class ResponseCache:
+    """LRU + TTL cache for LLM answers, keyed on the normalized prompt and a context fingerprint."""
+    # Replaying these would repeat a side effect or a one-off generated script, so they are never cached.
+    UNCACHEABLE_TYPES = ("system_control", "drone_control", "create_skill")
+
+    def __init__(self, max_entries=256, ttl_seconds=600, embed_fn=None, similarity_threshold=0.92,
+                 uncacheable_types=UNCACHEABLE_TYPES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.uncacheable_types = set(uncacheable_types)
+        self._entries = OrderedDict() # (fingerprint, prompt) -> (expires_at, data, embedding)
+        self._lock = threading.Lock()
+        self._embed = lru_cache(maxsize=128)(self._make_embedding) if embed_fn else None
+        self._embed_fn = embed_fn
+        self.counters = {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "skipped": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def normalize(prompt):
+        """Lowercase, drop punctuation and collapse whitespace so trivial variations share a key."""
+        text = re.sub(r"[^\w\s]", " ", prompt.lower())
+        return re.sub(r"\s+", " ", text).strip()
+
+    def fingerprint(self, rag_context, turns):
+        """Hashes the LIVE CONTEXT and the history turns the answer depends on. Pass exactly the turns
+        that go into the prompt (see prompt_builder.HISTORY_TURNS)."""
+        h = hashlib.sha256()
+        h.update((rag_context or "").encode("utf-8"))
+        for turn in turns:
+            h.update(b"\x00" + turn.get("prompt", "").encode("utf-8") + b"\x01" + turn.get("response", "").encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    @staticmethod
+    def same_slots(a, b):
+        """True when two normalized prompts differ only in function words (no number or entity changed)."""
+        return (set(a.split()) ^ set(b.split())) <= FUNCTION_WORDS
+
+    def _make_embedding(self, text):
+        vec = np.asarray(self._embed_fn(text), dtype="float32").ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, prompt, fingerprint):
+        """Returns a copy of a cached answer (exact, then semantic match) or None."""
+        key = (fingerprint, self.normalize(prompt))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] < now:
+                del self._entries[key]
+                self.counters["expired"] += 1
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return copy.deepcopy(entry[1])
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[0] == fingerprint and e[0] >= now and e[2] is not None and self.same_slots(k[1], key[1])]
+
+        if self._embed and candidates:
+            query = self._embed(key[1])
+            matrix = np.stack([e[2] for _, e in candidates])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                best_key, best_entry = candidates[best]
+                with self._lock:
+                    if best_key in self._entries: self._entries.move_to_end(best_key)
+                    self.counters["semantic_hits"] += 1
+                print(f"🧩 Semantic cache hit ({scores[best]:.2f}): '{best_key[1]}'")
+                return copy.deepcopy(best_entry[1])
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, prompt, fingerprint, data):
+        """Stores an LLM answer unless its type has side effects."""
+        if not data.get("type") or data.get("type") in self.uncacheable_types:
+            with self._lock:
+                self.counters["skipped"] += 1
+            return False
+
+        key = (fingerprint, self.normalize(prompt))
+        embedding = self._embed(key[1]) if self._embed else None
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, copy.deepcopy(data), embedding)
+            self._entries.move_to_end(key)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+        return True
+
+    def stats(self):
+        """Hit/miss counters for the metrics endpoint."""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["semantic_hits"] + self.counters["misses"]
+            hits = self.counters["hits"] + self.counters["semantic_hits"]
+            return dict(self.counters, size=len(self._entries), hit_rate=round(hits / lookups, 3) if lookups else 0.0)
@@ -0,0 +1,68 @@
+# speaker_embedding.py
+
+import os
+import re
+
+import numpy as np
+
+from audio_utils import frame_energy_db, log_mel, mfcc
+
+class SpeakerEmbedder:
+    """Acoustic speaker embeddings computed straight from the waveform (who is speaking, not what was said).
+    Default mode is MFCC statistics (numpy only). Set SPEAKER_ONNX_MODEL to a speaker-verification model
+    exported to ONNX to use it instead; SPEAKER_ONNX_INPUT picks its input: "fbank" ([1, frames, 80]
+    log-mel, mean-normalized) or "waveform" ([1, samples] at 16 kHz)."""
+    def __init__(self, onnx_path=None, onnx_input=None, min_speech=0.5, vad_margin_db=10.0):
+        self.min_speech_frames = int(min_speech * 100) # 10 ms hop
+        self.vad_margin_db = vad_margin_db
+        self.session = None
+        self.onnx_input = onnx_input or os.getenv("SPEAKER_ONNX_INPUT", "fbank")
+        onnx_path = onnx_path or os.getenv("SPEAKER_ONNX_MODEL")
+        if onnx_path:
+            try:
+                import onnxruntime as ort
+                self.session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+                self.input_name = self.session.get_inputs()[0].name
+            except Exception as e:
+                print(f"⚠️ Could not load speaker model {onnx_path} ({e}). Falling back to MFCC statistics.")
+                self.session = None
+
+        if self.session:
+            stem = re.sub(r"[^A-Za-z0-9_-]", "_", os.path.splitext(os.path.basename(onnx_path))[0])
+            self.mode = f"onnx-{stem}"
+            probe = np.sin(np.arange(32000, dtype=np.float32) / 7.0) * 0.3
+            self.dim = len(self._onnx_embedding(probe, slice(None)))
+        else:
+            self.mode = "mfcc"
+            self.dim = 57 # mean + std of c1..c19, std of their deltas
+        print(f"🗣️ Speaker embeddings: {self.mode} ({self.dim} dims)")
+
+    def voiced_frames(self, audio):
+        """Boolean mask of 10 ms frames that carry speech, or None if there is too little of it."""
+        energy = frame_energy_db(audio)
+        voiced = energy > max(np.percentile(energy, 10) + self.vad_margin_db, -50.0)
+        return voiced if voiced.sum() >= self.min_speech_frames else None
+
+    def _mfcc_embedding(self, audio, voiced):
+        feats = mfcc(audio, n_mfcc=20, n_mels=40)[:, 1:] # c0 is loudness, not identity
+        deltas = np.gradient(feats, axis=0)
+        feats, deltas = feats[voiced], deltas[voiced]
+        return np.concatenate([feats.mean(axis=0), feats.std(axis=0), deltas.std(axis=0)])
+
+    def _onnx_embedding(self, audio, voiced):
+        if self.onnx_input == "waveform":
+            inputs = audio[None, :]
+        else:
+            fbank = log_mel(audio, n_mels=80)[voiced]
+            inputs = (fbank - fbank.mean(axis=0))[None, :, :]
+        output = self.session.run(None, {self.input_name: inputs.astype(np.float32)})[0]
+        return np.asarray(output, dtype=np.float32).reshape(-1)
+
+    def embed(self, audio):
+        """[1, dim] float32 L2-normalized embedding (FAISS L2 distance == 2 - 2*cosine), or None without enough speech."""
+        voiced = self.voiced_frames(audio)
+        if voiced is None:
+            return None
+        vector = self._onnx_embedding(audio, voiced) if self.session else self._mfcc_embedding(audio, voiced)
+        vector = vector / (np.linalg.norm(vector) + 1e-8)
+        return vector.astype(np.float32)[None, :]
@@ -110,8 +110,9 @@ async function startFaceRegistration(username) {
                 statusMessage.textContent = `Capturing face... ${percentage}%`;
             }
         } else {
+            // 409: frame too similar to a stored sample; 422: no face / limit reached
             const data = await response.json();
-             if (data.status) statusMessage.textContent = data.status;
+            if (data.status) statusMessage.textContent = data.duplicate ? `${data.status} (${Math.round((samplesCollected / sampleLimit) * 100)}% Complete)` : data.status;
         }
     }, 200);
 }
@@ -0,0 +1,146 @@
+# telemetry.py
+
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+FIELDS = ("time", "lat", "lon", "alt", "groundspeed", "airspeed", "heading", "climb", "throttle",
+          "battery_voltage", "battery_level", "armed", "mode")
+
+def _changed(old, new, tolerance):
+    if isinstance(old, float) and isinstance(new, float):
+        return abs(new - old) > tolerance
+    return old != new
+
+class TelemetryRing:
+    """Fixed-size numpy ring buffer of telemetry rows: memory is allocated once, old samples are overwritten.
+    Writes come from one thread (DroneKit's listener thread); readers copy what they need under the lock."""
+    def __init__(self, capacity=3000, fields=FIELDS):
+        self.fields = fields
+        self.index = {name: i for i, name in enumerate(fields)}
+        self.capacity = capacity
+        self.data = np.full((capacity, len(fields)), np.nan, dtype=np.float64)
+        self.seq = 0 # Total rows ever written; row seq lives at data[(seq - 1) % capacity]
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        with self._lock:
+            self.data[self.seq % self.capacity] = row
+            self.seq += 1
+
+    def latest(self):
+        """(seq, row copy) of the newest sample, or (0, None)."""
+        with self._lock:
+            if not self.seq: return 0, None
+            return self.seq, self.data[(self.seq - 1) % self.capacity].copy()
+
+    def window(self, seconds=None, now=None):
+        """Rows of the last `seconds` (all retained rows if None), oldest first, as a copy."""
+        with self._lock:
+            count = min(self.seq, self.capacity)
+            rows = self.data[np.arange(self.seq - count, self.seq) % self.capacity] # Fancy indexing copies
+        if seconds is not None and len(rows):
+            rows = rows[rows[:, self.index["time"]] >= (now or time.time()) - seconds]
+        return rows
+
+class TelemetryStream:
+    """Records DroneController telemetry into a TelemetryRing at up to rate_hz and pushes it to
+    Server-Sent-Events subscribers, each at its own (lower) rate and as deltas of changed fields only.
+    Every open stream holds a server thread, so at most max_subscribers run at once (None = no cap)."""
+    def __init__(self, drone, rate_hz=50.0, capacity=3000, heartbeat=15.0, max_stream_hz=50.0, max_subscribers=None):
+        self.ring = TelemetryRing(capacity)
+        self.min_interval = 1.0 / rate_hz
+        self.heartbeat = heartbeat
+        self.max_stream_hz = max_stream_hz
+        self.max_subscribers = max_subscribers
+        self.modes = [] # Mode names interned to small integers for the numeric ring
+        self._last_sample = 0.0
+        self._cond = threading.Condition()
+        self.subscribers = 0
+        self._listeners = []
+        drone.subscribe(self._on_snapshot)
+
+    # --- RECORDING ---
+    def _mode_code(self, name):
+        if name is None: return math.nan
+        if name not in self.modes: self.modes.append(name)
+        return self.modes.index(name)
+
+    def _on_snapshot(self, snapshot):
+        now = time.time()
+        if now - self._last_sample < self.min_interval:
+            return # Rate cap: listeners can fire far more often than we record
+        self._last_sample = now
+        row = [now] + [snapshot.get(f) for f in FIELDS[1:-2]] + [snapshot.get("armed"), self._mode_code(snapshot.get("mode"))]
+        row = [math.nan if v is None else float(v) for v in row]
+        self.ring.append(row)
+        with self._cond:
+            self._cond.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(row)
+            except Exception as e:
+                print(f"🔴 Telemetry row listener failed: {e}")
+
+    def subscribe(self, callback):
+        """callback(row) for every recorded sample, in FIELDS order (e.g. the flight recorder)."""
+        self._listeners.append(callback)
+
+    def decode(self, row):
+        """Row -> JSON-friendly dict (NaN -> None, mode code -> name, armed -> bool)."""
+        sample = {f: (None if math.isnan(v) else v) for f, v in zip(FIELDS, row.tolist())}
+        if sample["mode"] is not None: sample["mode"] = self.modes[int(sample["mode"])]
+        if sample["armed"] is not None: sample["armed"] = bool(sample["armed"])
+        return sample
+
+    def history(self, seconds=60, max_points=500):
+        """Columnar history of the last `seconds`, evenly downsampled to at most max_points."""
+        rows = self.ring.window(seconds)
+        if len(rows) > max_points:
+            rows = rows[np.linspace(0, len(rows) - 1, max_points).astype(int)]
+        columns = {f: [None if math.isnan(v) else v for v in rows[:, i].tolist()] for i, f in enumerate(FIELDS)}
+        columns["mode"] = [None if v is None else self.modes[int(v)] for v in columns["mode"]]
+        return columns
+
+    # --- STREAMING ---
+    def full(self):
+        """True when another stream would exceed max_subscribers (the route answers 503 instead)."""
+        return self.max_subscribers is not None and self.subscribers >= self.max_subscribers
+
+    def stream(self, max_hz=10.0, tolerance=1e-6):
+        """SSE generator: first a full sample, then only the fields that changed, at most max_hz events/s.
+        Intermediate samples are skipped (the subscriber always gets the newest one)."""
+        interval = 1.0 / max(0.1, min(max_hz, self.max_stream_hz))
+        sent = {}
+        seq = 0
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield "retry: 2000\n\n"
+            next_emit = time.monotonic()
+            while True:
+                with self._cond:
+                    if self.ring.seq == seq:
+                        self._cond.wait(self.heartbeat)
+                if self.ring.seq == seq:
+                    yield ": keep-alive\n\n"
+                    continue
+                seq, row = self.ring.latest()
+                sample = self.decode(row)
+                delta = {f: v for f, v in sample.items() if f not in sent or _changed(sent[f], v, tolerance)}
+                if delta:
+                    sent.update(delta)
+                    yield f"id: {seq}\nevent: telemetry\ndata: {json.dumps(delta)}\n\n"
+                # Per-subscriber downsampling: sleep until this client's next slot
+                next_emit = max(next_emit + interval, time.monotonic())
+                time.sleep(max(0.0, next_emit - time.monotonic()))
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self):
+        return {"samples": self.ring.seq, "capacity": self.ring.capacity, "subscribers": self.subscribers,
+                "max_subscribers": self.max_subscribers}
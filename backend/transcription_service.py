@@ -0,0 +1,114 @@
+# transcription_service.py
+
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+import whisper
+
+class TranscriptionQueueFull(RuntimeError):
+    """Raised by submit() when the queue is at capacity (callers should answer 503 / retry later)."""
+
+class TranscriptionService:
+    """Single worker thread that owns the Whisper model. Request threads submit 16 kHz float32 clips
+    and get futures back; pending clips are micro-batched into one padded mel batch and decoded together.
+    language=None auto-detects the language of every clip, as whisper's transcribe() does."""
+    def __init__(self, model, max_queue=32, max_batch=8, batch_window=0.03, language=None, latency_window=500):
+        self.model = model
+        self.max_batch = max_batch
+        self.batch_window = batch_window # How long the worker waits for more clips to join a batch
+        self.options = whisper.DecodingOptions(fp16=False, language=language, without_timestamps=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "batches": 0, "max_depth": 0}
+
+    # --- LIFECYCLE ---
+    def _ensure_worker(self):
+        """Starts the worker on first use (after gunicorn forks, never in the master)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive(): return
+            self._thread = threading.Thread(target=self._run, name="whisper-worker", daemon=True)
+            self._thread.start()
+
+    # --- SUBMISSION ---
+    def submit(self, audio):
+        """Queues a clip and returns a Future resolving to the transcript text."""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((np.asarray(audio, dtype=np.float32), future, time.perf_counter()))
+        except queue.Full:
+            with self._lock: self._stats["rejected"] += 1
+            raise TranscriptionQueueFull(f"Transcription queue full ({self._queue.maxsize} clips pending)")
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        return future
+
+    def transcribe(self, audio, timeout=60):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(audio).result(timeout=timeout)
+
+    # --- WORKER ---
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _decode(self, clips):
+        """Batched decode for clips up to 30 s; longer ones go through the regular sliding-window transcribe."""
+        texts = [None] * len(clips)
+        short = [i for i, audio in enumerate(clips) if len(audio) <= whisper.audio.N_SAMPLES]
+        if short:
+            mel = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(clips[i]), self.model.dims.n_mels)
+                               for i in short]).to(self.model.device)
+            results = whisper.decode(self.model, mel, self.options)
+            for i, result in zip(short, results):
+                texts[i] = result.text
+        for i, audio in enumerate(clips):
+            if texts[i] is None:
+                texts[i] = self.model.transcribe(audio, fp16=False, language=self.options.language)["text"]
+        return [text.strip() for text in texts]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                texts = self._decode([audio for audio, _, _ in batch])
+                error = None
+            except Exception as e:
+                print(f"🔴 Whisper batch of {len(batch)} failed: {e}")
+                texts, error = None, e
+            done = time.perf_counter()
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["failed" if error else "completed"] += len(batch)
+                self._latencies.extend((done - queued) * 1000 for _, _, queued in batch)
+            for i, (_, future, _) in enumerate(batch):
+                if error: future.set_exception(error)
+                else: future.set_result(texts[i])
+
+    # --- METRICS ---
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = np.array(self._latencies) if self._latencies else None
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = round((stats["completed"] + stats["failed"]) / stats["batches"], 2) if stats["batches"] else 0.0
+        if latencies is not None:
+            stats["latency_ms"] = {"avg": round(float(latencies.mean()), 1),
+                                   "p50": round(float(np.percentile(latencies, 50)), 1),
+                                   "p95": round(float(np.percentile(latencies, 95)), 1)}
+        return stats
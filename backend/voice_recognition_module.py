@@ -1,114 +1,217 @@
 # voice_recognition_module.py
 
 import os
+import json
+import threading
 import numpy as np
 import whisper
 from sentence_transformers import SentenceTransformer
 import faiss
-from scipy.io.wavfile import read as read_wav
-import io
+from audio_utils import decode_audio_bytes
+from wake_word import UNTRAINED_WARNING, WakeWordDetector
+from transcription_service import TranscriptionService
+from speaker_embedding import SpeakerEmbedder
 
 class VoiceAuthenticator:
-    """Handles voice enrollment and verification using Whisper and embeddings."""
-    def __init__(self, user_manager):
+    """Handles voice enrollment and verification with acoustic speaker embeddings; Whisper handles transcription.
+    ann_threshold (default VOICE_ANN_THRESHOLD, 1000) counts enrolled users, not stored voice samples."""
+    def __init__(self, user_manager, index_dir="voice_index", ann_threshold=None, mmap=False):
         print("Loading voice authentication models...")
         self.user_manager = user_manager
         self.whisper_model = whisper.load_model("base")
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        # One worker batches every Whisper call in this process. WHISPER_LANGUAGE (e.g. "en") skips auto-detection
+        self.transcriber = TranscriptionService(self.whisper_model, language=os.getenv("WHISPER_LANGUAGE") or None)
+        self.embedder = SentenceTransformer("all-MiniLM-L6-v2") # Text embeddings (shared with the response cache)
+        self.speaker = SpeakerEmbedder()
         
-        # FAISS index setup
-        self.embedding_dim = 384
-        self.index = faiss.IndexFlatL2(self.embedding_dim)
-        self.faiss_map = {} # Maps FAISS index to username
+        # FAISS index setup (persisted in index_dir, IDs are stable so users can be removed).
+        # One index per embedding mode, since MFCC and ONNX vectors differ in size and space.
+        self.embedding_dim = self.speaker.dim
+        self.index_path = os.path.join(index_dir, f"voices_{self.speaker.mode}.faiss")
+        self.map_path = os.path.join(index_dir, f"voices_{self.speaker.mode}.json")
+        self.match_threshold = float(os.getenv("VOICE_MATCH_THRESHOLD", 0.15)) # Squared L2 between unit vectors
+        self.ann_threshold = int(ann_threshold or os.getenv("VOICE_ANN_THRESHOLD", 1000)) # Switch from exact search to IVF at this many enrolled users
+        self.mmap = mmap
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+        self.index = None
+        self.faiss_map = {} # Maps FAISS ID to username
+        self.next_id = 0
         self._load_existing_voices()
+        self.wake_word = WakeWordDetector(os.path.join(index_dir, "wake_word")) # Cheap gate in front of Whisper
         print("✅ Voice models loaded.")
-        
+
+    def _new_index(self):
+        return faiss.IndexIDMap(faiss.IndexFlatL2(self.embedding_dim))
+
     def _load_existing_voices(self):
-        """Loads voice embeddings of enrolled users into FAISS index."""
-        # In a real app, you'd save/load embeddings from disk.
-        # For simplicity, we assume they are lost on restart and need re-enrollment.
-        print("FAISS index is ready. Enroll users to add voices.")
+        """Loads the saved FAISS index and its ID -> username map from disk."""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.map_path)):
+            self.index = self._new_index()
+            if os.path.exists(os.path.join(os.path.dirname(self.index_path), "voices.faiss")):
+                print("⚠️ Found an old transcript-based voice index; users need to re-enroll for speaker embeddings.")
+            print("FAISS index is ready. Enroll users to add voices.")
+            return
+
+        try:
+            self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP if self.mmap else 0)
+            with open(self.map_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self.faiss_map = {int(i): name for i, name in saved["ids"].items()}
+            self.next_id = saved.get("next_id", max(self.faiss_map, default=-1) + 1)
+        except Exception as e:
+            print(f"🔴 Could not load voice index ({e}). Starting empty; users must re-enroll.")
+            self.index, self.faiss_map, self.next_id = self._new_index(), {}, 0
+            return
+
+        self._reconcile()
+        print(f"✅ Loaded {self.index.ntotal} voice profiles for {len(set(self.faiss_map.values()))} users.")
+
+    def _index_ids(self):
+        """IDs actually stored in the index."""
+        if isinstance(self.index, faiss.IndexIDMap):
+            return set(faiss.vector_to_array(self.index.id_map).tolist())
+        invlists = faiss.extract_index_ivf(self.index).invlists
+        ids = set()
+        for list_no in range(invlists.nlist):
+            size = invlists.list_size(list_no)
+            if size: ids.update(faiss.rev_swig_ptr(invlists.get_ids(list_no), size).tolist())
+        return ids
+
+    def _reconcile(self):
+        """Repairs a crash between the index and map writes: drop IDs that only exist on one side."""
+        index_ids = self._index_ids()
+        orphans = [i for i in index_ids if i not in self.faiss_map]
+        if orphans: self.index.remove_ids(np.array(orphans, dtype="int64"))
+        stale = [i for i in self.faiss_map if i not in index_ids]
+        for i in stale: del self.faiss_map[i]
+        if orphans or stale:
+            print(f"⚠️ Voice index repaired ({len(orphans)} orphan vectors, {len(stale)} stale names).")
+            self._save_index()
+
+    def _save_index(self):
+        """Atomically writes the index and ID map (temp file + rename), so a crash never leaves half a file."""
+        tmp_index = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_index)
+        os.replace(tmp_index, self.index_path)
+        tmp_map = self.map_path + ".tmp"
+        with open(tmp_map, "w", encoding="utf-8") as f:
+            json.dump({"next_id": self.next_id, "ids": {str(i): name for i, name in self.faiss_map.items()}}, f)
+        os.replace(tmp_map, self.map_path)
+
+    def _maybe_upgrade_index(self):
+        """Once ann_threshold distinct users are enrolled, rebuild the exact flat index as an IVF index (supports remove_ids)."""
+        if not isinstance(self.index, faiss.IndexIDMap) or len(set(self.faiss_map.values())) < self.ann_threshold:
+            return
+        n = self.index.ntotal
+        vectors = self.index.index.reconstruct_n(0, n)
+        ids = faiss.vector_to_array(self.index.id_map).astype("int64")
+        nlist = max(1, int(4 * np.sqrt(n)))
+        quantizer = faiss.IndexFlatL2(self.embedding_dim)
+        ivf = faiss.IndexIVFFlat(quantizer, self.embedding_dim, nlist)
+        ivf.train(vectors)
+        ivf.add_with_ids(vectors, ids)
+        ivf.nprobe = max(1, nlist // 8)
+        self.index = ivf
+        print(f"⚡ Voice index upgraded to IVF ({nlist} lists) at {len(set(self.faiss_map.values()))} users, {n} voices.")
+
+    def _add_voice(self, name, embedding):
+        """Adds one embedding under a new stable ID and persists the index."""
+        with self._lock:
+            faiss_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(embedding, np.array([faiss_id], dtype="int64"))
+            self.faiss_map[faiss_id] = name
+            self._maybe_upgrade_index()
+            self._save_index()
+        return faiss_id
+
+    def remove_voice(self, name):
+        """Deletes every voice profile of a user without rebuilding the index."""
+        with self._lock:
+            ids = [i for i, n in self.faiss_map.items() if n == name]
+            if not ids: return False
+            self.index.remove_ids(np.array(ids, dtype="int64"))
+            for i in ids: del self.faiss_map[i]
+            self._save_index()
+        print(f"Removed {len(ids)} voice profiles for '{name}'.")
+        return True
+
+    def stats(self):
+        """Voice index size; next_id only grows, so removed IDs are never handed out again."""
+        with self._lock:
+            return {"voices": int(self.index.ntotal), "users": len(set(self.faiss_map.values())), "next_id": self.next_id,
+                    "index": "flat" if isinstance(self.index, faiss.IndexIDMap) else "ivf", "embedding": self.speaker.mode}
+
+    def transcribe(self, audio_bytes):
+        """Decodes the clip in memory and transcribes it (no temp files, safe to call concurrently)."""
+        return self.transcribe_audio(decode_audio_bytes(audio_bytes))
 
-    def _get_embedding(self, text):
-        """Converts text into a dense vector embedding."""
-        emb = self.embedder.encode([text])
-        return np.array(emb, dtype="float32")
+    def transcribe_audio(self, audio):
+        """Transcribes 16 kHz mono float32 samples on the shared worker (raises TranscriptionQueueFull under load)."""
+        if audio.size == 0:
+            return ""
+        return self.transcriber.transcribe(audio).lower()
 
     def enroll_voice(self, name, audio_bytes):
         """Enrolls a user by processing their voice recording."""
         if not self.user_manager.get_user_by_name(name):
             return False, "User does not exist."
-            
-        # Write bytes to a temporary file for Whisper
-        temp_filename = f"{name}_enroll.wav"
-        with open(temp_filename, 'wb') as f:
-            f.write(audio_bytes)
 
-        try:
-            # Transcribe
-            result = self.whisper_model.transcribe(temp_filename, fp16=False)
-            transcript = result["text"].strip().lower()
-
-            if not transcript:
-                return False, "Could not understand audio. Please speak clearly."
-            
-            # Create and store embedding
-            embedding = self._get_embedding(transcript)
-            
-            # Add to FAISS
-            faiss_id = self.index.ntotal
-            self.index.add(embedding)
-            self.faiss_map[faiss_id] = name
-            
-            self.user_manager.mark_voice_enrolled(name)
-            
-            print(f"Enrolled '{name}' with transcript: '{transcript}'")
-            return True, f"Voice profile created for {name}."
-        finally:
-            os.remove(temp_filename) # Clean up temp file
+        # Speaker embedding straight from the waveform (no transcription needed)
+        embedding = self.speaker.embed(decode_audio_bytes(audio_bytes))
+
+        if embedding is None:
+            return False, "Could not hear enough speech. Please speak clearly."
+        
+        # Add to FAISS (and save to disk)
+        self._add_voice(name, embedding)
+        
+        self.user_manager.mark_voice_enrolled(name)
+        
+        print(f"Enrolled '{name}' with a {self.speaker.mode} voice profile.")
+        return True, f"Voice profile created for {name}."
 
     def recognize_voice(self, audio_bytes):
         """Recognizes a user from a short voice clip."""
         if self.index.ntotal == 0:
             return "unrecognized", 100.0
 
-        temp_filename = "temp_verify.wav"
-        with open(temp_filename, 'wb') as f:
-            f.write(audio_bytes)
+        embedding = self.speaker.embed(decode_audio_bytes(audio_bytes))
+        
+        if embedding is None:
+            return "unrecognized", 100.0
+        
+        # Search FAISS for the closest match
+        distances, indices = self.index.search(embedding, 1)
+        
+        match_index = indices[0][0]
+        match_distance = distances[0][0]
+        
+        # Threshold for matching (tune with VOICE_MATCH_THRESHOLD, see benchmarks/bench_speaker_embedding.py)
+        if match_index >= 0 and match_distance < self.match_threshold:
+            recognized_name = self.faiss_map.get(int(match_index))
+            return recognized_name, match_distance
+        
+        return "unrecognized", match_distance
 
-        try:
-            result = self.whisper_model.transcribe(temp_filename, fp16=False)
-            transcript = result["text"].strip().lower()
-            
-            if not transcript:
-                return "unrecognized", 100.0
-
-            embedding = self._get_embedding(transcript)
-            
-            # Search FAISS for the closest match
-            distances, indices = self.index.search(embedding, 1)
-            
-            match_index = indices[0][0]
-            match_distance = distances[0][0]
-            
-            # Threshold for matching (you may need to tune this)
-            if match_distance < 0.5:
-                recognized_name = self.faiss_map.get(match_index)
-                return recognized_name, match_distance
-            
-            return "unrecognized", match_distance
-        finally:
-            os.remove(temp_filename)
+    def enroll_wake_word(self, audio_bytes):
+        """Adds a recording of the trigger phrase as a wake-word template."""
+        if self.wake_word.add_template(decode_audio_bytes(audio_bytes)):
+            return True, f"Wake word sample saved ({len(self.wake_word.templates)} total)."
+        return False, "No speech detected. Please say the wake word clearly."
+
+    def wake_word_warning(self):
+        """Message for the user while no wake word is recorded, else None."""
+        return UNTRAINED_WARNING if not self.wake_word.templates else None
 
     def check_trigger_phrase(self, audio_bytes, trigger_phrase="hey buddy"):
-        """Checks if a trigger phrase is present in the audio."""
-        temp_filename = "temp_trigger.wav"
-        with open(temp_filename, 'wb') as f:
-            f.write(audio_bytes)
-        try:
-            result = self.whisper_model.transcribe(temp_filename, fp16=False)
-            transcript = result["text"].strip().lower()
-            print(f"Heard: '{transcript}'")
-            return trigger_phrase in transcript
-        finally:
-            os.remove(temp_filename)
\ No newline at end of file
+        """Checks if a trigger phrase is present in the audio.
+        The wake-word detector screens the clip first; Whisper only runs when it fires."""
+        audio = decode_audio_bytes(audio_bytes)
+        fired, score = self.wake_word.detect(audio)
+        if not fired:
+            return False
+        transcript = self.transcribe_audio(audio)
+        print(f"Heard: '{transcript}' (wake word score {score:.3f})")
+        return trigger_phrase in transcript
\ No newline at end of file
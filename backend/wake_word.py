@@ -0,0 +1,119 @@
+# wake_word.py
+
+import glob
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from audio_utils import WHISPER_SAMPLE_RATE, frame_energy_db, mfcc
+
+HOP = 160 # 10 ms frames at 16 kHz, shared by the VAD and the MFCCs so they line up
+UNTRAINED_WARNING = ("No wake word recorded yet, so any short phrase is transcribed. "
+                     "Record it a few times from the + menu (Wake Word).") # Shown to the user by /voice/trigger and /voice/wake_word
+
+def normalize_features(features):
+    """Per-utterance mean/variance normalization (removes mic and channel colouring)."""
+    return (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-5)
+
+def subsequence_dtw(template, query):
+    """Average per-frame cosine distance of the best alignment of the whole template anywhere in query.
+    Steps (1,1), (1,0) and (1,2) keep the local speed between 0.5x and 2x and let each template row vectorize."""
+    t = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-8)
+    q = query / (np.linalg.norm(query, axis=1, keepdims=True) + 1e-8)
+    cost = 1.0 - t @ q.T # [template_frames, query_frames]
+    acc = cost[0].copy() # free start anywhere in the query
+    for row in cost[1:]:
+        best = acc.copy()
+        best[1:] = np.minimum(best[1:], acc[:-1])
+        best[2:] = np.minimum(best[2:], acc[:-2])
+        acc = row + best
+    return float(acc.min()) / len(cost) # free end
+
+class WakeWordDetector:
+    """Cheap first stage before Whisper: an energy VAD drops silence, then MFCC templates of the
+    wake word (recorded by the user) are matched with subsequence DTW.
+    With no templates enrolled it only passes short utterances (at most max_phrase seconds of speech, the
+    length of a wake phrase) and warns until the wake word is recorded via /voice/wake_word."""
+    def __init__(self, template_dir="wake_word_templates", threshold=None, vad_margin_db=10.0,
+                 min_speech=0.2, pad=0.1, max_templates=20, max_phrase=2.0):
+        self.template_dir = template_dir
+        self.threshold = float(threshold if threshold is not None else os.getenv("WAKE_WORD_THRESHOLD", 0.35))
+        self.vad_margin_db = vad_margin_db
+        self.min_speech_frames = int(min_speech * WHISPER_SAMPLE_RATE / HOP)
+        self.pad_frames = int(pad * WHISPER_SAMPLE_RATE / HOP)
+        self.max_phrase_frames = int(max_phrase * WHISPER_SAMPLE_RATE / HOP)
+        self.max_templates = max_templates
+        self._lock = threading.Lock()
+        self.templates = []
+        self._stats = {"calls": 0, "silence": 0, "rejected": 0, "fired": 0, "total_ms": 0.0}
+        os.makedirs(template_dir, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(template_dir, "*.npy")))[-max_templates:]:
+            self.templates.append(np.load(path))
+        if self.templates:
+            print(f"👂 Wake word: {len(self.templates)} templates loaded (threshold {self.threshold}).")
+        else:
+            print(f"⚠️ Wake word: {UNTRAINED_WARNING}")
+
+    # --- FEATURES ---
+    def speech_span(self, audio):
+        """(first_frame, last_frame) of the voiced region, or None if there isn't enough speech."""
+        energy = frame_energy_db(audio, hop=HOP)
+        floor = np.percentile(energy, 10)
+        voiced = np.flatnonzero(energy > max(floor + self.vad_margin_db, -50.0))
+        if len(voiced) < self.min_speech_frames:
+            return None
+        return max(voiced[0] - self.pad_frames, 0), min(voiced[-1] + self.pad_frames, len(energy) - 1)
+
+    def features(self, audio, span):
+        feats = mfcc(audio, hop=HOP)
+        return normalize_features(feats[span[0]:span[1] + 1])
+
+    # --- TEMPLATES ---
+    def add_template(self, audio):
+        """Stores one recording of the wake word. Returns False if it contains no speech."""
+        span = self.speech_span(audio)
+        if span is None:
+            return False
+        template = self.features(audio, span)
+        with self._lock:
+            path = os.path.join(self.template_dir, f"template_{time.time_ns()}.npy")
+            np.save(path, template)
+            self.templates = (self.templates + [template])[-self.max_templates:]
+        print(f"👂 Wake word template added ({len(template)} frames, {len(self.templates)} total).")
+        return True
+
+    # --- DETECTION ---
+    def score(self, audio):
+        """Best DTW distance against the templates (lower = closer), None for silence. Without templates:
+        0.0 for speech short enough to be the wake phrase, inf for anything longer."""
+        span = self.speech_span(audio)
+        if span is None:
+            return None
+        templates = self.templates
+        if not templates:
+            return 0.0 if span[1] - span[0] + 1 <= self.max_phrase_frames + 2 * self.pad_frames else math.inf
+        query = self.features(audio, span)
+        return min(subsequence_dtw(t, query) for t in templates)
+
+    def detect(self, audio):
+        """(fired, score). Only run the expensive transcription when fired is True."""
+        start = time.perf_counter()
+        score = self.score(audio)
+        fired = score is not None and score <= self.threshold
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["silence" if score is None else "fired" if fired else "rejected"] += 1
+            self._stats["total_ms"] += (time.perf_counter() - start) * 1000
+        return fired, score
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_ms"] = round(stats.pop("total_ms") / stats["calls"], 2) if stats["calls"] else 0.0
+        stats["templates"] = len(self.templates)
+        stats["untrained"] = not self.templates
+        stats["threshold"] = self.threshold
+        return stats
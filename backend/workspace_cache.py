@@ -0,0 +1,81 @@
+# workspace_cache.py
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+class ContentHashCache:
+    """Persistent on-disk cache for the Pathway indexer: file bytes -> parsed chunks, chunk text -> embedding.
+    Keys are content hashes, so a restart only re-parses / re-embeds files that actually changed."""
+    def __init__(self, cache_dir="pathway_cache", namespace="v1"):
+        self.chunks_dir = os.path.join(cache_dir, namespace, "chunks")
+        self.embeddings_dir = os.path.join(cache_dir, namespace, "embeddings")
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        os.makedirs(self.embeddings_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.counters = {"chunk_hits": 0, "chunk_misses": 0, "embedding_hits": 0, "embedding_misses": 0}
+
+    @staticmethod
+    def digest(data):
+        if isinstance(data, str): data = data.encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @staticmethod
+    def _atomic_write(path, write):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    # --- PARSED CHUNKS ---
+    def _chunks_path(self, key):
+        return os.path.join(self.chunks_dir, f"{key}.json")
+
+    def get_chunks(self, contents):
+        """Returns the cached [(text, metadata), ...] for these file bytes, or None."""
+        path = self._chunks_path(self.digest(contents))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                chunks = [(text, metadata) for text, metadata in json.load(f)]
+            self._count("chunk_hits")
+            return chunks
+        except (OSError, ValueError):
+            self._count("chunk_misses")
+            return None
+
+    def put_chunks(self, contents, chunks):
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([[text, metadata] for text, metadata in chunks], f, default=str)
+        self._atomic_write(self._chunks_path(self.digest(contents)), write)
+
+    # --- EMBEDDINGS ---
+    def _embedding_path(self, key):
+        shard = os.path.join(self.embeddings_dir, key[:2])
+        os.makedirs(shard, exist_ok=True)
+        return os.path.join(shard, f"{key}.npy")
+
+    def get_embedding(self, text):
+        try:
+            vector = np.load(self._embedding_path(self.digest(text)))
+            self._count("embedding_hits")
+            return vector
+        except (OSError, ValueError):
+            self._count("embedding_misses")
+            return None
+
+    def put_embedding(self, text, vector):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray(vector, dtype="float32"))
+        self._atomic_write(self._embedding_path(self.digest(text)), write)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
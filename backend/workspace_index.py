@@ -0,0 +1,146 @@
+# workspace_index.py
+
+import bisect
+import os
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+def classify(name):
+    """Maps a workspace filename to its kind."""
+    if name.startswith("vision_memory_"): return "vision_memory"
+    if name.startswith("screen_memory_"): return "screen_memory"
+    if name.startswith("memory_digest_"): return "digest"
+    if name.startswith("flight_log_"): return "flight_log"
+    return "document"
+
+class _WatchdogHandler(FileSystemEventHandler):
+    def __init__(self, index):
+        self.index = index
+
+    def on_any_event(self, event):
+        if event.is_directory: return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path: self.index.refresh(os.path.basename(path))
+
+class WorkspaceIndex:
+    """In-memory index of workspace files sorted by mtime, kept current by watchdog events
+    (or a polling thread when watchdog isn't installed)."""
+    def __init__(self, workspace, poll_interval=2.0):
+        self.workspace = workspace
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._entries = {} # name -> (mtime_ns, size, kind)
+        self._all = [] # sorted [(mtime_ns, name)]
+        self._by_kind = {} # kind -> sorted [(mtime_ns, name)]
+        self._listeners = []
+        self._observer = None
+        self._poll_thread = None
+        self._stop = threading.Event()
+
+    # --- LIFECYCLE ---
+    def start(self):
+        self.rescan()
+        if WATCHDOG_AVAILABLE:
+            self._observer = Observer()
+            self._observer.schedule(_WatchdogHandler(self), self.workspace, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+            print(f"👁️ Workspace index watching {self.workspace} ({len(self._entries)} files, watchdog)")
+        else:
+            self._poll_thread = threading.Thread(target=self._poll_loop, name="workspace-poll", daemon=True)
+            self._poll_thread.start()
+            print(f"👁️ Workspace index polling {self.workspace} every {self.poll_interval}s ({len(self._entries)} files)")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._observer: self._observer.stop()
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.rescan()
+            except Exception as e:
+                print(f"🔴 Workspace poll failed: {e}")
+
+    # --- UPDATES ---
+    def subscribe(self, callback):
+        """callback(event, name, mtime_ns, kind) with event in {'upsert', 'remove'}; called outside the lock."""
+        self._listeners.append(callback)
+
+    def _notify(self, event, name, mtime_ns, kind):
+        for callback in list(self._listeners):
+            try:
+                callback(event, name, mtime_ns, kind)
+            except Exception as e:
+                print(f"🔴 Workspace listener failed: {e}")
+
+    def _remove_locked(self, name):
+        mtime_ns, _, kind = self._entries.pop(name)
+        for ordered in (self._all, self._by_kind[kind]):
+            i = bisect.bisect_left(ordered, (mtime_ns, name))
+            if i < len(ordered) and ordered[i] == (mtime_ns, name): del ordered[i]
+        return mtime_ns, kind
+
+    def refresh(self, name):
+        """Re-stats one file and updates the index. Call after writing into the workspace."""
+        if name.startswith("."): return # temp files (digest writes etc.)
+        try:
+            st = os.stat(os.path.join(self.workspace, name))
+            is_file = os.path.isfile(os.path.join(self.workspace, name))
+        except OSError:
+            st, is_file = None, False
+
+        event = None
+        with self._lock:
+            old = self._entries.get(name)
+            if not is_file:
+                if old:
+                    self._remove_locked(name)
+                    event = ("remove", name, old[0], old[2])
+            elif not old or old[0] != st.st_mtime_ns or old[1] != st.st_size:
+                if old: self._remove_locked(name)
+                kind = classify(name)
+                self._entries[name] = (st.st_mtime_ns, st.st_size, kind)
+                bisect.insort(self._all, (st.st_mtime_ns, name))
+                bisect.insort(self._by_kind.setdefault(kind, []), (st.st_mtime_ns, name))
+                event = ("upsert", name, st.st_mtime_ns, kind)
+        if event: self._notify(*event)
+
+    def rescan(self):
+        """Full directory scan (startup and polling fallback only)."""
+        try:
+            names = set(os.listdir(self.workspace))
+        except OSError:
+            return
+        with self._lock:
+            gone = [n for n in self._entries if n not in names]
+        for name in list(names) + gone:
+            self.refresh(name)
+
+    # --- QUERIES ---
+    def latest(self, kinds):
+        """Newest (name, mtime_seconds) among the given kinds, or None. O(1) per kind."""
+        with self._lock:
+            newest = max((self._by_kind[k][-1] for k in kinds if self._by_kind.get(k)), default=None)
+        return (newest[1], newest[0] / 1e9) if newest else None
+
+    def modified_since(self, timestamp, exclude_kinds=()):
+        """Names modified strictly after `timestamp` (seconds), oldest first. O(log n + k)."""
+        return [name for _, name, kind in self.after((int(timestamp * 1e9), "\uffff")) if kind not in exclude_kinds]
+
+    def after(self, cursor):
+        """Entries [(mtime_ns, name, kind)] strictly after the (mtime_ns, name) cursor, oldest first."""
+        with self._lock:
+            i = bisect.bisect_right(self._all, tuple(cursor))
+            return [(mtime_ns, name, self._entries[name][2]) for mtime_ns, name in self._all[i:]]
+
+    def __len__(self):
+        return len(self._entries)